@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Benchmarks the restricted construct scanners on large submissions.
+
+Compares the per construct mmap search the judge used to perform against the
+single pass text scanner and the Python import analyzer, both on a fresh
+source and on a resubmission that hits the analyzers memo. The analyzer only
+parses sources mentioning a restricted module so both cases are measured.
+
+Usage: python benchmarks/restricted_scan.py [lines] [restricted constructs]
+"""
+import mmap
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from extended_uva_judge.scanning import (  # noqa: E402
+    PythonImportAnalyzer, RestrictedScanner)
+
+SOURCE_BLOCK = b'''import sys
+from collections import defaultdict
+
+
+def solve(line):
+    counts = defaultdict(int)  # tally each word
+    for word in line.split():
+        counts[word] += 1
+    return max(counts.values()) if counts else 0
+
+
+for line in sys.stdin:
+    print(solve(line), "done")
+'''
+
+
+def _benchmark(label, source, restricted):
+    with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
+        f.write(source)
+    try:
+        print('%s: %d bytes, %d restricted constructs' % (
+            label, len(source), len(restricted)))
+        _time('mmap find per construct',
+              lambda: _mmap_scan(f.name, restricted))
+
+        scanner = RestrictedScanner(restricted)
+        _time('single pass text scan', lambda: scanner.scan(source))
+
+        _time('import analysis',
+              lambda: PythonImportAnalyzer(restricted).scan(source),
+              repeat=1)
+
+        analyzer = PythonImportAnalyzer(restricted)
+        analyzer.scan(source)
+        _time('import analysis, memoized', lambda: analyzer.scan(source))
+    finally:
+        os.remove(f.name)
+
+
+def _mmap_scan(path, restricted):
+    hits = []
+    with open(path, 'rb', 0) as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as s:
+            for item in restricted:
+                if s.find(item.encode()) != -1:
+                    hits.append(item)
+    return hits
+
+
+def _time(label, function, repeat=5):
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    print('%-32s %10.2f ms' % (label, best * 1000))
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    restricted = ['subprocess', 'multiprocess', 'os.fork']
+    restricted += ['restricted_module_%d' % i for i in range(count - 3)]
+    block_lines = SOURCE_BLOCK.count(b'\n')
+    source = SOURCE_BLOCK * max(1, lines // block_lines)
+
+    _benchmark('Clean source', source, restricted)
+    _benchmark('Source importing os', b'import os\n' + source, restricted)
+
+
+if __name__ == '__main__':
+    main()
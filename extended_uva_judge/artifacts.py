@@ -0,0 +1,200 @@
+"""Module housing the compiled artifact cache.
+
+Compiling a submission is expensive and contestants frequently resubmit the
+exact same source. Compiled artifacts are stored on disk keyed by a hash of
+everything that influences the compiler output so resubmissions can skip
+compilation entirely.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class ArtifactCache:
+    """Size bounded, least recently used, on disk cache of compiled programs.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._log = logging.getLogger()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    @staticmethod
+    def build_key(language, compiler, compiler_args, source, build=None):
+        """Builds the cache key for a compilation.
+
+        :param language: The normalized language of the source
+        :type language: str
+        :param compiler: The path to the compiler
+        :type compiler: str
+        :param compiler_args: The additional arguments given to the compiler
+        :type compiler_args: list
+        :param source: The contents of the source file
+        :type source: bytes
+        :param build: Anything else the artifact depends on, such as the
+                      compile commands and the name of the source file
+        :type build: list
+
+        :return: The cache key
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for part in [language, compiler] + list(compiler_args or []):
+            digest.update(str(part).encode())
+            digest.update(b'\0')
+        if build is not None:
+            digest.update(json.dumps(build, sort_keys=True).encode())
+            digest.update(b'\0')
+        digest.update(hashlib.sha256(source).digest())
+        return digest.hexdigest()
+
+    def fetch(self, key, destination):
+        """Copies a cached artifact to the destination if it exists.
+
+        :param key: The cache key of the artifact
+        :type key: str
+        :param destination: The path to copy the artifact to
+        :type destination: str
+
+        :return: True if the artifact was cached, false otherwise
+        :rtype: bool
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+
+        path = self._artifact_path(key)
+        try:
+            shutil.copyfile(path, destination)
+            shutil.copymode(path, destination)
+            os.utime(path, None)
+        except OSError:
+            # Evicted by another process sharing the cache directory
+            self._forget(key)
+            return False
+        return True
+
+    def store(self, key, artifact_path):
+        """Adds the artifact to the cache, evicting old artifacts as needed.
+
+        :param key: The cache key of the artifact
+        :type key: str
+        :param artifact_path: The path of the compiled artifact
+        :type artifact_path: str
+        """
+        size = os.path.getsize(artifact_path)
+        if size > self._max_bytes:
+            return
+
+        # Copy next to the final location and rename so readers never observe
+        # a partially written artifact.
+        handle, temp_path = tempfile.mkstemp(dir=self._directory,
+                                             suffix='.tmp')
+        os.close(handle)
+        try:
+            shutil.copyfile(artifact_path, temp_path)
+            shutil.copymode(artifact_path, temp_path)
+            os.replace(temp_path, self._artifact_path(key))
+        except OSError:
+            self._log.warning('Failed to cache artifact %s.', key,
+                              exc_info=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            evicted = self._evict()
+
+        for evicted_key in evicted:
+            try:
+                os.remove(self._artifact_path(evicted_key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        evicted = []
+        while self._total_bytes > self._max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            evicted.append(key)
+        return evicted
+
+    def _forget(self, key):
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+
+    def _load_index(self):
+        # Rebuild the recency order from the modification times, which are
+        # bumped on every cache hit.
+        found = []
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._total_bytes += size
+
+        for key in self._evict():
+            os.remove(self._artifact_path(key))
+
+    def _artifact_path(self, key):
+        return os.path.join(self._directory, key)
+
+
+def initialize(app_config):
+    """Creates the process wide artifact cache from the configuration.
+
+    The cache is disabled when no directory is configured.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _CACHE
+    settings = app_config.get('artifact_cache') or {}
+    directory = settings.get('directory')
+    with _CACHE_LOCK:
+        if not directory:
+            _CACHE = None
+            return
+        _CACHE = ArtifactCache(
+            directory, int(settings.get('max_bytes') or DEFAULT_MAX_BYTES))
+
+
+def get_artifact_cache():
+    """Gets the process wide artifact cache.
+
+    :return: The artifact cache or None if it is disabled
+    :rtype: ArtifactCache
+    """
+    return _CACHE
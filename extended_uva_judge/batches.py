@@ -0,0 +1,143 @@
+"""Module to assist with judging many submissions in one request.
+
+A batch is made of the files of a multipart request. Every file is either a
+single submission or a zip or tar archive of submissions. Submissions are
+named "<problem_id>/<language>/<filename>", where the problem and language
+may be left out when the request supplies defaults for them.
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+from extended_uva_judge import errors
+from extended_uva_judge.objects import Submission
+
+DEFAULT_MAX_SUBMISSIONS = 5000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+ZIP_EXTENSIONS = ('.zip',)
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz')
+
+
+class BatchEntry:
+    """A single submission of a batch."""
+    def __init__(self, name, problem_id, language, submission):
+        self._name = name
+        self._problem_id = problem_id
+        self._language = language
+        self._submission = submission
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def problem_id(self):
+        return self._problem_id
+
+    @property
+    def language(self):
+        return self._language
+
+    @property
+    def submission(self):
+        """The users submission
+
+        :rtype: extended_uva_judge.objects.Submission
+        """
+        return self._submission
+
+
+class BatchReader:
+    """Reads the submissions of a batch, enforcing the batch limits."""
+    def __init__(self, problem_id=None, language=None,
+                 max_submissions=DEFAULT_MAX_SUBMISSIONS,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param problem_id: Problem of submissions whose name has none
+        :type problem_id: str
+        :param language: Language of submissions whose name has none
+        :type language: str
+        :param max_submissions: Max submissions in the batch
+        :type max_submissions: int
+        :param max_bytes: Max bytes of all submissions once extracted
+        :type max_bytes: int
+        """
+        self._problem_id = problem_id
+        self._language = language
+        self._max_submissions = max_submissions
+        self._max_bytes = max_bytes
+        self._entries = []
+        self._total_bytes = 0
+
+    @property
+    def entries(self):
+        """The submissions read so far.
+
+        :rtype: list
+        """
+        return self._entries
+
+    def add_file(self, name, filename, content):
+        """Adds an uploaded file, extracting it if it is an archive.
+
+        :param name: The form field name of the file
+        :type name: str
+        :param filename: The name the file was uploaded with
+        :type filename: str
+        :param content: The contents of the file
+        :type content: bytes
+        :raises errors.InvalidBatchError: If the archive can not be read or
+                                          the batch limits are exceeded
+        """
+        lowered = (filename or '').lower()
+        try:
+            if lowered.endswith(ZIP_EXTENSIONS):
+                self._add_zip(content)
+            elif lowered.endswith(TAR_EXTENSIONS):
+                self._add_tar(content)
+            else:
+                self._add(name, content)
+        except (zipfile.BadZipfile, tarfile.TarError) as e:
+            raise errors.InvalidBatchError(
+                'Could not read archive %s: %s' % (filename, e))
+
+    def _add_zip(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for info in archive.infolist():
+                if info.filename.endswith('/'):
+                    continue
+                self._reserve(info.file_size)
+                self._add(info.filename, archive.read(info), reserved=True)
+
+    def _add_tar(self, content):
+        with tarfile.open(fileobj=io.BytesIO(content), mode='r:*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                self._reserve(member.size)
+                self._add(member.name, archive.extractfile(member).read(),
+                          reserved=True)
+
+    def _reserve(self, size):
+        # Checked before extracting so an archive can not expand past the limit
+        if self._total_bytes + size > self._max_bytes:
+            raise errors.InvalidBatchError(
+                'Batch exceeds %s bytes.' % self._max_bytes)
+        self._total_bytes += size
+
+    def _add(self, name, content, reserved=False):
+        if not reserved:
+            self._reserve(len(content))
+        if len(self._entries) >= self._max_submissions:
+            raise errors.InvalidBatchError(
+                'Batch exceeds %s submissions.' % self._max_submissions)
+
+        parts = [part for part in name.replace('\\', '/').split('/') if part]
+        filename = parts.pop() if parts else name
+        language = parts.pop() if parts else self._language
+        problem_id = parts.pop() if parts else self._problem_id
+        self._entries.append(BatchEntry(
+            name, problem_id, language,
+            Submission(os.path.basename(filename), content)))
@@ -0,0 +1,373 @@
+"""Module housing the special judges of problems with many valid answers.
+
+A problem can name a "checker" program that decides the verdict of an output
+instead of comparing it against a list of accepted outputs. Checkers are kept
+running between test cases and submissions and are sent one output to judge
+at a time over their standard input and output:
+
+* The judge writes a line holding the byte lengths of the input, the expected
+  output and the users output separated by spaces, followed by the bytes of
+  the input, the expected output and the users output.
+* The checker replies with a line holding the verdict, AC, AE, PE or WA,
+  optionally followed by a space and a message for the submitter.
+
+Checkers run with the problem directory as their working directory. A checker
+that exits, replies with anything else or does not reply within the timeout
+is stopped and started again for the next output. The checker program on disk
+is checked for changes at most once every revalidate_seconds.
+"""
+import logging
+import os
+import queue
+import shlex
+import shutil
+import threading
+import time
+
+from subprocess import DEVNULL, PIPE, Popen
+
+from extended_uva_judge import enums, errors, utilities
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_TIMEOUT_SECONDS = 10
+MAX_REPLY_BYTES = 65536
+
+CHECKER_VERDICTS = (
+    enums.ProblemResponses.ACCEPTED,
+    enums.ProblemResponses.ACCEPTED_PRESENTATION_ERROR,
+    enums.ProblemResponses.PRESENTATION_ERROR,
+    enums.ProblemResponses.WRONG_ANSWER
+)
+
+_SETTINGS = {}
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class Checker:
+    """A single running checker process."""
+    def __init__(self, command, cwd):
+        self._process = Popen(command, cwd=cwd, stdin=PIPE, stdout=PIPE,
+                              stderr=DEVNULL)
+        self._alive = True
+
+    @property
+    def alive(self):
+        return self._alive and self._process.poll() is None
+
+    def check(self, program_input, expected, output, timeout):
+        """Has the checker judge the output of a test case.
+
+        :param program_input: The input of the test case
+        :type program_input: bytes
+        :param expected: The expected output of the test case
+        :type expected: bytes
+        :param output: The output of the users program
+        :type output: bytes
+        :param timeout: Seconds to wait for the verdict
+        :type timeout: float
+        :return: The verdict and the message of the checker
+        :rtype: tuple
+        :raises errors.CheckerError: If the checker did not reply a verdict
+        """
+        # A checker that stops reading or replying is killed which unblocks
+        # the writes and the read below
+        timer = threading.Timer(timeout, self.close)
+        timer.daemon = True
+        timer.start()
+        try:
+            stream = self._process.stdin
+            stream.write(('%d %d %d\n' % (len(program_input), len(expected),
+                                          len(output))).encode())
+            stream.write(program_input)
+            stream.write(expected)
+            stream.write(output)
+            stream.flush()
+            reply = self._process.stdout.readline(MAX_REPLY_BYTES)
+        except (OSError, ValueError) as e:
+            self._alive = False
+            raise errors.CheckerError('Checker failed: %s' % e)
+        finally:
+            timer.cancel()
+
+        if not reply.endswith(b'\n'):
+            self._alive = False
+            raise errors.CheckerError('Checker exited or timed out without '
+                                      'a verdict.')
+
+        parts = reply.decode(errors='replace').strip().split(' ', 1)
+        verdict = parts[0]
+        if verdict not in CHECKER_VERDICTS:
+            self._alive = False
+            raise errors.CheckerError('Checker replied unknown verdict %r.' %
+                                      verdict)
+        return verdict, parts[1] if len(parts) > 1 else None
+
+    def close(self):
+        self._alive = False
+        if self._process.poll() is None:
+            self._process.kill()
+        for stream in (self._process.stdin, self._process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self._process.wait()
+
+
+class CheckerPool:
+    """A bounded pool of running checkers of one problem.
+
+    Checkers are started on first use and kept for the following outputs.
+    Outputs wait for a free checker once all of them are busy.
+    """
+    def __init__(self, command, cwd, size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT_SECONDS):
+        """
+        :param command: The command that starts the checker
+        :type command: list
+        :param cwd: The working directory of the checker
+        :type cwd: str
+        :param size: Max checkers running at the same time
+        :type size: int
+        :param timeout: Seconds a checker has to judge an output
+        :type timeout: float
+        """
+        self._command = command
+        self._cwd = cwd
+        self._timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.Queue()
+        self._closed = False
+
+    def check(self, program_input, expected, output):
+        """Judges the output of a test case on a free checker.
+
+        :return: The verdict and the message of the checker
+        :rtype: tuple
+        :raises errors.CheckerError: If the checker did not reply a verdict
+        """
+        with self._slots:
+            try:
+                checker = self._idle.get_nowait()
+            except queue.Empty:
+                checker = None
+            if checker is None or not checker.alive:
+                if checker is not None:
+                    checker.close()
+                try:
+                    checker = Checker(self._command, self._cwd)
+                except OSError as e:
+                    raise errors.CheckerError(
+                        'Checker %s could not be started: %s' %
+                        (' '.join(self._command), e))
+
+            try:
+                return checker.check(program_input, expected, output,
+                                     self._timeout)
+            finally:
+                if checker.alive and not self._closed:
+                    self._idle.put(checker)
+                else:
+                    checker.close()
+
+    def close(self):
+        # Busy checkers are closed once they finish
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class _PoolEntry:
+    def __init__(self, digest, signature, pool, checked):
+        self.digest = digest
+        self.signature = signature
+        self.pool = pool
+        self.checked = checked
+
+
+class CheckerComparator:
+    """Collects the output of a run and has the problems checker judge it.
+
+    Provides the same interface as comparison.StreamingComparator.
+    """
+    def __init__(self, pool, program_input, expected):
+        self._pool = pool
+        self._input = program_input
+        self._expected = expected
+        self._chunks = []
+        self._message = None
+
+    @property
+    def matching(self):
+        return True
+
+    @property
+    def message(self):
+        """The message of the checker for the submitter if it gave one.
+
+        :rtype: str
+        """
+        return self._message
+
+    def feed(self, chunk):
+        self._chunks.append(chunk)
+        return True
+
+    def finish(self):
+        return self.classify() == enums.ProblemResponses.ACCEPTED
+
+    def classify(self):
+        """Has the checker judge the collected output.
+
+        :return: The AC, AE, PE or WA verdict of the output
+        :rtype: str
+        :raises errors.CheckerError: If the checker did not reply a verdict
+        """
+        verdict, self._message = self._pool.check(
+            self._input, self._expected, b''.join(self._chunks))
+        return verdict
+
+
+def parse_command(checker):
+    """Parses the checker command of a problem configuration.
+
+    :param checker: The command as a string or a list of arguments
+    :type checker: str or list
+    :return: The arguments or None if the problem has no checker
+    :rtype: list
+    """
+    if not checker:
+        return None
+    if isinstance(checker, list):
+        return [str(argument) for argument in checker]
+    return shlex.split(str(checker))
+
+
+def get_signature(app_config, problem):
+    """Identifies the checker program of a problem as it is on disk.
+
+    The signature holds the size and modification time of the checker
+    executable and of every argument naming a file in the problem directory,
+    so it changes once the checker is rebuilt.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param problem: The problem
+    :type problem: problems.Problem
+    :return: The signature or None if the problem has no checker
+    :rtype: list
+    """
+    if problem.checker is None:
+        return None
+    directory = utilities.get_problem_directory(app_config)
+    signature = []
+    for index, argument in enumerate(problem.checker):
+        path = os.path.join(directory, argument)
+        if not os.path.isfile(path) and index == 0:
+            path = shutil.which(argument) or path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append([argument, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def initialize(app_config):
+    """Stops the running checkers and reads the checker settings.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    settings = app_config.get('checkers') or {}
+    revalidate = settings.get('revalidate_seconds')
+    if revalidate is None:
+        revalidate = app_config.get('problem_cache_revalidate_seconds')
+    with _POOLS_LOCK:
+        for entry in _POOLS.values():
+            entry.pool.close()
+        _POOLS.clear()
+        _SETTINGS.clear()
+        _SETTINGS.update({
+            'pool_size': int(settings.get('pool_size') or
+                             DEFAULT_POOL_SIZE),
+            'timeout': float(settings.get('timeout_seconds') or
+                             DEFAULT_TIMEOUT_SECONDS),
+            'revalidate': float(revalidate or 0)
+        })
+
+
+def _get_entry(app_config, problem):
+    """Gets the pool entry of a problem, restarting outdated checkers.
+
+    The signature of the checker program is only computed again once
+    revalidate_seconds have passed since the last check, not for every
+    output judged.
+    """
+    now = time.monotonic()
+    entry = _POOLS.get(problem.problem_id)
+    if (entry is not None and entry.digest == problem.digest and
+            now - entry.checked < _SETTINGS.get('revalidate', 0)):
+        return entry
+
+    signature = get_signature(app_config, problem)
+    with _POOLS_LOCK:
+        entry = _POOLS.get(problem.problem_id)
+        if (entry is not None and entry.digest == problem.digest and
+                entry.signature == signature):
+            entry.checked = now
+            return entry
+        if entry is not None:
+            logging.getLogger().debug('Restarting checkers of problem %s.',
+                                      problem.problem_id)
+            entry.pool.close()
+
+        timeout = problem.checker_timeout
+        pool = CheckerPool(
+            problem.checker, utilities.get_problem_directory(app_config),
+            _SETTINGS.get('pool_size', DEFAULT_POOL_SIZE),
+            _SETTINGS.get('timeout', DEFAULT_TIMEOUT_SECONDS)
+            if timeout is None else timeout)
+        entry = _PoolEntry(problem.digest, signature, pool, now)
+        _POOLS[problem.problem_id] = entry
+        return entry
+
+
+def get_pool(app_config, problem):
+    """Gets the checker pool of a problem.
+
+    Once the problem or its checker program changes the previous checkers
+    are stopped.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param problem: The problem
+    :type problem: problems.Problem
+    :return: The pool or None if the problem has no checker
+    :rtype: CheckerPool
+    """
+    if problem.checker is None:
+        return None
+    return _get_entry(app_config, problem).pool
+
+
+def get_current_signature(app_config, problem):
+    """Gets the signature of the checker program the pool of a problem runs.
+
+    Unlike get_signature the checker program is only looked up on disk once
+    every revalidate_seconds.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param problem: The problem
+    :type problem: problems.Problem
+    :return: The signature or None if the problem has no checker
+    :rtype: list
+    """
+    if problem.checker is None:
+        return None
+    return _get_entry(app_config, problem).signature
@@ -0,0 +1,498 @@
+"""Module to assist with comparing users output to the expected output.
+
+The comparators in this module are fed the users output chunk by chunk while
+the program is still running so the output never has to be buffered in full
+and a wrong answer can be detected as soon as the first byte differs.
+
+Output is classified at three levels of strictness at once:
+
+* Accepted (AC) when it matches an accepted output exactly.
+* Accepted with presentation error (AE) when it only differs by whitespace at
+  the end of its lines.
+* Presentation error (PE) when the same tokens are separated by different
+  whitespace.
+
+Anything else is a wrong answer (WA). Every level ignores the whitespace
+before and after the whole output and the platforms line endings.
+
+Problems with the "float" comparator instead compare the tokens of the output
+and accept numbers within a tolerance of the expected numbers. The numbers are
+compared in batches, as NumPy arrays when NumPy is installed.
+"""
+import bisect
+import math
+import os
+import re
+
+from extended_uva_judge import enums
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+WHITESPACE = b' \t\n\r\x0b\x0c'
+HORIZONTAL_WHITESPACE = b' \t\r\x0b\x0c'
+
+_EXACT = 0
+_TRIMMED = 1
+_TOKENS = 2
+
+_LEVEL_VERDICTS = (
+    enums.ProblemResponses.ACCEPTED,
+    enums.ProblemResponses.ACCEPTED_PRESENTATION_ERROR,
+    enums.ProblemResponses.PRESENTATION_ERROR
+)
+
+EXACT_COMPARATOR = 'exact'
+FLOAT_COMPARATOR = 'float'
+COMPARATORS = (EXACT_COMPARATOR, FLOAT_COMPARATOR)
+
+DEFAULT_ABSOLUTE_TOLERANCE = 1e-6
+DEFAULT_RELATIVE_TOLERANCE = 1e-6
+DEFAULT_BATCH_SIZE = 8192
+MAX_TOKEN_BYTES = 4096
+
+_NUMBER_PATTERN = br'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+_NUMBER = re.compile(_NUMBER_PATTERN + br'\Z')
+# Space separated numbers, to validate a whole batch in one match
+_NUMBER_LIST = re.compile(
+    _NUMBER_PATTERN + br'(?: ' + _NUMBER_PATTERN + br')*\Z')
+
+_TRAILING_WHITESPACE = re.compile(b'[' + re.escape(HORIZONTAL_WHITESPACE) +
+                                  b']+\n')
+
+
+class ExpectedOutput:
+    """An accepted output along with its normalized forms.
+
+    The forms are computed once when the problem is loaded so comparing a
+    submission never has to normalize the expected output again.
+    """
+    def __init__(self, exact):
+        """
+        :param exact: The accepted output with its line endings translated to
+                      "\\n" and leading and trailing whitespace removed
+        :type exact: bytes
+        """
+        self._forms = (
+            exact,
+            _trim_lines(exact),
+            b' '.join(exact.split())
+        )
+        self._numeric = None
+
+    @property
+    def exact(self):
+        return self._forms[_EXACT]
+
+    @property
+    def trimmed(self):
+        """The output without whitespace at the end of its lines."""
+        return self._forms[_TRIMMED]
+
+    @property
+    def tokens(self):
+        """The tokens of the output separated by single spaces."""
+        return self._forms[_TOKENS]
+
+    @property
+    def forms(self):
+        return self._forms
+
+    @property
+    def numeric(self):
+        """The tokens of the output with the numbers among them parsed.
+
+        Only problems using the float comparator need them so they are parsed
+        on first use and kept with the problem.
+
+        :rtype: NumericTokens
+        """
+        if self._numeric is None:
+            self._numeric = NumericTokens(self._forms[_EXACT].split())
+        return self._numeric
+
+
+class NumericTokens:
+    """The tokens of an expected output and the numbers among them."""
+    def __init__(self, tokens):
+        """
+        :param tokens: The whitespace separated tokens of the output
+        :type tokens: list
+        """
+        self._tokens = tokens
+        self._values = [_parse_number(token) for token in tokens]
+        # Positions of the tokens that have to match exactly
+        self._text = [index for index, value in enumerate(self._values)
+                      if value is None]
+        self._longest = max([len(token) for token in tokens] or [0])
+        self._array = None
+        self._is_number = None
+        if numpy is not None:
+            self._array = numpy.array(
+                [numpy.nan if value is None else value
+                 for value in self._values], dtype=numpy.float64)
+            self._is_number = ~numpy.isnan(self._array)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    @property
+    def longest(self):
+        """The length of the longest token.
+
+        :rtype: int
+        """
+        return self._longest
+
+    def matches(self, start, tokens, absolute, relative):
+        """Compares a batch of tokens of the users output.
+
+        Numbers match when they differ by at most the absolute tolerance or
+        the relative tolerance of the expected number, whichever is larger.
+        Any other token has to match exactly.
+
+        :param start: The position of the first token of the batch
+        :type start: int
+        :param tokens: The tokens of the users output
+        :type tokens: list
+        :param absolute: The absolute tolerance
+        :type absolute: float
+        :param relative: The relative tolerance
+        :type relative: float
+        :rtype: bool
+        """
+        end = start + len(tokens)
+        if end > len(self._tokens):
+            return False
+
+        first = bisect.bisect_left(self._text, start)
+        last = bisect.bisect_left(self._text, end)
+        for index in self._text[first:last]:
+            if tokens[index - start] != self._tokens[index]:
+                return False
+        if last - first == len(tokens):
+            return True
+
+        if self._array is not None:
+            return self._matches_array(start, end, tokens, absolute,
+                                       relative)
+
+        for token, value in zip(tokens, self._values[start:end]):
+            if value is None:
+                continue
+            actual = _parse_number(token)
+            if (actual is None or
+                    not abs(actual - value) <= max(absolute,
+                                                   relative * abs(value))):
+                return False
+        return True
+
+    def _matches_array(self, start, end, tokens, absolute, relative):
+        is_number = self._is_number[start:end]
+        expected = self._array[start:end][is_number]
+        numbers = [token for token, number in zip(tokens, is_number)
+                   if number]
+        # numpy also parses "1_0", "inf" and "nan", which the pure Python
+        # path rejects, and drops trailing NUL bytes when building the array,
+        # so the tokens are checked as they were read
+        if _NUMBER_LIST.match(b' '.join(numbers)) is None:
+            return False
+        actual = numpy.array(numbers, dtype=bytes).astype(numpy.float64)
+        # Not a number and infinities never fall within the tolerance
+        return bool(numpy.all(
+            numpy.abs(actual - expected) <=
+            numpy.maximum(absolute, relative * numpy.abs(expected))))
+
+
+class StreamingComparator:
+    """Compares a stream of output against a list of accepted outputs.
+
+    Each chunk is compared against the exact, line trimmed and token forms of
+    every accepted output in the same pass. Only the whitespace between the
+    last compared byte and the next chunk is held back.
+    """
+    def __init__(self, expected_outputs):
+        """
+        :param expected_outputs: The accepted outputs as ExpectedOutput or
+                                 normalized bytes
+        :type expected_outputs: list
+        """
+        expected = [output if isinstance(output, ExpectedOutput)
+                    else ExpectedOutput(output) for output in expected_outputs]
+        self._forms = [[output.forms[level] for output in expected]
+                       for level in (_EXACT, _TRIMMED, _TOKENS)]
+        self._positions = [[0] * len(expected) for _ in self._forms]
+        self._alive = [[True] * len(expected) for _ in self._forms]
+        self._line_sep = os.linesep.encode()
+        self._carry = b''
+        self._started = False
+        # The whitespace held back, in the form each level compares it in
+        self._pending = b''
+        self._pending_newlines = 0
+        self._pending_tail = b''
+        self._pending_whitespace = False
+        self._overflow = [False, False]
+
+    @property
+    def matching(self):
+        """True while at least one accepted output is still possible.
+
+        :rtype: bool
+        """
+        return any(any(alive) for alive in self._alive)
+
+    @property
+    def message(self):
+        """Comparisons against the accepted outputs have no message."""
+        return None
+
+    def feed(self, chunk):
+        """Compares the next chunk of the users output.
+
+        :param chunk: The next chunk of output
+        :type chunk: bytes
+
+        :return: True while the output can still match an accepted output
+        :rtype: bool
+        """
+        data = self._translate_line_endings(chunk)
+
+        if not self._started:
+            data = data.lstrip(WHITESPACE)
+            if not data:
+                return self.matching
+            self._started = True
+
+        body = data.strip(WHITESPACE)
+        if not body:
+            self._hold_whitespace(data)
+            return self.matching
+
+        start = len(data) - len(data.lstrip(WHITESPACE))
+        self._hold_whitespace(data[:start])
+        self._compare(body)
+        self._hold_whitespace(data[start + len(body):])
+        return self.matching
+
+    def finish(self):
+        """Completes the comparison once the output stream is exhausted.
+
+        :return: True if the output matched an accepted output exactly
+        :rtype: bool
+        """
+        return self.classify() == enums.ProblemResponses.ACCEPTED
+
+    def classify(self):
+        """Completes the comparison and classifies the output.
+
+        :return: The AC, AE, PE or WA verdict of the output
+        :rtype: str
+        """
+        # Anything still held is trailing whitespace which is ignored
+        for level, forms in enumerate(self._forms):
+            for index, form in enumerate(forms):
+                if (self._alive[level][index] and
+                        self._positions[level][index] == len(form)):
+                    return _LEVEL_VERDICTS[level]
+        return enums.ProblemResponses.WRONG_ANSWER
+
+    def _compare(self, body):
+        """Compares output that starts and ends with a non whitespace byte.
+
+        The whitespace held back before it is compared along with it.
+        """
+        # More whitespace was held than an accepted output has left
+        for level in (_EXACT, _TRIMMED):
+            if self._overflow[level]:
+                self._kill(level)
+
+        if any(self._alive[_EXACT]):
+            self._advance(_EXACT, self._pending + body)
+        if any(self._alive[_TRIMMED]):
+            self._advance(_TRIMMED,
+                          b'\n' * self._pending_newlines + self._pending_tail +
+                          _trim_lines(body))
+        if any(self._alive[_TOKENS]):
+            tokens = b' '.join(body.split())
+            self._advance(_TOKENS,
+                          b' ' + tokens if self._pending_whitespace
+                          else tokens)
+
+        self._pending = b''
+        self._pending_newlines = 0
+        self._pending_tail = b''
+        self._pending_whitespace = False
+        self._overflow = [False, False]
+
+    def _advance(self, level, segment):
+        length = len(segment)
+        positions = self._positions[level]
+        alive = self._alive[level]
+        for index, form in enumerate(self._forms[level]):
+            if not alive[index]:
+                continue
+            position = positions[index]
+            if form[position:position + length] == segment:
+                positions[index] = position + length
+            else:
+                alive[index] = False
+
+    def _hold_whitespace(self, whitespace):
+        if not whitespace:
+            return
+        self._pending_whitespace = True
+
+        if any(self._alive[_EXACT]) and not self._overflow[_EXACT]:
+            self._pending += whitespace
+            if len(self._pending) > self._remaining(_EXACT):
+                # It can never be matched, only remember that it was there
+                self._pending = b''
+                self._overflow[_EXACT] = True
+
+        if any(self._alive[_TRIMMED]) and not self._overflow[_TRIMMED]:
+            # Whitespace before a line break is dropped at this level, so
+            # only the line breaks and what follows the last one are kept
+            last_break = whitespace.rfind(b'\n')
+            if last_break == -1:
+                self._pending_tail += whitespace
+            else:
+                self._pending_newlines += whitespace.count(b'\n')
+                self._pending_tail = whitespace[last_break + 1:]
+            if (self._pending_newlines + len(self._pending_tail) >
+                    self._remaining(_TRIMMED)):
+                self._pending_newlines = 0
+                self._pending_tail = b''
+                self._overflow[_TRIMMED] = True
+
+    def _remaining(self, level):
+        return max([len(form) - self._positions[level][index]
+                    for index, form in enumerate(self._forms[level])
+                    if self._alive[level][index]] or [0])
+
+    def _kill(self, level):
+        self._alive[level] = [False] * len(self._alive[level])
+
+    def _translate_line_endings(self, chunk):
+        if self._line_sep == b'\n':
+            return chunk
+
+        data = self._carry + chunk
+        self._carry = b''
+        # Hold back a partial line separator split across two chunks
+        for size in range(len(self._line_sep) - 1, 0, -1):
+            if data.endswith(self._line_sep[:size]):
+                self._carry = data[-size:]
+                data = data[:-size]
+                break
+        return data.replace(self._line_sep, b'\n')
+
+
+class FloatComparator:
+    """Compares a stream of output token by token with a numeric tolerance.
+
+    Provides the same interface as StreamingComparator. Whitespace is ignored
+    so the output is either accepted or a wrong answer.
+    """
+    def __init__(self, expected_outputs,
+                 absolute_tolerance=DEFAULT_ABSOLUTE_TOLERANCE,
+                 relative_tolerance=DEFAULT_RELATIVE_TOLERANCE,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param expected_outputs: The accepted outputs as ExpectedOutput or
+                                 normalized bytes
+        :type expected_outputs: list
+        :param absolute_tolerance: Max absolute difference of a number
+        :type absolute_tolerance: float
+        :param relative_tolerance: Max difference of a number relative to the
+                                   expected number
+        :type relative_tolerance: float
+        :param batch_size: Number of tokens compared at once
+        :type batch_size: int
+        """
+        self._expected = [
+            (output if isinstance(output, ExpectedOutput)
+             else ExpectedOutput(output)).numeric
+            for output in expected_outputs]
+        self._absolute = absolute_tolerance
+        self._relative = relative_tolerance
+        self._batch_size = batch_size
+        self._positions = [0] * len(self._expected)
+        self._alive = [True] * len(self._expected)
+        self._max_token = max([MAX_TOKEN_BYTES] +
+                              [numeric.longest for numeric in self._expected])
+        self._pending = []
+        self._carry = b''
+
+    @property
+    def matching(self):
+        return any(self._alive)
+
+    @property
+    def message(self):
+        return None
+
+    def feed(self, chunk):
+        """Compares the next chunk of the users output.
+
+        :param chunk: The next chunk of output
+        :type chunk: bytes
+        :return: True while the output can still match an accepted output
+        :rtype: bool
+        """
+        data = self._carry + chunk
+        tokens = data.split()
+        self._carry = b''
+        # Hold back a token that may continue in the next chunk
+        if tokens and data[-1] not in WHITESPACE:
+            self._carry = tokens.pop()
+            if len(self._carry) > self._max_token:
+                self._alive = [False] * len(self._alive)
+
+        self._pending.extend(tokens)
+        if len(self._pending) >= self._batch_size:
+            self._compare()
+        return self.matching
+
+    def finish(self):
+        return self.classify() == enums.ProblemResponses.ACCEPTED
+
+    def classify(self):
+        """Completes the comparison and classifies the output.
+
+        :return: The AC or WA verdict of the output
+        :rtype: str
+        """
+        if self._carry:
+            self._pending.append(self._carry)
+            self._carry = b''
+        self._compare()
+        for index, numeric in enumerate(self._expected):
+            if self._alive[index] and self._positions[index] == len(numeric):
+                return enums.ProblemResponses.ACCEPTED
+        return enums.ProblemResponses.WRONG_ANSWER
+
+    def _compare(self):
+        tokens, self._pending = self._pending, []
+        if not tokens:
+            return
+        for index, numeric in enumerate(self._expected):
+            if not self._alive[index]:
+                continue
+            if numeric.matches(self._positions[index], tokens,
+                               self._absolute, self._relative):
+                self._positions[index] += len(tokens)
+            else:
+                self._alive[index] = False
+
+
+def _parse_number(token):
+    if _NUMBER.match(token) is None:
+        return None
+    value = float(token)
+    return value if math.isfinite(value) else None
+
+
+def _trim_lines(output):
+    return _TRAILING_WHITESPACE.sub(b'\n', output)
@@ -3,11 +3,14 @@
 This module acts as the main entry point for users to interact with the
 application.
 """
+import json
+
 from flask import Blueprint, jsonify, current_app, request, Response, redirect
 from flask import url_for
-from extended_uva_judge import errors, enums, utilities, languages, problems
+from extended_uva_judge import batches, errors, enums, languages, listing, \
+    problems, jobs, rejudge, verdicts
 from extended_uva_judge.objects import ProblemWorkerFactory, \
-    ProblemResponseBuilder
+    ProblemResponseBuilder, Submission
 
 
 MOD = Blueprint('api', __name__, url_prefix='/api/v1')
@@ -23,17 +26,178 @@ def test(problem_id, lang):
     output = _validate_submission_request(problem_id, lang)
 
     if output is None:
-        is_debug = request.args.get('debug', False)
-        with ProblemWorkerFactory.create_worker(lang,
-                                                problem_id,
-                                                is_debug) as worker:
-            output = worker.test(request)
+        is_debug = _get_debug()
+        full_report = _get_full_report()
+        submission = Submission.from_request(request)
+
+        cache = verdicts.get_verdict_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = _build_verdict_cache_key(
+                problem_id, lang, submission, is_debug, full_report)
+            if not _bypass_verdict_cache():
+                output = cache.get(cache_key)
+
+        if output is None:
+            with ProblemWorkerFactory.create_worker(lang,
+                                                    problem_id,
+                                                    is_debug,
+                                                    full_report) as worker:
+                output = worker.test(submission)
+            if cache is not None:
+                cache.put(cache_key, output)
 
     return Response(output.build_response(),
                     status=200 if output.code != 'SE' else 400,
                     mimetype='application/json')
 
 
+@MOD.route('/problem/<problem_id>/<lang>/submit', methods=['POST'])
+def submit(problem_id, lang):
+    """Entry point for users to queue code for testing
+
+    Responds immediately with the job identifier. The verdict can be retrieved
+    from the jobs endpoint once the job is complete.
+
+    :param problem_id: Problem identifier that the submission aims to solve
+    :param lang: Language the submission is in.
+    """
+    output = _validate_submission_request(problem_id, lang)
+    if output is not None:
+        return Response(output.build_response(), status=400,
+                        mimetype='application/json')
+
+    is_debug = _get_debug()
+    try:
+        job = jobs.get_queue().submit(lang, problem_id,
+                                      Submission.from_request(request),
+                                      is_debug, _get_full_report())
+    except errors.QueueFullError:
+        output = ProblemResponseBuilder(
+            enums.ProblemResponses.SUBMISSION_ERROR,
+            'Too many queued submissions. Please try again later.')
+        return Response(output.build_response(), status=503,
+                        mimetype='application/json')
+
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('api.get_job', job_id=job.job_id)
+    return response
+
+
+@MOD.route('/batch', methods=['POST'])
+def batch():
+    """Entry point for judging many submissions in one request
+
+    Every uploaded file is a submission named by its form field, or a zip or
+    tar archive of submissions named by their path in the archive, as
+    "<problem_id>/<lang>/<filename>". The problem_id and lang query string
+    arguments supply the problem and language of names without them.
+
+    Verdicts are streamed back as newline delimited JSON in the order the
+    submissions complete.
+    """
+    config = current_app.app_config
+    reader = batches.BatchReader(
+        request.args.get('problem_id'), request.args.get('lang'),
+        int(config.get('max_batch_submissions') or
+            batches.DEFAULT_MAX_SUBMISSIONS),
+        int(config.get('max_batch_bytes') or batches.DEFAULT_MAX_BYTES))
+    try:
+        for name, user_file in request.files.items(multi=True):
+            reader.add_file(name, user_file.filename, user_file.read())
+    except errors.InvalidBatchError as e:
+        output = ProblemResponseBuilder(
+            enums.ProblemResponses.SUBMISSION_ERROR, str(e))
+        return Response(output.build_response(), status=400,
+                        mimetype='application/json')
+
+    if not reader.entries:
+        output = ProblemResponseBuilder(
+            enums.ProblemResponses.SUBMISSION_ERROR, 'File not found.')
+        return Response(output.build_response(), status=400,
+                        mimetype='application/json')
+
+    rejected = []
+    accepted = []
+    for entry in reader.entries:
+        output = _validate_batch_entry(entry)
+        if output is None:
+            accepted.append(entry)
+        else:
+            rejected.append((entry, output))
+
+    is_debug = _get_debug()
+    full_report = _get_full_report()
+
+    def _stream():
+        for entry, output in rejected:
+            yield _batch_line(entry, {
+                'problem_id': entry.problem_id,
+                'language': entry.language,
+                'status': enums.JobStatus.COMPLETE,
+                'result': output.build_response_body()
+            })
+        for entry, job in jobs.get_queue().judge_batch(accepted, is_debug,
+                                                       full_report):
+            yield _batch_line(entry, job.to_dict())
+
+    return Response(_stream(), status=200, mimetype='application/x-ndjson')
+
+
+@MOD.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Returns the status, and verdict once complete, of a queued job"""
+    job = jobs.get_queue().get(job_id)
+    if job is None:
+        return Response(json.dumps({'description': 'Job not found.'}),
+                        status=404, mimetype='application/json')
+
+    return jsonify(job.to_dict())
+
+
+@MOD.route('/problem/<problem_id>/rejudge', methods=['POST'])
+def start_rejudge(problem_id):
+    """Starts rejudging the stored submissions of a problem
+
+    Responds immediately with the rejudge identifier. The progress can be
+    followed with the rejudges endpoint.
+
+    :param problem_id: Problem identifier to rejudge
+    """
+    config = current_app.app_config
+    message = None
+    if problems.does_problem_exist(config, problem_id) is False:
+        message = 'Could not find problem configuration on this judge.'
+    else:
+        try:
+            started = rejudge.start(config, problem_id)
+        except errors.MissingConfigEntryError:
+            message = 'Submissions are not stored on this judge.'
+    if message is not None:
+        output = ProblemResponseBuilder(
+            enums.ProblemResponses.SUBMISSION_ERROR, message)
+        return Response(output.build_response(), status=400,
+                        mimetype='application/json')
+
+    response = jsonify(started.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for(
+        'api.get_rejudge', rejudge_id=started.rejudge_id)
+    return response
+
+
+@MOD.route('/rejudges/<rejudge_id>', methods=['GET'])
+def get_rejudge(rejudge_id):
+    """Returns the progress of a rejudge"""
+    started = rejudge.get(rejudge_id)
+    if started is None:
+        return Response(json.dumps({'description': 'Rejudge not found.'}),
+                        status=404, mimetype='application/json')
+
+    return jsonify(started.to_dict())
+
+
 @MOD.route('/available_problems', methods=['GET'])
 def available_problems():
     """Returns the available problems for this judge"""
@@ -48,29 +212,129 @@ def available_languages():
 
 @MOD.route('/problems', methods=['GET'])
 def get_problems():
-    """Returns the available problems for this judge"""
-    config = current_app.app_config
+    """Returns the available problems for this judge
+
+    The query string can filter the problems by a "search" text in their
+    identifier or title and by "min_time_limit" and "max_time_limit", and
+    select a "page" of "per_page" problems. Responses carry an ETag, clients
+    sending it back in If-None-Match receive a 304 until the problems change.
+    """
+    try:
+        query = _get_listing_query()
+    except ValueError as e:
+        output = ProblemResponseBuilder(
+            enums.ProblemResponses.SUBMISSION_ERROR, str(e))
+        return Response(output.build_response(), status=400,
+                        mimetype='application/json')
 
-    return jsonify({'problems': problems.get_available_problems(config)})
+    snapshot = listing.get_index(current_app.app_config).snapshot()
+    etag = snapshot.etag(query)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(snapshot.render(query), status=200,
+                            mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @MOD.route('/languages', methods=['GET'])
 def get_languages():
-    """Returns the available languages for this judge"""
-    config = current_app.app_config
-    lang_configs = config.get('languages')
-    configured_keys = list(lang_configs.keys())
+    """Returns the available languages for this judge
+
+    The response is built once at start up and may be cached by clients.
+    """
+    registry = languages.get_registry()
+    if request.if_none_match.contains(registry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(registry.body, status=200,
+                            mimetype='application/json')
+    response.set_etag(registry.etag)
+    response.headers['Cache-Control'] = 'public, max-age=%d' % int(
+        current_app.app_config.get('languages_max_age_seconds') or 0)
+    return response
+
+
+def _get_debug():
+    """Reads the debug query string flag.
+
+    :return: If the programs output is included in the verdict
+    :rtype: bool
+    """
+    value = request.args.get('debug')
+    return value is not None and value.lower() in ('1', 'true', 'yes')
+
+
+def _get_full_report():
+    """Reads the full_report query string flag.
+
+    :return: The requested report mode or None to use the configured default
+    :rtype: bool
+    """
+    value = request.args.get('full_report')
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
 
-    return jsonify({'languages': languages.get_all_languages(configured_keys)})
+def _get_listing_query():
+    """Reads the filters and page of the problem listing.
+
+    :rtype: listing.ListingQuery
+    :raises ValueError: If an argument is not a valid number
+    """
+    max_per_page = int(current_app.app_config.get(
+        'problem_listing_max_per_page') or listing.DEFAULT_MAX_PER_PAGE)
+
+    def _number(name, parse, minimum=None):
+        value = request.args.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            value = parse(value)
+        except ValueError:
+            raise ValueError('Invalid %s.' % name)
+        if minimum is not None and value < minimum:
+            raise ValueError('Invalid %s.' % name)
+        return value
+
+    per_page = _number('per_page', int, 1)
+    page = _number('page', int, 1)
+    if page is not None and per_page is None:
+        per_page = max_per_page
+    return listing.ListingQuery(
+        request.args.get('search'),
+        _number('min_time_limit', float),
+        _number('max_time_limit', float),
+        page,
+        None if per_page is None else min(per_page, max_per_page))
 
 
-def _allowed_file(filename, language):
+def _bypass_verdict_cache():
+    """Reads the cache query string flag, cache=false bypasses the cache.
+
+    :rtype: bool
+    """
+    value = request.args.get('cache')
+    return value is not None and value.lower() in ('0', 'false', 'no')
+
+
+def _build_verdict_cache_key(problem_id, lang, submission, debug,
+                             full_report):
     config = current_app.app_config
-    lang = languages.map_language(language)
-    lang_configs = config.get('languages')
-    allowed_extensions = lang_configs.get(lang, {}).get('file_extensions', [])
-    return ('.' in filename and
-            filename.rsplit('.', 1)[1].lower() in allowed_extensions)
+    if full_report is None:
+        full_report = config.get('full_report', False)
+    return verdicts.VerdictCache.build_key(
+        problems.get_problem(config, problem_id),
+        languages.map_language(lang), config, submission.content, debug,
+        full_report)
+
+
+def _batch_line(entry, body):
+    body['name'] = entry.name
+    return json.dumps(body) + '\n'
 
 
 def _validate_submission_request(problem_id, lang):
@@ -83,19 +347,48 @@ def _validate_submission_request(problem_id, lang):
     elif len(request.files) != 1:
         code = enums.ProblemResponses.SUBMISSION_ERROR
         message = 'Too many files.'
-    elif utilities.does_problem_config_exist(
+    elif problems.does_problem_exist(
             current_app.app_config, problem_id) is False:
         code = enums.ProblemResponses.SUBMISSION_ERROR
         message = 'Could not find problem configuration on this judge.'
     else:
         try:
-            for filename in request.files.keys():
-                if not _allowed_file(filename, lang):
-                    code = enums.ProblemResponses.SUBMISSION_ERROR
-                    message = 'Invalid file type.'
+            configured = languages.get_registry().find(lang)
+            if configured is None:
+                code = enums.ProblemResponses.SUBMISSION_ERROR
+                message = 'Language not configured on this judge.'
+            elif not all(configured.allows_file(filename)
+                         for filename in request.files.keys()):
+                code = enums.ProblemResponses.SUBMISSION_ERROR
+                message = 'Invalid file type.'
         except errors.UnsupportedLanguageError:
             code = enums.ProblemResponses.SUBMISSION_ERROR
             message = ('Unsupported language. Please GET ' +
                        url_for('api.get_problems'))
 
     return None if code is None else ProblemResponseBuilder(code, message)
+
+
+def _validate_batch_entry(entry):
+    message = None
+
+    if not entry.problem_id or not entry.language:
+        message = 'Missing problem or language.'
+    elif (not problems.is_valid_problem_id(entry.problem_id) or
+            problems.does_problem_exist(
+                current_app.app_config, entry.problem_id) is False):
+        message = 'Could not find problem configuration on this judge.'
+    else:
+        try:
+            configured = languages.get_registry().find(entry.language)
+            if configured is None:
+                message = 'Language not configured on this judge.'
+            elif not configured.allows_file(entry.submission.filename):
+                message = 'Invalid file type.'
+        except errors.UnsupportedLanguageError:
+            message = 'Unsupported language.'
+
+    if message is None:
+        return None
+    return ProblemResponseBuilder(enums.ProblemResponses.SUBMISSION_ERROR,
+                                  message)
@@ -44,3 +44,17 @@ class ProblemResponses:
     # Not enough details were specified during the submission for the judge to
     # take action.
     SUBMISSION_ERROR = 'SE'
+
+
+class JobStatus:
+    def __init__(self):
+        raise NotImplementedError()
+
+    # The submission is waiting for a free submission worker.
+    QUEUED = 'queued'
+
+    # The submission is currently being judged.
+    RUNNING = 'running'
+
+    # The submission has been judged and the verdict is available.
+    COMPLETE = 'complete'
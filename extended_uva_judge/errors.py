@@ -8,3 +8,23 @@ class TooManyFilesError(Exception):
 
 class UnsupportedLanguageError(Exception):
     pass
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ForkServerError(Exception):
+    pass
+
+
+class InvalidBatchError(Exception):
+    pass
+
+
+class CheckerError(Exception):
+    pass
+
+
+class InvalidPackError(Exception):
+    pass
@@ -0,0 +1,502 @@
+"""Module to assist with running users programs.
+
+This module holds the pieces of program execution that are shared between all
+problem workers regardless of the submission language.
+"""
+import errno
+import math
+import os
+import signal
+import sys
+import threading
+import time
+
+from subprocess import PIPE, Popen
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource is posix only
+    resource = None
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_STDERR_LIMIT = 64 * 1024
+DEFAULT_SEND_BYTES = 1024 * 1024
+DEFAULT_COMPILE_TIMEOUT = 30
+DEFAULT_COMPILE_OUTPUT_LIMIT = 64 * 1024
+
+# Stops until resumed, then replaces itself with the command appended to it
+_STOPPED_LAUNCHER = ['/bin/sh', '-c', 'kill -STOP $$ && exec "$@"', 'sh']
+
+_CORE_BUDGET = None
+_CORE_BUDGET_LOCK = threading.Lock()
+
+
+class CoreBudget:
+    """Limits how many users programs run at once across all submissions.
+
+    Every run of a users program holds one core from the budget for its
+    duration so a single submission with many test cases cannot starve the
+    other submissions being judged on the same machine.
+    """
+    def __init__(self, cores):
+        self._cores = cores
+        self._semaphore = threading.BoundedSemaphore(cores)
+
+    @property
+    def cores(self):
+        return self._cores
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._semaphore.release()
+
+
+class ResourceLimits:
+    """Operating system limits applied to a users program.
+
+    Limits are applied with prlimit to the stopped child process before the
+    program starts, see PopenProgram. They are ignored on platforms without
+    prlimit.
+    """
+    def __init__(self, cpu_time=None, address_space=None, processes=None,
+                 file_size=None, data_size=None):
+        """
+        :param cpu_time: Max seconds of CPU time
+        :type cpu_time: float
+        :param address_space: Max bytes of virtual memory
+        :type address_space: int
+        :param processes: Max processes owned by the user running the program
+        :type processes: int
+        :param file_size: Max bytes of any file the program writes
+        :type file_size: int
+        :param data_size: Max bytes of heap and other private writable memory
+        :type data_size: int
+        """
+        self.cpu_time = cpu_time
+        self.address_space = address_space
+        self.processes = processes
+        self.file_size = file_size
+        self.data_size = data_size
+
+    @property
+    def supported(self):
+        return resource is not None and hasattr(resource, 'prlimit')
+
+    def to_dict(self):
+        return {
+            'cpu_time': self.cpu_time,
+            'address_space': self.address_space,
+            'processes': self.processes,
+            'file_size': self.file_size,
+            'data_size': self.data_size
+        }
+
+    def apply_to(self, pid):
+        """Applies the limits to another process.
+
+        :param pid: The process identifier
+        :type pid: int
+        """
+        if self.cpu_time is not None:
+            # The soft limit sends SIGXCPU, the hard limit SIGKILL a second
+            # later in case the program handles SIGXCPU.
+            seconds = int(math.ceil(self.cpu_time))
+            resource.prlimit(pid, resource.RLIMIT_CPU, (seconds, seconds + 1))
+        for limit, value in ((resource.RLIMIT_AS, self.address_space),
+                             (resource.RLIMIT_NPROC, self.processes),
+                             (resource.RLIMIT_FSIZE, self.file_size),
+                             (resource.RLIMIT_DATA, self.data_size)):
+            if value is not None:
+                resource.prlimit(pid, limit, (value, value))
+
+
+class ProcessResult:
+    """The outcome of running a users program."""
+    def __init__(self):
+        self.return_code = None
+        self.stdout = None
+        self.stderr = b''
+        self.output_bytes = 0
+        self.timed_out = False
+        self.output_limit_exceeded = False
+        self.aborted = False
+        self.wall_time = None
+        self.cpu_user = None
+        self.cpu_sys = None
+        self.peak_rss = None
+
+    @property
+    def cpu_time(self):
+        """Total user and system CPU seconds if they were measured.
+
+        :rtype: float
+        """
+        if self.cpu_user is None:
+            return None
+        return self.cpu_user + self.cpu_sys
+
+    @property
+    def cpu_limit_exceeded(self):
+        """True if the program was killed for exceeding its CPU time limit.
+
+        :rtype: bool
+        """
+        return (hasattr(signal, 'SIGXCPU') and
+                self.return_code == -signal.SIGXCPU)
+
+
+class PopenProgram:
+    """A users program started as a regular child process.
+
+    Programs expose their standard streams as stdin, stdout and stderr, can
+    be killed from any thread and are reaped with wait. Alternative launchers
+    passed to run_process must provide the same interface.
+
+    Forking with a preexec_fn is not safe while other threads run, so limited
+    programs are started through a shell that stops itself. The limits are
+    applied to the stopped shell, which then replaces itself with the
+    program.
+
+    Programs run in a session of their own so killing them also kills any
+    process they started, such as the compiler passes started by gcc.
+
+    A child inherits the peak resident memory of the judge it is forked from
+    as its own, so the peak is only recorded when it is above the peak of the
+    judge. Start programs with forkserver.get_program_pool to always measure
+    it.
+    """
+    def __init__(self, command, limits=None, pass_fds=(), cwd=None):
+        self._lock = threading.Lock()
+        self._exit_status = None
+        if limits is None or not limits.supported:
+            self._process = Popen(command, stdout=PIPE, stdin=PIPE,
+                                  stderr=PIPE, pass_fds=pass_fds, cwd=cwd,
+                                  start_new_session=True)
+        else:
+            self._process = Popen(_STOPPED_LAUNCHER + list(command),
+                                  stdout=PIPE, stdin=PIPE, stderr=PIPE,
+                                  pass_fds=pass_fds, cwd=cwd,
+                                  start_new_session=True)
+            self._start_limited(limits)
+        self._inherited_rss = _own_peak_rss()
+        self.stdin = self._process.stdin
+        self.stdout = self._process.stdout
+        self.stderr = self._process.stderr
+
+    def _start_limited(self, limits):
+        pid = self._process.pid
+        _, status = os.waitpid(pid, os.WUNTRACED)
+        if not os.WIFSTOPPED(status):
+            # The shell died before stopping, keep its status for wait
+            self._exit_status = status
+            return
+        try:
+            limits.apply_to(pid)
+        except OSError:
+            self._process.kill()
+            raise
+        finally:
+            os.kill(pid, signal.SIGCONT)
+
+    def kill(self):
+        """Kills the program if it is still running.
+
+        :return: True if the program was still running
+        :rtype: bool
+        """
+        with self._lock:
+            if self._process.returncode is not None:
+                return False
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(self._process.pid, signal.SIGKILL)
+                else:
+                    self._process.kill()
+            except OSError:
+                return False
+            return True
+
+    def wait(self, result):
+        """Waits for the program, collecting its resource usage if possible.
+
+        :param result: The result to record the exit code and usage in
+        :type result: ProcessResult
+        """
+        p = self._process
+        if p.returncode is not None:
+            return
+        if self._exit_status is not None:
+            with self._lock:
+                p.returncode = decode_wait_status(self._exit_status)
+            result.return_code = p.returncode
+            return
+        if not hasattr(os, 'wait4'):
+            result.return_code = p.wait()
+            return
+
+        _, status, usage = os.wait4(p.pid, 0)
+        with self._lock:
+            p.returncode = decode_wait_status(status)
+        result.return_code = p.returncode
+        record_usage(result, usage.ru_utime, usage.ru_stime, usage.ru_maxrss)
+        if (self._inherited_rss is not None and
+                usage.ru_maxrss <= self._inherited_rss):
+            # Possibly the peak of the judge rather than the program
+            result.peak_rss = None
+
+
+def _own_peak_rss():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def decode_wait_status(status):
+    """Converts a wait status to a Popen style return code.
+
+    :param status: The status reported by wait
+    :type status: int
+    :return: The exit code, or the negated signal that killed the process
+    :rtype: int
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def record_usage(result, cpu_user, cpu_sys, max_rss):
+    """Records resource usage reported by wait4 in the result.
+
+    :param result: The result to record the usage in
+    :type result: ProcessResult
+    :param cpu_user: Seconds of user CPU time (ru_utime)
+    :type cpu_user: float
+    :param cpu_sys: Seconds of system CPU time (ru_stime)
+    :type cpu_sys: float
+    :param max_rss: The peak resident set size (ru_maxrss)
+    :type max_rss: int
+    """
+    result.cpu_user = cpu_user
+    result.cpu_sys = cpu_sys
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    result.peak_rss = max_rss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run_process(command, stdin_data=None, stdin_file=None, timeout=None,
+                stdout_consumer=None, capture_stdout=False,
+                output_limit=None, stderr_limit=DEFAULT_STDERR_LIMIT,
+                limits=None, launcher=None, pass_fds=(), cwd=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """Runs the command, streaming its standard output to a consumer.
+
+    Standard output is read in chunks and handed to the consumer as it is
+    produced instead of being buffered. When the consumer returns False the
+    process is killed and the result is flagged as aborted. The process is
+    also killed as soon as it writes more than output_limit bytes to standard
+    output. Only the first stderr_limit bytes of standard error are kept.
+
+    Where supported the wall time, CPU time and peak resident memory of the
+    process are measured with wait4, see PopenProgram for the limits of the
+    peak memory of programs started by the judge.
+
+    :param command: the command to execute
+    :type command: list
+    :param stdin_data: standard in inputs to provide to the running command
+    :type stdin_data: bytes
+    :param stdin_file: File whose first length bytes are sent to standard in
+                       instead of stdin_data, with sendfile where supported
+    :type stdin_file: problems.InputFile
+    :param timeout: Time limit in which to kill the app in seconds.
+    :type timeout: float
+    :param stdout_consumer: Callable receiving each chunk of standard output
+    :type stdout_consumer: callable
+    :param capture_stdout: Keep a copy of the standard output in the result
+    :type capture_stdout: bool
+    :param output_limit: Max bytes the command may write to standard output
+    :type output_limit: int
+    :param stderr_limit: Max bytes of standard error kept in the result
+    :type stderr_limit: int
+    :param limits: Operating system limits to apply to the process
+    :type limits: ResourceLimits
+    :param launcher: Callable starting the program from the command, limits,
+                     pass_fds and cwd. Defaults to PopenProgram.
+    :type launcher: callable
+    :param pass_fds: File descriptors kept open, at the same numbers, in the
+                     process
+    :type pass_fds: tuple
+    :param cwd: The working directory of the process, defaults to the
+                working directory of the judge
+    :type cwd: str
+    :param chunk_size: Max bytes read from standard output at a time
+    :type chunk_size: int
+
+    :return: The outcome of the run
+    :rtype: ProcessResult
+    """
+    result = ProcessResult()
+    captured = [] if capture_stdout else None
+    stderr_chunks = []
+
+    program = (launcher or PopenProgram)(command, limits, pass_fds, cwd)
+    started = time.monotonic()
+
+    def _kill(timed_out=False):
+        if program.kill() and timed_out:
+            result.timed_out = True
+
+    threads = [
+        threading.Thread(target=_write_stdin,
+                         args=(program.stdin, stdin_data, stdin_file)),
+        threading.Thread(target=_read_limited,
+                         args=(program.stderr, stderr_chunks, stderr_limit))
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, _kill, kwargs={'timed_out': True})
+        timer.daemon = True
+        timer.start()
+
+    try:
+        while True:
+            chunk = program.stdout.read1(chunk_size)
+            if not chunk:
+                break
+            result.output_bytes += len(chunk)
+            if output_limit is not None and result.output_bytes > output_limit:
+                result.output_limit_exceeded = True
+                _kill()
+                break
+            if captured is not None:
+                captured.append(chunk)
+            if stdout_consumer is not None and not result.aborted:
+                if stdout_consumer(chunk) is False:
+                    result.aborted = True
+                    _kill()
+        program.stdout.close()
+        program.wait(result)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if result.return_code is None:
+            _kill()
+            program.wait(result)
+    result.wall_time = time.monotonic() - started
+
+    for thread in threads:
+        thread.join()
+
+    result.stderr = b''.join(stderr_chunks)
+    if captured is not None:
+        result.stdout = b''.join(captured)
+    return result
+
+
+def _write_stdin(stream, data, source=None):
+    try:
+        if source is not None:
+            _send_file(stream, source)
+        elif data:
+            stream.write(data)
+    except (BrokenPipeError, OSError):
+        # The program exited without reading all of its input
+        pass
+    finally:
+        try:
+            stream.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+
+def _send_file(stream, source):
+    """Sends the input file to the program without reading it into memory.
+
+    The file is read at explicit offsets since its descriptor is shared by
+    every run of the test case.
+    """
+    stream.flush()
+    out_fd = stream.fileno()
+    in_fd = source.fileno()
+    offset = 0
+    use_sendfile = hasattr(os, 'sendfile')
+    while offset < source.length:
+        count = min(source.length - offset, DEFAULT_SEND_BYTES)
+        if use_sendfile:
+            try:
+                sent = os.sendfile(out_fd, in_fd, offset, count)
+            except OSError as e:
+                # Some platforms can not send a file to a pipe
+                if e.errno not in (errno.EINVAL, errno.ENOSYS) or offset:
+                    raise
+                use_sendfile = False
+                continue
+        else:
+            sent = os.write(out_fd, os.pread(in_fd, count, offset))
+        if not sent:
+            break
+        offset += sent
+
+
+def _read_limited(stream, chunks, limit):
+    kept = 0
+    for chunk in iter(lambda: stream.read1(DEFAULT_CHUNK_SIZE), b''):
+        # Keep draining past the limit so the program never blocks on a pipe
+        if limit is None or kept < limit:
+            chunk = chunk if limit is None else chunk[:limit - kept]
+            chunks.append(chunk)
+            kept += len(chunk)
+    stream.close()
+
+
+def get_compile_limits(app_config, language=None):
+    """Reads the limits the compile commands of a language run within.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param language: The language compiled, its memory is not limited if its
+                     runtime reserves far more address space than it uses
+    :type language: languages.Language
+    :return: The timeout in seconds, the max bytes of compiler output and the
+             resource limits of the compiler
+    :rtype: tuple
+    """
+    settings = app_config.get('compile_limits') or {}
+    timeout = float(settings.get('timeout_seconds') or
+                    DEFAULT_COMPILE_TIMEOUT)
+    output_limit = int(settings.get('max_output_bytes') or
+                       DEFAULT_COMPILE_OUTPUT_LIMIT)
+    data_size = None
+    memory_limit = settings.get('memory_limit')
+    if memory_limit is not None and (language is None or
+                                     not language.reserves_address_space):
+        data_size = int(float(memory_limit) * 1024 * 1024)
+    return timeout, output_limit, ResourceLimits(cpu_time=timeout,
+                                                 data_size=data_size)
+
+
+def initialize(app_config):
+    """Creates the process wide core budget from the configuration.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _CORE_BUDGET
+    cores = app_config.get('core_budget') or os.cpu_count() or 1
+    with _CORE_BUDGET_LOCK:
+        _CORE_BUDGET = CoreBudget(int(cores))
+
+
+def get_core_budget():
+    """Gets the process wide core budget.
+
+    :rtype: CoreBudget
+    """
+    if _CORE_BUDGET is None:
+        initialize({})
+    return _CORE_BUDGET
@@ -0,0 +1,374 @@
+"""Module housing the warm interpreter pool for Python submissions.
+
+Starting a Python interpreter takes tens of milliseconds which dominates the
+run time of most submissions and counts against their time limit. When a
+language has "fork_server" enabled its runs are handed to a pool of long
+lived fork servers (see forkserver_process.py) that fork a clean child from
+an already initialized interpreter for every run. The childs resource usage
+only covers the run itself so the start up cost is not measured.
+
+The programs of all other languages are started by a pool of fork servers
+running the judges own interpreter, see get_program_pool. Programs forked
+from the judge would inherit its peak resident memory as their own, the fork
+servers are small enough for the peak of a program to be meaningful.
+
+Fork servers require a Python 3 interpreter and a platform supporting fork
+and SOCK_SEQPACKET unix sockets. When they cannot be started the workers fall
+back to starting programs as children of the judge.
+"""
+import array
+import io
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+
+from subprocess import DEVNULL, Popen
+
+from extended_uva_judge import errors, execution
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'forkserver_process.py')
+DEFAULT_POOL_SIZE = 4
+STARTUP_TIMEOUT = 10
+MAX_MESSAGE_BYTES = 65536
+
+_POOLS = {}
+_PROGRAM_POOL = None
+_POOLS_LOCK = threading.Lock()
+
+
+class ForkServer:
+    """A single fork server process and its control socket."""
+    def __init__(self, interpreter):
+        parent, child = socket.socketpair(socket.AF_UNIX,
+                                          socket.SOCK_SEQPACKET)
+        try:
+            self._process = Popen(
+                [interpreter, SERVER_SCRIPT, str(child.fileno())],
+                pass_fds=(child.fileno(),), stdin=DEVNULL, stdout=DEVNULL)
+        except BaseException:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        self._socket = parent
+        self._alive = True
+
+        self._socket.settimeout(STARTUP_TIMEOUT)
+        try:
+            ready = self.receive().get('ready')
+        except (OSError, ValueError, errors.ForkServerError):
+            ready = False
+        self._socket.settimeout(None)
+
+        if not ready:
+            self.close()
+            raise errors.ForkServerError(
+                'Fork server for %s failed to start.' % interpreter)
+
+    @property
+    def alive(self):
+        return self._alive and self._process.poll() is None
+
+    def send(self, request, fds):
+        """Sends a request along with the file descriptors for the child.
+
+        :param request: The JSON serializable request
+        :type request: dict
+        :param fds: The standard input, output and error for the child
+                    followed by any other descriptors it inherits
+        :type fds: list
+        """
+        ancillary = []
+        if fds:
+            ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                          array.array('i', fds))]
+        try:
+            self._socket.sendmsg([json.dumps(request).encode()], ancillary)
+        except OSError as e:
+            self._alive = False
+            raise errors.ForkServerError(str(e))
+
+    def receive(self):
+        """Receives the next reply from the fork server.
+
+        :rtype: dict
+        """
+        try:
+            data = self._socket.recv(MAX_MESSAGE_BYTES)
+        except OSError as e:
+            self._alive = False
+            raise errors.ForkServerError(str(e))
+        if not data:
+            self._alive = False
+            raise errors.ForkServerError('Fork server exited.')
+        return json.loads(data.decode())
+
+    def close(self):
+        self._alive = False
+        self._socket.close()
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+
+
+class ForkServerProgram:
+    """A users program started by a fork server.
+
+    Provides the same interface as execution.PopenProgram. The program leads
+    a process group of its own which is killed as a whole. The fork server
+    does not reap the program until wait has seen it exit, so its pid can not
+    be reused while it may still be killed.
+    """
+    def __init__(self, server, command, limits, release, pass_fds=(),
+                 exec_program=False, cwd=None):
+        """
+        :param exec_program: Replace the child with the command instead of
+                             running the script of the command in it
+        :type exec_program: bool
+        :param cwd: The working directory of the program, defaults to the
+                    working directory of the fork server
+        :type cwd: str
+        :param release: Called with the server once the program is reaped.
+                        Not called if the program fails to start.
+        :type release: callable
+        :raises errors.ForkServerError: If the server fails to start the
+                                        program
+        :raises OSError: If the pipes of the program can not be created
+        """
+        self._server = server
+        self._release = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._finished = False
+
+        # Read and write ends of the standard input, output and error pipes
+        fds = []
+        try:
+            for _ in range(3):
+                fds.extend(os.pipe())
+            child_fds = [fds[0], fds[3], fds[5]]
+            server.send({'argv': list(command),
+                         'limits': limits.to_dict() if limits else {},
+                         'pass_fds': list(pass_fds),
+                         'exec': exec_program,
+                         'cwd': cwd},
+                        child_fds + list(pass_fds))
+            self._pid = server.receive()['pid']
+        except BaseException:
+            for fd in fds:
+                os.close(fd)
+            raise
+        for fd in child_fds:
+            os.close(fd)
+
+        self._release = release
+        self.stdin = io.open(fds[1], 'wb')
+        self.stdout = io.open(fds[2], 'rb')
+        self.stderr = io.open(fds[4], 'rb')
+
+    def kill(self):
+        """Kills the program and any process it started if still running.
+
+        :return: True if the program was still running
+        :rtype: bool
+        """
+        with self._lock:
+            if self._finished or self._pid is None:
+                return False
+            try:
+                os.killpg(self._pid, signal.SIGKILL)
+            except OSError:
+                # The child may not have started its process group yet
+                try:
+                    os.kill(self._pid, signal.SIGKILL)
+                except OSError:
+                    return False
+            return True
+
+    def wait(self, result):
+        """Waits for the program and records its exit code and usage.
+
+        :param result: The result to record the exit code and usage in
+        :type result: execution.ProcessResult
+        """
+        if self._finished:
+            return
+        try:
+            self._server.receive()
+            # The program has exited but is not reaped, stop killing it
+            # before the fork server is allowed to reap it
+            with self._lock:
+                self._finished = True
+            self._server.send({'reap': True}, [])
+            reply = self._server.receive()
+        except errors.ForkServerError:
+            logging.getLogger().error('Fork server died while running %s.',
+                                      self._pid)
+            result.return_code = -signal.SIGKILL
+            self._finish()
+            return
+
+        result.return_code = execution.decode_wait_status(reply['status'])
+        execution.record_usage(result, reply['utime'], reply['stime'],
+                               reply['maxrss'])
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._finished = True
+            release, self._release = self._release, None
+        if release is not None:
+            release(self._server)
+
+
+class ForkServerPool:
+    """A fixed size pool of warm fork servers for one interpreter.
+
+    Each fork server performs one run at a time. Runs wait for a free fork
+    server once all of them are busy.
+    """
+    def __init__(self, interpreter, size=DEFAULT_POOL_SIZE,
+                 exec_programs=False, started=None):
+        """
+        :param interpreter: The interpreter running the fork servers
+        :type interpreter: str
+        :param size: Max fork servers, and so runs, at a time
+        :type size: int
+        :param exec_programs: Replace the children with the commands instead
+                              of running their scripts in the interpreter
+        :type exec_programs: bool
+        :param started: Fork servers started up front, the others are
+                        started when first needed. Defaults to size.
+        :type started: int
+        """
+        self._interpreter = interpreter
+        self._exec_programs = exec_programs
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.Queue()
+        for _ in range(size if started is None else min(started, size)):
+            self._idle.put(ForkServer(interpreter))
+
+    def launch(self, command, limits=None, pass_fds=(), cwd=None):
+        """Starts the program on a free fork server.
+
+        Suitable as the launcher of execution.run_process.
+
+        :param command: The interpreter followed by the script and arguments
+        :type command: list
+        :param limits: Operating system limits to apply to the program
+        :type limits: execution.ResourceLimits
+        :param pass_fds: File descriptors the program inherits at the same
+                         numbers
+        :type pass_fds: tuple
+        :param cwd: The working directory of the program
+        :type cwd: str
+        :rtype: ForkServerProgram
+        :raises errors.ForkServerError: If no fork server could start the
+                                        program
+        :raises OSError: If the pipes of the program can not be created
+        """
+        self._slots.acquire()
+        server = None
+        try:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if server is not None and not server.alive:
+                server.close()
+                server = None
+            if server is None:
+                server = ForkServer(self._interpreter)
+            return ForkServerProgram(server, command, limits, self._release,
+                                     pass_fds, self._exec_programs, cwd)
+        except BaseException:
+            # The program never started, so it will not release the slot
+            if server is None:
+                self._slots.release()
+            else:
+                self._release(server)
+            raise
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _release(self, server):
+        if server.alive:
+            self._idle.put(server)
+        else:
+            server.close()
+        self._slots.release()
+
+
+def initialize(app_config):
+    """Starts the fork server pools of the languages that enable them.
+
+    Also starts the pool starting the programs of the other languages, with
+    one fork server for every core of the core budget.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _PROGRAM_POOL
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+        if _PROGRAM_POOL is not None:
+            _PROGRAM_POOL.close()
+            _PROGRAM_POOL = None
+
+        try:
+            _PROGRAM_POOL = ForkServerPool(
+                sys.executable, execution.get_core_budget().cores,
+                exec_programs=True, started=1)
+        except (OSError, AttributeError, errors.ForkServerError):
+            logging.getLogger().warning(
+                'Fork servers for programs could not be started. Programs '
+                'are started by the judge and their peak memory is only '
+                'known when above the peak of the judge.', exc_info=True)
+
+        for language, details in (app_config.get('languages') or {}).items():
+            details = details or {}
+            interpreter = details.get('compiler')
+            if not details.get('fork_server') or not interpreter:
+                continue
+            if interpreter in _POOLS:
+                continue
+            try:
+                _POOLS[interpreter] = ForkServerPool(
+                    interpreter,
+                    int(details.get('fork_server_pool_size') or
+                        DEFAULT_POOL_SIZE))
+            except (OSError, AttributeError, errors.ForkServerError):
+                logging.getLogger().warning(
+                    'Fork servers for %s could not be started. Falling back '
+                    'to a new interpreter per run.', language, exc_info=True)
+
+
+def get_pool(interpreter):
+    """Gets the fork server pool of the interpreter.
+
+    :return: The pool or None if the interpreter does not use fork servers
+    :rtype: ForkServerPool
+    """
+    return _POOLS.get(interpreter)
+
+
+def get_program_pool():
+    """Gets the pool starting the programs of languages without their own.
+
+    :return: The pool or None if fork servers are unavailable
+    :rtype: ForkServerPool
+    """
+    return _PROGRAM_POOL
@@ -0,0 +1,171 @@
+"""Fork server process for Python submissions.
+
+This script is started by extended_uva_judge.forkserver with the interpreter
+configured for a language. It pays the interpreter start up cost once and then
+forks a fresh child for every run it is asked to perform. It runs outside of
+the judge so it must only depend on the standard library, and it keeps its
+imports to a minimum since they are visible to the submissions it runs.
+
+Requests flagged "exec" replace the child with the requested command instead.
+The judge starts the programs of every language this way since a child
+inherits the peak resident memory of the process it is forked from, and this
+server is far smaller than the judge.
+
+Requests arrive over a SOCK_SEQPACKET socket as JSON together with the file
+descriptors to use as the childs standard input, output and error, followed
+by any descriptors the child inherits at the numbers listed in the request
+under "pass_fds". The child runs in the directory named by "cwd". The server
+replies with the pid of the child, which leads a process group of its own,
+and once the child exits with "exited". The child is only reaped once the
+judge acknowledges that, so the judge can kill the process group without
+ever hitting a reused pid. The server then replies with the wait status and
+resource usage of the child.
+"""
+import array
+import json
+import os
+import resource
+import runpy
+import socket
+import sys
+import traceback
+
+MAX_MESSAGE_BYTES = 65536
+MAX_FDS = 16
+
+
+def _apply_limits(limits):
+    if limits.get('cpu_time') is not None:
+        seconds = int(-(-limits['cpu_time'] // 1))
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    for key, name in (('address_space', 'RLIMIT_AS'),
+                      ('processes', 'RLIMIT_NPROC'),
+                      ('file_size', 'RLIMIT_FSIZE'),
+                      ('data_size', 'RLIMIT_DATA')):
+        if limits.get(key) is not None:
+            limit = int(limits[key])
+            resource.setrlimit(getattr(resource, name), (limit, limit))
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    sys.stderr.write('%s\n' % code)
+    return 1
+
+
+def _run_child(request, fds):
+    import fcntl
+
+    pass_fds = request.get('pass_fds') or []
+    targets = list(range(len(fds) - len(pass_fds))) + pass_fds
+    # Move every descriptor above all of the targets first so none of them
+    # is overwritten before it has been placed
+    floor = max(targets + fds) + 1
+    moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, floor) for fd in fds]
+    for fd in fds:
+        os.close(fd)
+    for target, fd in zip(targets, moved):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.setsid()
+    if request.get('cwd'):
+        try:
+            os.chdir(request['cwd'])
+        except OSError as e:
+            os.write(2, ('%s: %s\n' % (request['cwd'], e.strerror)).encode())
+            os._exit(127)
+    _apply_limits(request.get('limits') or {})
+
+    if request.get('exec'):
+        argv = request['argv']
+        try:
+            os.execvp(argv[0], argv)
+        except OSError as e:
+            os.write(2, ('%s: %s\n' % (argv[0], e.strerror)).encode())
+        os._exit(127)
+
+    script = request['argv'][1]
+    sys.argv = request['argv'][1:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    code = 0
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        code = _exit_code(e.code)
+    except BaseException:
+        # Hide the frames of this server so the trace matches a normal run
+        error_type, error, trace = sys.exc_info()
+        script_path = os.path.abspath(script)
+        while (trace is not None and os.path.abspath(
+                trace.tb_frame.f_code.co_filename) != script_path):
+            trace = trace.tb_next
+        traceback.print_exception(error_type, error, trace)
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    os._exit(code)
+
+
+def _receive(sock):
+    fds = array.array('i')
+    msg, ancdata, _, _ = sock.recvmsg(
+        MAX_MESSAGE_BYTES, socket.CMSG_SPACE(MAX_FDS * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    return msg, list(fds)
+
+
+def _send(sock, body):
+    sock.send(json.dumps(body).encode())
+
+
+def main():
+    fd = int(sys.argv[1])
+    sock = socket.fromfd(fd, socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    os.close(fd)
+    _send(sock, {'ready': True})
+
+    while True:
+        msg, fds = _receive(sock)
+        if not msg:
+            # The judge has gone away
+            break
+
+        request = json.loads(msg.decode())
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            _run_child(request, fds)
+
+        for child_fd in fds:
+            os.close(child_fd)
+        _send(sock, {'pid': pid})
+
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        _send(sock, {'exited': True})
+        msg, fds = _receive(sock)
+        for child_fd in fds:
+            os.close(child_fd)
+
+        _, status, usage = os.wait4(pid, 0)
+        if not msg:
+            break
+        _send(sock, {
+            'status': status,
+            'utime': usage.ru_utime,
+            'stime': usage.ru_stime,
+            'maxrss': usage.ru_maxrss
+        })
+
+
+if __name__ == '__main__':
+    main()
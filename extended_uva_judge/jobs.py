@@ -0,0 +1,236 @@
+"""Module housing the asynchronous submission queue.
+
+Submissions posted to the submit endpoint are judged by a bounded pool of
+submission workers instead of inside the http request thread. Each submission
+is tracked as a job that can be polled for its status and verdict.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from extended_uva_judge import enums, errors
+from extended_uva_judge.objects import ProblemWorkerFactory, \
+    ProblemResponseBuilder
+
+DEFAULT_MAX_SUBMISSION_WORKERS = 10
+DEFAULT_MAX_QUEUED_SUBMISSIONS = 100
+DEFAULT_MAX_RETAINED_JOBS = 1000
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+class Job:
+    """A submission tracked by the submission queue."""
+    def __init__(self, problem_id, language, debug, full_report=None):
+        self._job_id = uuid.uuid4().hex
+        self._problem_id = problem_id
+        self._language = language
+        self._debug = debug
+        self._full_report = full_report
+        self._status = enums.JobStatus.QUEUED
+        self._result = None
+        self._submitted = time.time()
+        self._started = None
+        self._finished = None
+
+    @property
+    def job_id(self):
+        return self._job_id
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def result(self):
+        """The verdict of the job if it has completed, None otherwise.
+
+        :rtype: ProblemResponseBuilder
+        """
+        return self._result
+
+    def run(self, submission):
+        """Judges the submission and records the verdict.
+
+        :param submission: The users submission
+        :type submission: extended_uva_judge.objects.Submission
+        """
+        self._status = enums.JobStatus.RUNNING
+        self._started = time.time()
+        try:
+            with ProblemWorkerFactory.create_worker(
+                    self._language, self._problem_id, self._debug,
+                    self._full_report) as worker:
+                result = worker.test(submission)
+        except Exception:
+            logging.getLogger().exception('Failed to judge job %s.',
+                                          self._job_id)
+            result = ProblemResponseBuilder(
+                enums.ProblemResponses.SUBMISSION_ERROR,
+                description='The judge failed to process the submission.')
+        self._result = result
+        self._finished = time.time()
+        self._status = enums.JobStatus.COMPLETE
+
+    def to_dict(self):
+        body = {
+            'job_id': self._job_id,
+            'problem_id': self._problem_id,
+            'language': self._language,
+            'status': self._status,
+            'submitted': self._submitted,
+            'started': self._started,
+            'finished': self._finished
+        }
+        if self._result is not None:
+            body['result'] = self._result.build_response_body()
+        return body
+
+
+class SubmissionQueue:
+    """Bounded pool of submission workers and the jobs they process."""
+    def __init__(self, max_workers=DEFAULT_MAX_SUBMISSION_WORKERS,
+                 max_queued=DEFAULT_MAX_QUEUED_SUBMISSIONS,
+                 max_retained=DEFAULT_MAX_RETAINED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._max_workers = max_workers
+        self._max_queued = max_queued
+        self._max_retained = max_retained
+        self._pending = 0
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def submit(self, language, problem_id, submission, debug=False,
+               full_report=None):
+        """Queues the submission for judging.
+
+        :param language: Language the submission is in.
+        :type language: str
+        :param problem_id: Problem identifier that the submission aims to solve
+        :type problem_id: str
+        :param submission: The users submission
+        :type submission: extended_uva_judge.objects.Submission
+        :param debug: Include the programs output in the verdict
+        :type debug: bool
+        :param full_report: Run every test case instead of stopping at the
+                            first failure. None uses the configured default.
+        :type full_report: bool
+
+        :return: The queued job
+        :rtype: Job
+        :raises errors.QueueFullError: If too many submissions are waiting
+        """
+        job = Job(problem_id, language, debug, full_report)
+        with self._lock:
+            if self._pending >= self._max_queued:
+                raise errors.QueueFullError(self._max_queued)
+            self._pending += 1
+            self._jobs[job.job_id] = job
+            self._trim_jobs()
+
+        future = self._executor.submit(job.run, submission)
+        future.add_done_callback(self._job_done)
+        return job
+
+    def judge_batch(self, entries, debug=False, full_report=None):
+        """Judges many submissions, yielding each as soon as it completes.
+
+        Batch jobs share the submission workers but are not retained for
+        polling. At most max_workers of them are handed to the workers at a
+        time so queued submissions are not starved by a large batch.
+
+        :param entries: The submissions to judge
+        :type entries: iterable of extended_uva_judge.batches.BatchEntry
+        :param debug: Include the programs output in the verdicts
+        :type debug: bool
+        :param full_report: Run every test case instead of stopping at the
+                            first failure. None uses the configured default.
+        :type full_report: bool
+
+        :return: Tuples of the entry and its completed job in completion order
+        :rtype: generator
+        """
+        entries = iter(entries)
+        running = {}
+        try:
+            while True:
+                for entry in entries:
+                    job = Job(entry.problem_id, entry.language, debug,
+                              full_report)
+                    future = self._executor.submit(job.run, entry.submission)
+                    running[future] = (entry, job)
+                    if len(running) >= self._max_workers:
+                        break
+                if not running:
+                    return
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield running.pop(future)
+        finally:
+            # Drop the submissions not yet started if iteration stops early
+            for future in running:
+                future.cancel()
+
+    def get(self, job_id):
+        """Gets the job with the specified identifier.
+
+        :return: The job or None if it is unknown or has been discarded
+        :rtype: Job
+        """
+        return self._jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _job_done(self, _):
+        with self._lock:
+            self._pending -= 1
+
+    def _trim_jobs(self):
+        # Discard the oldest completed jobs once the retention limit is hit
+        excess = len(self._jobs) - self._max_retained
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs.keys()):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status == enums.JobStatus.COMPLETE:
+                del self._jobs[job_id]
+                excess -= 1
+
+
+def initialize(app_config):
+    """Creates the process wide submission queue from the configuration.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is not None:
+            _QUEUE.shutdown(wait=False)
+        _QUEUE = SubmissionQueue(
+            max_workers=int(app_config.get(
+                'max_submission_workers') or DEFAULT_MAX_SUBMISSION_WORKERS),
+            max_queued=int(app_config.get(
+                'max_queued_submissions') or DEFAULT_MAX_QUEUED_SUBMISSIONS),
+            max_retained=int(app_config.get(
+                'max_retained_jobs') or DEFAULT_MAX_RETAINED_JOBS))
+
+
+def get_queue():
+    """Gets the process wide submission queue.
+
+    :rtype: SubmissionQueue
+    """
+    return _QUEUE
@@ -4,37 +4,402 @@ This module is to assist with mapping the problems submission language to a
 language we can standardize against for the Judge code. For example: a user
 could make a submission with "python", "py2" or "python2" as the language and
 the judge will use "python2" as the submission language in dependent code.
+
+The registry of the configured languages is built once at start up so
+validating and dispatching a submission are plain dictionary lookups. Every
+entry under "languages" in the config is a language, accepted by its name and
+the abbreviations listed under "aliases". Languages without a compiler and
+without a "run_command" of their own are known but not offered.
+
+Compiled languages are declared by their commands. "compile_command" lists
+the commands building the program, "run_command" the command running it and
+"artifact" names the program the compile commands produce. The templates may
+use the following placeholders:
+
+* {source}: The path of the submitted source file.
+* {name}: The file name of the source without its extension.
+* {directory}: The work directory holding the source.
+* {artifact}: The path of the compiled program.
+* {compiler}: The configured compiler.
+* {compiler_args}: The configured compiler arguments, as separate arguments.
+* {toolchain}: The directory holding the compiler, for tools shipped with it.
+
+Languages without their own commands or aliases use the defaults below.
 """
+import hashlib
+import json
+import os
+import shutil
+import threading
+
 import extended_uva_judge.errors as errors
 
 PYTHON2 = 'python2'
 PYTHON3 = 'python3'
 C_SHARP = 'c_sharp'
 JAVA = 'java'
+C = 'c'
+CPP = 'cpp'
 
-_LANG_MAP = {
-    PYTHON2: PYTHON2,
-    'python': PYTHON2,
-    'py2': PYTHON2,
-    PYTHON3: PYTHON3,
-    'py3': PYTHON3,
-    C_SHARP: C_SHARP,
-    'csharp': C_SHARP,
-    'cs': C_SHARP,
-    JAVA: JAVA
+_DEFAULT_ALIASES = {
+    PYTHON2: ['python', 'py2'],
+    PYTHON3: ['py3'],
+    C_SHARP: ['csharp', 'cs'],
+    CPP: ['c++', 'cxx']
 }
 
+_DEFAULT_COMMANDS = {
+    C_SHARP: {
+        'compile_command': [['{compiler}', '/out:{artifact}',
+                             '{compiler_args}', '{source}']],
+        'artifact': '{name}.exe',
+        'run_command': ['{artifact}'],
+        'reserves_address_space': True
+    },
+    # Classes are packed into a single jar so nested classes are cached and
+    # run together with the class named after the source file. The JVM is
+    # tuned for short runs: a serial collector and only the fast JIT tier.
+    JAVA: {
+        'compile_command': [
+            ['{compiler}', '{compiler_args}', '-d', '{directory}/classes',
+             '{source}'],
+            ['{toolchain}/jar', 'cf', '{artifact}', '-C',
+             '{directory}/classes', '.']],
+        'artifact': '{name}.jar',
+        'run_command': ['{toolchain}/java', '-XX:+UseSerialGC',
+                        '-XX:TieredStopAtLevel=1', '-Xss64m', '-cp',
+                        '{artifact}', '{name}'],
+        'jvm_warmup': True,
+        'reserves_address_space': True,
+        'warmup_command': ['{toolchain}/java', '-XX:+UseSerialGC',
+                           '-XX:TieredStopAtLevel=1', '-version']
+    },
+    C: {
+        'compile_command': [['{compiler}', '{compiler_args}', '-o',
+                             '{artifact}', '{source}', '-lm']],
+        'artifact': '{name}',
+        'run_command': ['{artifact}']
+    },
+    CPP: {
+        'compile_command': [['{compiler}', '{compiler_args}', '-o',
+                             '{artifact}', '{source}']],
+        'artifact': '{name}',
+        'run_command': ['{artifact}']
+    }
+}
+
+# The built in languages, known before the registry is built
+_BUILT_IN_ALIASES = dict(
+    [(name, name) for name in set(_DEFAULT_COMMANDS) | set(_DEFAULT_ALIASES)] +
+    [(alias, name) for name, aliases in _DEFAULT_ALIASES.items()
+     for alias in aliases])
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+class Language:
+    """A configured language and everything needed to judge it."""
+    def __init__(self, name, aliases, extensions, compiler=None,
+                 compiler_args=None, scanner=None, worker_class=None,
+                 compile_command=None, run_command=None, artifact=None,
+                 jvm_warmup=False, warmup_command=None,
+                 startup_allowance=None, reserves_address_space=False,
+                 available=True):
+        """
+        :param name: The standardized language
+        :type name: str
+        :param aliases: Every accepted abbreviation of the language
+        :type aliases: list
+        :param extensions: The accepted file extensions, without the dot
+        :type extensions: list
+        :param compiler: The path of the compiler / interpreter
+        :type compiler: str
+        :param compiler_args: The configured compiler arguments
+        :type compiler_args: list
+        :param scanner: The restricted construct scanner of the language
+        :type scanner: scanning.RestrictedScanner
+        :param worker_class: The problem worker judging the language
+        :type worker_class: type
+        :param compile_command: Templates of the commands compiling a source
+        :type compile_command: list
+        :param run_command: Template of the command running the program
+        :type run_command: list
+        :param artifact: Template of the name of the compiled program
+        :type artifact: str
+        :param jvm_warmup: If the runtime is started once at start up to
+                           measure its start up time
+        :type jvm_warmup: bool
+        :param warmup_command: Template of the command starting the runtime
+        :type warmup_command: list
+        :param startup_allowance: Seconds of CPU time granted to every run on
+                                  top of the time limit
+        :type startup_allowance: float
+        :param reserves_address_space: If the runtime reserves far more
+                                       memory than it uses, so the memory
+                                       limit is only checked after the run
+        :type reserves_address_space: bool
+        :param available: If the language is configured well enough to judge
+                          submissions
+        :type available: bool
+        """
+        self._name = name
+        self._aliases = aliases
+        self._extensions = frozenset(
+            extension.lower() for extension in extensions or [])
+        self._compiler = compiler
+        self._compiler_args = compiler_args
+        self._scanner = scanner
+        self._worker_class = worker_class
+        if compile_command and isinstance(compile_command[0], str):
+            compile_command = [compile_command]
+        self._compile_command = compile_command or []
+        self._run_command = run_command
+        self._artifact = artifact
+        self._jvm_warmup = bool(jvm_warmup)
+        self._warmup_command = warmup_command
+        self._startup_allowance = float(startup_allowance or 0)
+        self._reserves_address_space = bool(reserves_address_space)
+        self._available = bool(available)
+        self._toolchain = None
+        if compiler:
+            located = shutil.which(compiler) or compiler
+            self._toolchain = os.path.dirname(os.path.realpath(located))
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def aliases(self):
+        return self._aliases
+
+    @property
+    def extensions(self):
+        """The accepted file extensions in lower case.
+
+        :rtype: frozenset
+        """
+        return self._extensions
+
+    @property
+    def compiler(self):
+        return self._compiler
+
+    @property
+    def compiler_args(self):
+        return self._compiler_args
+
+    @property
+    def scanner(self):
+        return self._scanner
+
+    @property
+    def worker_class(self):
+        return self._worker_class
+
+    @property
+    def run_command(self):
+        return self._run_command
+
+    @property
+    def jvm_warmup(self):
+        return self._jvm_warmup
+
+    @property
+    def reserves_address_space(self):
+        return self._reserves_address_space
+
+    @property
+    def available(self):
+        return self._available
+
+    @property
+    def startup_allowance(self):
+        """Seconds of CPU time granted to every run for the runtime to start.
+
+        :rtype: float
+        """
+        return self._startup_allowance
+
+    @startup_allowance.setter
+    def startup_allowance(self, value):
+        self._startup_allowance = float(value or 0)
+
+    def build_compile_commands(self, source_path):
+        """Builds the commands compiling a submission.
+
+        :param source_path: The path of the submitted source file
+        :type source_path: str
+        :return: The commands to run in order
+        :rtype: list
+        """
+        values = self._template_values(source_path)
+        return [_render(command, values) for command in self._compile_command]
+
+    def describe_build(self, source_path):
+        """Describes everything about the build of a submission but its
+        source and work directory.
+
+        Artifacts built from the same source with the same description are
+        interchangeable.
+
+        :param source_path: The path of the submitted source file
+        :type source_path: str
+        :return: The compile commands, artifact and run command with the work
+                 directory replaced by a placeholder, and the source file name
+        :rtype: dict
+        """
+        directory = os.path.dirname(source_path)
+
+        def _relative(command):
+            return [argument.replace(directory, '{directory}')
+                    for argument in command]
+
+        artifact = self.artifact_path(source_path)
+        return {
+            'compile_command': [
+                _relative(command)
+                for command in self.build_compile_commands(source_path)],
+            'artifact': _relative([artifact])[0] if artifact else None,
+            'run_command': _relative(self.build_run_command(source_path)),
+            'source': os.path.basename(source_path)
+        }
+
+    def build_run_command(self, source_path):
+        """Builds the command running a compiled submission.
+
+        :param source_path: The path of the submitted source file
+        :type source_path: str
+        :rtype: list
+        """
+        return _render(self._run_command, self._template_values(source_path))
+
+    def build_warmup_command(self):
+        """Builds the command starting the runtime outside of a submission.
+
+        :return: The command or None if the language declares none
+        :rtype: list
+        """
+        if not self._warmup_command:
+            return None
+        return _render(self._warmup_command, self._template_values(''))
+
+    def artifact_path(self, source_path):
+        """Gets the path of the program compiled from a submission.
+
+        :param source_path: The path of the submitted source file
+        :type source_path: str
+        :return: The path or None if the language is not compiled
+        :rtype: str
+        """
+        if not self._artifact:
+            return None
+        values = self._template_values(source_path)
+        return os.path.join(values['directory'],
+                            self._artifact.format(**values))
+
+    def _template_values(self, source_path):
+        directory, filename = os.path.split(source_path)
+        values = {
+            'source': source_path,
+            'name': filename.rsplit('.', 1)[0],
+            'directory': directory,
+            'compiler': self._compiler or '',
+            'compiler_args': list(self._compiler_args or []),
+            'toolchain': self._toolchain or ''
+        }
+        if self._artifact:
+            values['artifact'] = os.path.join(
+                directory, self._artifact.format(**values))
+        return values
+
+    def allows_file(self, filename):
+        """Checks the extension of a submitted file.
+
+        :param filename: The name of the submitted file
+        :type filename: str
+        :rtype: bool
+        """
+        return ('.' in filename and
+                filename.rsplit('.', 1)[1].lower() in self._extensions)
+
+
+class LanguageRegistry:
+    """The languages configured on this judge."""
+    def __init__(self, configured):
+        """
+        :param configured: The configured languages, including those that are
+                           not available
+        :type configured: list of Language
+        """
+        self._aliases = {}
+        for language in configured:
+            for alias in language.aliases:
+                self._aliases[alias] = language.name
+        available = [language for language in configured
+                     if language.available]
+        self._languages = dict(
+            (language.name, language) for language in available)
+        self._body = json.dumps({'languages': dict(
+            (language.name, list(language.aliases))
+            for language in available)}, sort_keys=True)
+        self._etag = hashlib.sha256(self._body.encode()).hexdigest()[:32]
+
+    @property
+    def languages(self):
+        """The configured languages.
+
+        :rtype: list of Language
+        """
+        return list(self._languages.values())
+
+    @property
+    def body(self):
+        """The serialized response of the languages endpoint.
+
+        :rtype: str
+        """
+        return self._body
+
+    @property
+    def etag(self):
+        return self._etag
+
+    @property
+    def aliases(self):
+        """The standardized language of every accepted abbreviation.
+
+        :rtype: dict
+        """
+        return self._aliases
+
+    def find(self, language):
+        """Finds the configured language of an abbreviation.
+
+        :param language: The language abbreviation
+        :type language: str
+        :return: The language or None if it is known but not configured
+        :rtype: Language
+        :raises errors.UnsupportedLanguageError: If the language is unknown
+        """
+        return self._languages.get(map_language(language))
+
 
 def map_language(language):
     """Maps a language to a standardized string
 
+    Before the registry is built the built in languages are known.
+
     :param language: The language abbreviation to standardize
     :type language: str
 
     :return: The standardized language
     :rtype: str
     """
-    val = _LANG_MAP.get(language)
+    registry = _REGISTRY
+    aliases = registry.aliases if registry is not None else _BUILT_IN_ALIASES
+    val = aliases.get(language)
     if val is None:
         raise errors.UnsupportedLanguageError(language)
     return val
@@ -51,11 +416,74 @@ def get_all_languages(lang_filter=None):
     :rtype: dict
     """
     languages = {}
-    for key in _LANG_MAP:
-        normalized_key = map_language(key)
-        if lang_filter is None or normalized_key in lang_filter:
-            if languages.get(normalized_key) is None:
-                languages[normalized_key] = []
-            languages[normalized_key].append(key)
+    registry = _REGISTRY
+    for language in (registry.languages if registry is not None else []):
+        if lang_filter is None or language.name in lang_filter:
+            languages[language.name] = list(language.aliases)
 
     return languages
+
+
+def _render(template, values):
+    # A "{compiler_args}" argument expands to every configured argument
+    command = []
+    for argument in template or []:
+        if argument == '{compiler_args}':
+            command.extend(str(arg) for arg in values['compiler_args'])
+        else:
+            command.append(str(argument).format(**values))
+    return command
+
+
+def initialize(app_config, worker_classes=None, scanners=None,
+               default_worker_class=None):
+    """Builds the registry of the configured languages.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param worker_classes: The problem worker of each standardized language
+    :type worker_classes: dict
+    :param scanners: Callable returning the restricted construct scanner of a
+                     standardized language
+    :type scanners: callable
+    :param default_worker_class: The problem worker of languages declaring a
+                                 run command without a worker of their own
+    :type default_worker_class: type
+    """
+    global _REGISTRY
+    configured = []
+    for name, details in sorted((app_config.get('languages') or {}).items()):
+        details = details or {}
+        aliases = details.get('aliases')
+        if aliases is None:
+            aliases = _DEFAULT_ALIASES.get(name, [])
+        declared = dict(_DEFAULT_COMMANDS.get(name, {}))
+        declared.update((key, details[key]) for key in (
+            'compile_command', 'run_command', 'artifact', 'jvm_warmup',
+            'warmup_command', 'reserves_address_space')
+            if details.get(key) is not None)
+        worker_class = (worker_classes or {}).get(name)
+        if worker_class is None and declared.get('run_command'):
+            worker_class = default_worker_class
+        configured.append(Language(
+            name, [name] + [str(alias) for alias in aliases if alias != name],
+            details.get('file_extensions'),
+            details.get('compiler'),
+            details.get('compiler_args'),
+            scanners(name) if scanners is not None else None,
+            worker_class,
+            startup_allowance=details.get('startup_allowance_seconds'),
+            available=bool(details.get('compiler') or
+                           details.get('run_command')),
+            **declared))
+
+    with _REGISTRY_LOCK:
+        _REGISTRY = LanguageRegistry(configured)
+
+
+def get_registry():
+    """Gets the registry of the configured languages.
+
+    :rtype: LanguageRegistry
+    """
+    return _REGISTRY
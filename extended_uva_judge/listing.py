@@ -0,0 +1,222 @@
+"""Module housing the cached index behind the problems endpoint.
+
+Front ends poll the problem listing constantly. The index keeps a snapshot of
+every problem with its title, time limit and number of test cases, and only
+rebuilds it once the problem directory, or problem pack, has changed. Every
+snapshot has its own entity tag so clients polling an unchanged listing are
+answered with "304 Not Modified" without the listing being filtered or
+serialized.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+
+from extended_uva_judge import problems
+
+DEFAULT_MAX_PER_PAGE = 1000
+DEFAULT_MAX_RENDERED = 64
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+class ListingQuery:
+    """The filters and page requested from the problem listing."""
+    def __init__(self, search=None, min_time_limit=None, max_time_limit=None,
+                 page=None, per_page=None):
+        """
+        :param search: Text the identifier or title has to contain, ignoring
+                       case
+        :type search: str
+        :param min_time_limit: Smallest time limit of the listed problems
+        :type min_time_limit: float
+        :param max_time_limit: Largest time limit of the listed problems
+        :type max_time_limit: float
+        :param page: The one based page to list, the first if None
+        :type page: int
+        :param per_page: Problems per page, every matching problem if None
+        :type per_page: int
+        """
+        self.search = search.lower() if search else None
+        self.min_time_limit = min_time_limit
+        self.max_time_limit = max_time_limit
+        self.page = page or 1
+        self.per_page = per_page
+
+    @property
+    def key(self):
+        """A canonical, hashable form of the query.
+
+        :rtype: tuple
+        """
+        return (self.search, self.min_time_limit, self.max_time_limit,
+                self.page, self.per_page)
+
+    def matches(self, entry):
+        if (self.min_time_limit is not None and
+                entry['time_limit'] < self.min_time_limit):
+            return False
+        if (self.max_time_limit is not None and
+                entry['time_limit'] > self.max_time_limit):
+            return False
+        if self.search is not None:
+            return (self.search in entry['problem_id'].lower() or
+                    self.search in (entry['title'] or '').lower())
+        return True
+
+
+class ListingSnapshot:
+    """The problems of the catalog at one point in time."""
+    def __init__(self, entries, max_rendered=DEFAULT_MAX_RENDERED):
+        """
+        :param entries: The problems in the order they are listed
+        :type entries: list
+        :param max_rendered: Max serialized listings kept for repeated
+                             queries
+        :type max_rendered: int
+        """
+        self._entries = entries
+        self._digest = hashlib.sha256(
+            json.dumps(entries, sort_keys=True).encode()).hexdigest()
+        self._rendered = OrderedDict()
+        self._max_rendered = max_rendered
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def etag(self, query):
+        """The entity tag of the listing returned for a query.
+
+        :param query: The requested filters and page
+        :type query: ListingQuery
+        :rtype: str
+        """
+        return hashlib.sha256(json.dumps(
+            [self._digest, query.key]).encode()).hexdigest()[:32]
+
+    def render(self, query):
+        """Serializes the listing returned for a query.
+
+        :param query: The requested filters and page
+        :type query: ListingQuery
+        :return: The JSON body of the listing
+        :rtype: str
+        """
+        key = query.key
+        with self._lock:
+            body = self._rendered.get(key)
+            if body is not None:
+                self._rendered.move_to_end(key)
+                return body
+
+        matching = [entry for entry in self._entries if query.matches(entry)]
+        per_page = query.per_page or max(len(matching), 1)
+        start = (query.page - 1) * per_page
+        items = matching[start:start + per_page]
+        body = json.dumps({
+            'problems': [item['problem_id'] for item in items],
+            'items': items,
+            'total': len(matching),
+            'page': query.page,
+            'per_page': per_page
+        })
+
+        with self._lock:
+            self._rendered[key] = body
+            while len(self._rendered) > self._max_rendered:
+                self._rendered.popitem(last=False)
+        return body
+
+
+class ProblemIndex:
+    """Cached listing of the problems of a catalog.
+
+    The catalog is checked for changes at most once every
+    revalidate_interval seconds and the listing rebuilt when it changed.
+    """
+    def __init__(self, catalog, revalidate_interval=0):
+        """
+        :param catalog: The problems to list
+        :type catalog: problems.ProblemCatalog
+        :param revalidate_interval: Min seconds between checks of the catalog
+        :type revalidate_interval: float
+        """
+        self._catalog = catalog
+        self._revalidate_interval = float(revalidate_interval or 0)
+        self._version = None
+        self._snapshot = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Gets the listing of the current problems.
+
+        :rtype: ListingSnapshot
+        """
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if (snapshot is not None and
+                now - self._checked < self._revalidate_interval):
+            return snapshot
+
+        with self._lock:
+            version = self._catalog.version()
+            if self._snapshot is None or version != self._version:
+                self._snapshot = ListingSnapshot(self._build_entries())
+                self._version = version
+            self._checked = now
+            return self._snapshot
+
+    def _build_entries(self):
+        entries = []
+        for problem_id in sorted(self._catalog.problem_ids(),
+                                 key=_natural_key):
+            try:
+                problem = self._catalog.get(problem_id)
+            except Exception:
+                logging.getLogger().warning(
+                    'Leaving problem %s out of the listing, it could not be '
+                    'loaded.', problem_id, exc_info=True)
+                continue
+            if problem is None:
+                continue
+            entries.append({
+                'problem_id': problem_id,
+                'title': problem.title,
+                'time_limit': problem.time_limit,
+                'test_cases': len(problem.test_cases)
+            })
+        return entries
+
+
+def _natural_key(problem_id):
+    # List numbered problems in numeric order ahead of named ones
+    if problem_id.isdigit():
+        return 0, int(problem_id), problem_id
+    return 1, 0, problem_id
+
+
+def get_index(app_config):
+    """Gets the process wide index of the configured problems.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :rtype: ProblemIndex
+    """
+    catalog = problems.get_catalog(app_config)
+    index = _INDEXES.get(catalog)
+    if index is None:
+        with _INDEXES_LOCK:
+            index = _INDEXES.get(catalog)
+            if index is None:
+                index = ProblemIndex(
+                    catalog,
+                    app_config.get('problem_cache_revalidate_seconds', 0))
+                _INDEXES[catalog] = index
+    return index
@@ -5,25 +5,29 @@ future if the judge expands enough new modules may be created to subdivide
 logical groupings.
 """
 import os
-import shutil
 import logging
 import json
 import abc
-import mmap
+import hashlib
+import math
+import threading
 
-from subprocess import TimeoutExpired, PIPE, Popen
-from random import choice
-from string import ascii_letters
-from extended_uva_judge import errors, enums, utilities, languages
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import TimeoutExpired
+from extended_uva_judge import artifacts, checkers, comparison, errors, \
+    enums, execution, forkserver, languages, packs, problems, scanning, \
+    storage, verdicts, workspaces
 
 
 class ProblemResponseBuilder:
     """Class to assist with building responses to the submission testing"""
     def __init__(self, code, description=None, trace=None, debug=False,
-                 stdout=None, stderr=None):
+                 stdout=None, stderr=None, test_cases=None, usage=None):
         self._code = code
         self._description = description
         self._trace = trace
+        self._test_cases = test_cases
+        self._usage = usage
         self._debug = debug
         self._stdout = None
         self._stderr = None
@@ -33,6 +37,9 @@ class ProblemResponseBuilder:
         self.stderr = stderr
 
     def build_response(self):
+        return json.dumps(self.build_response_body())
+
+    def build_response_body(self):
         response_body = {
             'code': self._code,
             'message': self.MESSAGE_MAP.get(self._code)
@@ -47,11 +54,18 @@ class ProblemResponseBuilder:
                     .replace('\\n', '\n')
                     .replace('\\\\', '\\'))
 
+        if self._test_cases is not None:
+            response_body['test_cases'] = [
+                case.to_dict() for case in self._test_cases]
+
+        if self._usage is not None:
+            response_body['usage'] = self._usage
+
         if self._debug:
             response_body['stdout'] = self.stdout
             response_body['stderr'] = self.stderr
 
-        return json.dumps(response_body)
+        return response_body
 
     @property
     def debug(self):
@@ -101,6 +115,130 @@ class ProblemResponseBuilder:
     }
 
 
+class TestCaseResult:
+    """The outcome of running the users program against one test case"""
+    def __init__(self, name, code, stdout=None, stderr=None, trace=None):
+        self.name = name
+        self.code = code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.trace = trace
+        self.usage = None
+        self.run_key = None
+        self.recording = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'code': self.code,
+            'message': ProblemResponseBuilder.MESSAGE_MAP.get(self.code)
+        }
+
+    def to_record(self):
+        """Builds the record of the result kept by the submission store.
+
+        :rtype: dict
+        """
+        return {
+            'name': self.name,
+            'code': self.code,
+            'trace': self.trace,
+            'usage': self.usage,
+            'run_key': self.run_key
+        }
+
+    def record_usage(self, run):
+        """Records the resources used by the run of the test case.
+
+        :param run: The result of the run
+        :type run: execution.ProcessResult
+        """
+        self.usage = {
+            'wall_time': _round_seconds(run.wall_time),
+            'cpu_user': _round_seconds(run.cpu_user),
+            'cpu_sys': _round_seconds(run.cpu_sys),
+            'peak_rss': run.peak_rss,
+            'output_bytes': run.output_bytes
+        }
+
+    @staticmethod
+    def summarize_usage(case_results):
+        """Builds the resource usage report of a set of test case results.
+
+        Times and output bytes are summed across the test cases while the
+        peak resident memory is the largest of any test case. Measurements
+        that are unavailable on the platform are reported as None.
+
+        :param case_results: The results of the test cases that were run
+        :type case_results: list
+        :rtype: dict
+        """
+        measured = [case for case in case_results if case.usage is not None]
+        if not measured:
+            return None
+
+        total = {}
+        for key in ('wall_time', 'cpu_user', 'cpu_sys', 'output_bytes'):
+            values = [case.usage[key] for case in measured
+                      if case.usage[key] is not None]
+            total[key] = sum(values) if values else None
+        for key in ('wall_time', 'cpu_user', 'cpu_sys'):
+            total[key] = _round_seconds(total[key])
+        rss = [case.usage['peak_rss'] for case in measured
+               if case.usage['peak_rss'] is not None]
+        total['peak_rss'] = max(rss) if rss else None
+
+        total['test_cases'] = []
+        for case in measured:
+            entry = {'name': case.name}
+            entry.update(case.usage)
+            total['test_cases'].append(entry)
+        return total
+
+
+def _round_seconds(seconds):
+    return None if seconds is None else round(seconds, 4)
+
+
+class Submission:
+    """In memory copy of a users uploaded file.
+
+    Submissions are detached from the http request so they can be judged
+    outside of the request thread.
+    """
+    def __init__(self, filename, content):
+        self._filename = filename
+        self._content = content
+
+    @staticmethod
+    def from_request(request):
+        """Builds a submission from the single file in an http request.
+
+        :param request: The http request containing the users submission
+        :return: The users submission
+        :rtype: Submission
+        """
+        user_file = request.files[list(request.files.keys())[0]]
+        return Submission(user_file.filename, user_file.read())
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def content(self):
+        return self._content
+
+    def save(self, path):
+        """Writes the submission to the specified path.
+
+        :param path: The full path of the file to write
+        :type path: str
+        """
+        with open(path, 'wb') as f:
+            f.write(self._content)
+
+
 class ProblemWorkerFactory:
     _config = None
 
@@ -111,91 +249,233 @@ class ProblemWorkerFactory:
     def initialize(app_config):
         global _config
         _config = app_config
+        execution.initialize(app_config)
+        artifacts.initialize(app_config)
+        checkers.initialize(app_config)
+        forkserver.initialize(app_config)
+        packs.initialize(app_config)
+        scanning.initialize(app_config)
+        storage.initialize(app_config)
+        verdicts.initialize(app_config)
+        languages.initialize(app_config, _WORKER_CLASSES,
+                             scanning.get_scanner, CompiledProblemWorker)
+        _warm_up_runtimes(languages.get_registry())
 
     @staticmethod
-    def create_worker(language, problem_id, debug):
+    def create_worker(language, problem_id, debug, full_report=None,
+                      submission_id=None):
         global _config
 
         lang = ProblemWorkerFactory._normalize_language(language)
-        args = lang, problem_id, _config, debug
-
-        if lang == languages.PYTHON2 or lang == languages.PYTHON3:
-            worker = PythonProblemWorker(*args)
-        elif lang == languages.C_SHARP:
-            worker = CSharpProblemWorker(*args)
-        else:
+        if full_report is None:
+            full_report = bool(_config.get('full_report', False))
+        args = lang, problem_id, _config, debug, full_report, submission_id
+
+        configured = languages.get_registry().find(lang)
+        worker_class = None
+        if configured is not None:
+            worker_class = configured.worker_class
+        if worker_class is None:
             logging.warning('Failure to run problem worker. '
-                            'Language not implemented.')
-            worker = NotImplementedProblemWorker(*args)
+                            'Language %s not configured.', lang)
+            worker_class = NotImplementedProblemWorker
+        worker = worker_class(*args)
 
-        logging.debug('Mapped {lang} to {worker}.'.format(
-            lang=lang, worker=worker.__class__.__name__))
+        logging.debug('Mapped %s to %s.', lang, worker_class.__name__)
         return worker
 
     @staticmethod
     def _normalize_language(language):
         mapped_lang = languages.map_language(language)
-        logging.getLogger().debug(
-            'Mapped language {input} to {output}.'.format(
-                input=language, output=mapped_lang))
+        logging.getLogger().debug('Mapped language %s to %s.', language,
+                                  mapped_lang)
         return mapped_lang
 
 
 class ProblemWorker:
-    def __init__(self, language, problem_id, config, debug_output):
+    def __init__(self, language, problem_id, config, debug_output,
+                 full_report=False, submission_id=None):
         self._mapped_lang = language
+        self._language = languages.get_registry().find(language)
         self._problem_id = problem_id
+        self._problem = None
         self._config = config  # type: dict
         self._log = logging.getLogger()
         self._temp_work_dir = None
+        self._pass_fds = ()
         self._run_command = None
         self._test_result = None
         self._failure_trace = None
         self._user_output = None
         self._user_error = None
         self._user_result_code = None
+        self._case_results = []
         self._safe_to_run = False
         self._debug_output = debug_output
+        self._full_report = full_report
+        self._submission_id = submission_id
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._remove_temp_work_dir()
+        self._release_resources()
 
     def __del__(self):
+        self._release_resources()
+
+    def _release_resources(self):
+        """Releases the work directory and files held for the submission.
+        """
         self._remove_temp_work_dir()
+        for case_result in getattr(self, '_case_results', None) or []:
+            if case_result.recording is not None:
+                case_result.recording.discard()
+                case_result.recording = None
 
-    def test(self, request):
+    def test(self, submission):
         """Runs the users submission against all test cases
 
-        :param request: The http request containing the users submission
+        :param submission: The users submission
+        :type submission: Submission
         :return: A ProblemResponseBuilder for the verdict
         :rtype: ProblemResponseBuilder
         """
         try:
-            self._create_temp_work_dir()
-            user_file_path = self._save_user_file(request)
-            self._scan_for_disallowed_constructs(user_file_path)
+            self._problem = self._get_problem()
+            self._scan_for_disallowed_constructs(submission.content)
             if self._safe_to_run:
+                user_file_path = self._save_user_file(submission)
                 self._compile(user_file_path)
-                self._run_command = self._build_run_command(user_file_path)
-                self._execute_run()
-                self._verify_output()
-                self._analyze_result_code()
-        except RuntimeError:
-            self._log.debug('Runtime error.')
-            self._test_result = ProblemResponseBuilder(
-                enums.ProblemResponses.RUNTIME_ERROR,
-                trace=self._failure_trace)
+                if self._test_result is None:
+                    self._run_command = self._build_run_command(
+                        user_file_path)
+                    self._run_test_cases()
+                    self._analyze_result_code()
         except TimeoutExpired:
             self._log.debug('Time limit exceeded.')
             self._test_result = ProblemResponseBuilder(
                 enums.ProblemResponses.TIME_LIMIT_EXCEEDED,
             )
 
+        self._store_submission(submission)
         return self.test_result
 
+    def verify(self, stored):
+        """Judges a stored submission again from its recorded outputs.
+
+        Test cases whose input and limits are unchanged keep their recorded
+        verdict, apart from accepted and wrong answers which are decided by
+        comparing the recorded output with the current expected outputs. The
+        output of a program stopped early only decides a wrong answer.
+
+        :param stored: The stored submission
+        :type stored: storage.StoredSubmission
+        :return: The new verdict or None if the submission has to be run
+                 again because a test case changed or was never run
+        :rtype: ProblemResponseBuilder
+        """
+        self._problem = self._get_problem()
+        recorded = dict((case['name'], case) for case in stored.test_cases)
+        records = []
+        case_results = []
+        for test_case in self._problem.test_cases:
+            record = recorded.get(test_case.name)
+            if (record is None or
+                    record.get('run_key') != self._get_run_key(test_case)):
+                return None
+
+            code = record['code']
+            if code in self._OUTPUT_VERDICTS:
+                output = stored.read_output(test_case.name)
+                if output is None:
+                    return None
+                comparator = self._create_comparator(test_case)
+                if record.get('partial'):
+                    # Only the start of the output was read, it has to
+                    # differ from every expected output already
+                    if comparator.feed(output) is not False:
+                        return None
+                    code = enums.ProblemResponses.WRONG_ANSWER
+                else:
+                    comparator.feed(output)
+                    code = comparator.classify()
+                record = dict(record)
+                record['trace'] = comparator.message
+
+            case_result = TestCaseResult(test_case.name, code,
+                                         trace=record.get('trace'))
+            case_result.usage = record.get('usage')
+            case_results.append(case_result)
+            record = dict(record)
+            record['code'] = code
+            records.append(record)
+            if code not in self._PASSING_VERDICTS and not self._full_report:
+                break
+
+        self._case_results = case_results
+        self._analyze_result_code()
+        store = storage.get_store()
+        if store is not None:
+            store.update_verdict(
+                stored, self._test_result.build_response_body(), records)
+        return self.test_result
+
+    # Verdicts decided by comparing the output with the expected outputs
+    _OUTPUT_VERDICTS = (
+        enums.ProblemResponses.ACCEPTED,
+        enums.ProblemResponses.ACCEPTED_PRESENTATION_ERROR,
+        enums.ProblemResponses.PRESENTATION_ERROR,
+        enums.ProblemResponses.WRONG_ANSWER
+    )
+
+    # Verdicts of test cases that do not stop the remaining test cases
+    _PASSING_VERDICTS = (
+        enums.ProblemResponses.ACCEPTED,
+        enums.ProblemResponses.ACCEPTED_PRESENTATION_ERROR
+    )
+
+    def _store_submission(self, submission):
+        """Keeps the judged submission and its outputs for rejudging.
+
+        :param submission: The users submission
+        :type submission: Submission
+        """
+        store = storage.get_store()
+        if store is None or self._test_result is None:
+            return
+
+        outputs = dict(
+            (case_result.name, case_result.recording)
+            for case_result in self._case_results
+            if case_result.code in self._OUTPUT_VERDICTS and
+            case_result.recording is not None)
+        try:
+            self._submission_id = store.save(
+                self._problem_id, self.language, submission.filename,
+                submission.content, self._test_result.build_response_body(),
+                [case.to_record() for case in self._case_results],
+                outputs, self._full_report, self._submission_id)
+        except OSError:
+            self._log.warning('Failed to store submission for problem %s.',
+                              self._problem_id, exc_info=True)
+
+    def _get_run_key(self, test_case):
+        """Hashes everything about a test case that influences a run.
+
+        :param test_case: The test case
+        :type test_case: problems.TestCase
+        :rtype: str
+        """
+        compiler, args = self._get_compiler()
+        key = hashlib.sha256(json.dumps([
+            self.language, compiler, args, test_case.time_limit,
+            self._get_memory_limit(), self._get_output_limit(),
+            self._get_resource_limits(test_case).to_dict()
+        ], sort_keys=True).encode())
+        key.update(test_case.input_digest.encode())
+        return key.hexdigest()
+
     @abc.abstractmethod
     def _compile(self, user_file_path):
         """Compiles the submission for the users language.
@@ -210,6 +490,41 @@ class ProblemWorker:
         """
         raise NotImplementedError
 
+    def _get_launcher(self):
+        """Gets the callable that starts the users application.
+
+        Applications are started by the program fork servers so their peak
+        memory does not include the memory of the judge.
+
+        :return: The launcher for execution.run_process or None to start the
+                 application as a regular child process.
+        :rtype: callable
+        """
+        return self._pool_launcher(forkserver.get_program_pool())
+
+    def _pool_launcher(self, pool):
+        """Builds a launcher starting applications on a fork server pool.
+
+        Applications are started as regular child processes when no fork
+        server can start them.
+
+        :param pool: The fork server pool or None
+        :type pool: forkserver.ForkServerPool
+        :rtype: callable
+        """
+        if pool is None:
+            return None
+
+        def _launch(command, limits, pass_fds=(), cwd=None):
+            try:
+                return pool.launch(command, limits, pass_fds, cwd)
+            except (errors.ForkServerError, OSError):
+                self._log.warning('Fork server unavailable, starting the '
+                                  'program from the judge.', exc_info=True)
+                return execution.PopenProgram(command, limits, pass_fds, cwd)
+
+        return _launch
+
     @property
     def language(self):
         """Gets the normalized programming language.
@@ -232,159 +547,274 @@ class ProblemWorker:
     def output(self):
         return self._user_output
 
-    def _scan_for_disallowed_constructs(self, user_file_path):
-        lang_details = self._config.get('languages', {}).get(self.language, {})
-        restricted = lang_details.get('restricted')
-        if restricted is None:
-            return
+    def _scan_for_disallowed_constructs(self, source):
+        """Rejects the submission if it contains restricted constructs.
 
-        restricted_item = False
-        with open(user_file_path, 'rb', 0) as f:
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as s:
-                for item in restricted:
-                    if s.find(item.encode()) != -1:
-                        restricted_item = item
+        :param source: The source of the submission
+        :type source: bytes
+        """
+        scanner = self._language.scanner if self._language else None
+        hits = scanner.scan(source) if scanner is not None else []
 
-        if restricted_item:
+        if hits:
             self._test_result = ProblemResponseBuilder(
                 enums.ProblemResponses.RESTRICTED_FUNCTION,
-                description=('Restricted Function: %s' % restricted_item)
+                description=('Restricted Function: %s' % ', '.join(hits))
             )
         else:
             self._safe_to_run = True
 
     def _analyze_result_code(self):
-        """Analyzes the test result code and sets the test result
+        """Analyzes the test case results and sets the test result
+
+        The verdict is the one of the first test case that failed, otherwise
+        of the first test case accepted with a presentation error, or accepted
+        if every test case passed. Problems without test cases are judged a
+        Submission Error.
         """
+        if not self._case_results:
+            self._log.error('Problem %s has no test cases.', self._problem_id)
+            self._test_result = ProblemResponseBuilder(
+                enums.ProblemResponses.SUBMISSION_ERROR,
+                description='Problem has no test cases.')
+            return
+
+        failed = [case_result for case_result in self._case_results
+                  if case_result.code not in self._PASSING_VERDICTS]
+        not_accepted = [case_result for case_result in self._case_results
+                        if case_result.code != enums.ProblemResponses.ACCEPTED]
+        reported = (failed or not_accepted or self._case_results[-1:])[0]
+
+        self._user_result_code = reported.code
+        self._user_output = reported.stdout
+        self._user_error = reported.stderr
+        self._failure_trace = reported.trace
         self._test_result = ProblemResponseBuilder(
-            self._user_result_code,
-            stdout=self._user_output,
-            stderr=self._user_error,
-            debug=self._debug_output
+            reported.code,
+            trace=reported.trace,
+            stdout=reported.stdout,
+            stderr=reported.stderr,
+            debug=self._debug_output,
+            test_cases=self._case_results if self._full_report else None,
+            usage=TestCaseResult.summarize_usage(self._case_results)
         )
 
-    def _execute_run(self):
-        """Executes the users application with the run arguments.
+    def _run_test_cases(self):
+        """Runs the users application against the problems test cases.
 
-        :return: The output from the users program
-        :rtype: str
+        Test cases are run concurrently, up to max_parallel_test_cases at a
+        time. Unless a full report was requested no new test case is started
+        once one is not accepted.
         """
-        problem_config = self._get_problem_config()
-        program_input = problem_config['input'].replace(
-            '\r\n', '\n').rstrip('\n').encode()
-        timeout = float(problem_config['time_limit'])
-
-        return_code, stdout, stderr = self._execute_command(
-            self._run_command, cmd_input=program_input, timeout=timeout)
-
-        self._user_output = stdout
-        self._user_error = stderr
+        test_cases = self._problem.test_cases
+        parallelism = min(len(test_cases), int(
+            self._config.get('max_parallel_test_cases') or 1))
+        stop = threading.Event()
+
+        if parallelism <= 1:
+            case_results = []
+            for test_case in test_cases:
+                case_results.append(self._run_test_case(test_case, stop))
+                if stop.is_set():
+                    break
+        else:
+            with ThreadPoolExecutor(max_workers=parallelism) as executor:
+                futures = [executor.submit(self._run_test_case,
+                                           test_case, stop)
+                           for test_case in test_cases]
+                case_results = [future.result() for future in futures]
+
+        # Test cases skipped after a failure have no result
+        self._case_results = [
+            case_result for case_result in case_results
+            if case_result is not None]
+
+    def _run_test_case(self, test_case, stop):
+        """Runs a single test case while holding a core from the budget.
+
+        :param test_case: The test case to run
+        :type test_case: problems.TestCase
+        :param stop: Event set once a test case has failed
+        :type stop: threading.Event
+        :return: The result of the test case or None if it was skipped
+        :rtype: TestCaseResult
+        """
+        with execution.get_core_budget():
+            if stop.is_set():
+                return None
+            case_result = self._execute_run(test_case)
+
+        if (case_result.code not in self._PASSING_VERDICTS and
+                not self._full_report):
+            self._log.debug('Stopping at failed test case %s.',
+                            test_case.name)
+            stop.set()
+        return case_result
+
+    def _execute_run(self, test_case):
+        """Executes the users application against a single test case.
+
+        The output of the application is compared to the expected output as
+        it is produced and the application is stopped as soon as it can no
+        longer be accepted. With the submission store enabled the output is
+        also written to the store as it is read.
+
+        :param test_case: The test case to run
+        :type test_case: problems.TestCase
+        :return: The result of the test case
+        :rtype: TestCaseResult
+        """
+        comparator = self._create_comparator(test_case)
+        limits = self._get_resource_limits(test_case)
+        store = storage.get_store()
+        recording = None
+        stdout_consumer = comparator.feed
+        if store is not None:
+            try:
+                recording = store.record_output()
+                stdout_consumer = _recorded(comparator.feed, recording)
+            except OSError:
+                self._log.warning('Failed to record the output of test case '
+                                  '%s.', test_case.name, exc_info=True)
 
-        if return_code != 0:
+        try:
+            run = execution.run_process(
+                self._run_command, stdin_data=test_case.input,
+                stdin_file=test_case.input_file,
+                timeout=self._get_wall_time_limit(test_case, limits),
+                stdout_consumer=stdout_consumer,
+                capture_stdout=bool(self._debug_output),
+                output_limit=self._get_output_limit(),
+                stderr_limit=self._config.get(
+                    'stderr_limit_bytes', execution.DEFAULT_STDERR_LIMIT),
+                limits=limits,
+                launcher=self._get_launcher(),
+                pass_fds=self._pass_fds,
+                cwd=self._temp_work_dir)
+        except BaseException:
+            if recording is not None:
+                recording.discard()
+            raise
+        if recording is not None:
+            recording.finish(partial=run.aborted)
+
+        case_result = self._judge_run(test_case, run, comparator)
+        case_result.record_usage(run)
+        case_result.run_key = self._get_run_key(test_case)
+        case_result.recording = recording
+        return case_result
+
+    def _judge_run(self, test_case, run, comparator):
+        """Determines the verdict of a finished test case run.
+
+        :param test_case: The test case that was run
+        :type test_case: problems.TestCase
+        :param run: The result of the run
+        :type run: execution.ProcessResult
+        :param comparator: The comparator fed the output of the run
+        :type comparator: comparison.StreamingComparator
+        :rtype: TestCaseResult
+        """
+        if (run.timed_out or run.cpu_limit_exceeded or
+                (run.cpu_time is not None and
+                 run.cpu_time > self._get_time_limit(test_case))):
+            self._log.debug('Time limit exceeded on test case %s. '
+                            'wall=%s cpu=%s', test_case.name, run.wall_time,
+                            run.cpu_time)
+            return TestCaseResult(
+                test_case.name, enums.ProblemResponses.TIME_LIMIT_EXCEEDED)
+
+        if self._is_memory_limit_exceeded(run):
+            self._log.debug('Memory limit exceeded on test case %s. rss=%s',
+                            test_case.name, run.peak_rss)
+            return TestCaseResult(
+                test_case.name, enums.ProblemResponses.MEMORY_LIMIT_EXCEEDED,
+                stdout=run.stdout, stderr=run.stderr)
+
+        if run.output_limit_exceeded:
+            self._log.debug('Output limit exceeded on test case %s.',
+                            test_case.name)
+            return TestCaseResult(
+                test_case.name, enums.ProblemResponses.OUTPUT_LIMIT_EXCEEDED,
+                stdout=run.stdout, stderr=run.stderr)
+
+        if not run.aborted and run.return_code != 0:
             message = (
-                'Problem with test...\nStandard Output: {out}\n'
+                'Problem with test {name}...\nStandard Output: {out}\n'
                 'Standard Error: {err}\nReturn Code:{code}'.format(
-                    out=stdout, err=stderr, code=return_code))
+                    name=test_case.name, out=run.stdout, err=run.stderr,
+                    code=run.return_code))
             self._log.debug(message)
-            self._failure_trace = str(stderr)
-            raise RuntimeError(stderr)
-
-    @staticmethod
-    def _execute_command(command, cmd_input=None, timeout=None):
-        """Executes the specified command
-
-        :param command: the command to execute
-        :param cmd_input: standard in inputs to provide to the running command
-        :param timeout: Time limit in which to kill the app in seconds.
-        :return: return code, standard output, standard error
-        :rtype: tuple
-        """
-        p = Popen(command, stdout=PIPE, stdin=PIPE, stderr=PIPE)
-        stdout, stderr = p.communicate(input=cmd_input, timeout=timeout)
-
-        return p.returncode, stdout, stderr
-
-    def _verify_output(self):
-        """Verifies the provided output against the expected output in the run
-
-        :return: The response code for the output verification
-        :rtype: str
+            return TestCaseResult(
+                test_case.name, enums.ProblemResponses.RUNTIME_ERROR,
+                stdout=run.stdout, stderr=run.stderr, trace=str(run.stderr))
+
+        verdict = enums.ProblemResponses.WRONG_ANSWER
+        if not run.aborted:
+            try:
+                verdict = comparator.classify()
+            except errors.CheckerError as e:
+                self._log.error('Checker of problem %s failed on test case '
+                                '%s. %s', self._problem_id, test_case.name, e)
+                return TestCaseResult(
+                    test_case.name, enums.ProblemResponses.SUBMISSION_ERROR,
+                    stdout=run.stdout, stderr=run.stderr, trace=str(e))
+        if verdict == enums.ProblemResponses.ACCEPTED:
+            self._log.debug('Answer accepted.')
+        else:
+            self._log.debug('Output of test case %s judged %s after %s '
+                            'bytes.', test_case.name, verdict,
+                            run.output_bytes)
+
+        return TestCaseResult(test_case.name, verdict,
+                              stdout=run.stdout, stderr=run.stderr,
+                              trace=comparator.message)
+
+    def _create_comparator(self, test_case):
+        """Creates the comparator judging the output of a test case.
+
+        :param test_case: The test case
+        :type test_case: problems.TestCase
+        :return: The problems checker or a comparison against the accepted
+                 outputs, within a tolerance for the float comparator
+        :rtype: comparison.StreamingComparator
         """
-        # Translate the line endings for os compatibility
-        line_sep = os.linesep.encode()
-        expected_list = self._get_problem_config()['output']
-        self._user_output = self._user_output.replace(line_sep, b'\n').strip()
+        pool = checkers.get_pool(self._config, self._problem)
+        if pool is not None:
+            self._log.debug('Checking output with the checker of problem %s',
+                            self._problem_id)
+            return checkers.CheckerComparator(
+                pool, test_case.input, (test_case.outputs or [b''])[0])
 
         self._log.debug('Checking output against %s solutions',
-                        len(expected_list))
-
-        accepted = False
-        expected = None
-        for expected in expected_list:
-            expected = expected.encode().replace(line_sep, b'\n').strip()
-            message = 'output="{output}", expected="{expected}"'.format(
-                output=self._user_output, expected=expected
-            )
-            self._log.debug(message)
-            if self._user_output == expected:
-                self._log.debug('Answer accepted.')
-                accepted = True
-                break
-            self._log.debug('Answer not accepted.')
-
-        if accepted is False:
-            message = ('Output Mismatch! output="{output}", '
-                       'expected="{expected}"').format(
-                output=self._user_output, expected=expected
-            )
-            self._log.debug(message)
-            verdict = enums.ProblemResponses.WRONG_ANSWER
-        else:
-            verdict = enums.ProblemResponses.ACCEPTED
-
-        self._user_result_code = verdict
-
-    def _save_user_file(self, request):
+                        len(test_case.expected_outputs))
+        if self._problem.comparator == comparison.FLOAT_COMPARATOR:
+            return comparison.FloatComparator(
+                test_case.expected_outputs, self._problem.absolute_tolerance,
+                self._problem.relative_tolerance)
+        return comparison.StreamingComparator(test_case.expected_outputs)
+
+    def _save_user_file(self, submission):
         """Persists users uploaded file to the temp working directory.
+
+        :return: The path to the users source file
+        :rtype: str
         """
-        user_file = request.files[list(request.files.keys())[0]]
-        new_path = os.path.join(self._temp_work_dir, user_file.filename)
-        user_file.save(new_path)
+        self._create_temp_work_dir()
+        new_path = os.path.join(self._temp_work_dir, submission.filename)
+        submission.save(new_path)
         return new_path
 
     def _create_temp_work_dir(self):
-        """Creates the temporary work directory.
-        """
-        base = self._config.get('work_directory')
-        if not base:
-            raise errors.MissingConfigEntryError('work_directory')
-
-        working = True
-        path = ''
-        while working:
-            path = base + os.sep + self._gen_random_string()
-
-            if not os.path.exists(path):
-                os.makedirs(path)
-                working = False
-
-        self._temp_work_dir = path
-
-    @staticmethod
-    def _gen_random_string(length=20):
-        """Generates a random string of ascii letters.
-
-        :return: A random string of the specified length of upper and lower
-                 case letters
-        :rtype: str
+        """Acquires a temporary work directory from the workspace pool.
         """
-        return ''.join(choice(ascii_letters) for _ in range(length))
+        self._temp_work_dir = workspaces.get_pool(self._config).acquire()
 
     def _remove_temp_work_dir(self):
-        """Removes the temporary working directory
+        """Returns the temporary working directory to the workspace pool
         """
         if self._temp_work_dir:
-            shutil.rmtree(self._temp_work_dir)
+            workspaces.get_pool(self._config).release(self._temp_work_dir)
             self._temp_work_dir = None
 
     def _get_compiler(self):
@@ -394,30 +824,286 @@ class ProblemWorker:
                  the configured args array.
         :rtype: tuple
         """
-        lang_details = self._config.get('languages', {}).get(self.language, {})
-        compiler = lang_details.get('compiler')
-        args = lang_details.get('compiler_args')
+        if self._language is None:
+            return None, None
+        return self._language.compiler, self._language.compiler_args
+
+    def _compile_with_cache(self, user_file_path, artifact_path,
+                            compile_commands):
+        """Compiles the submission unless the artifact is already cached.
+
+        The submission is judged a compile error when a command fails.
+
+        :param user_file_path: The path to the users source file
+        :type user_file_path: str
+        :param artifact_path: The path the compiler writes the program to
+        :type artifact_path: str
+        :param compile_commands: The commands that compile the submission, run
+                                 in order
+        :type compile_commands: list
+        """
+        cache = artifacts.get_artifact_cache()
+        key = None
+        if cache is not None and artifact_path is not None:
+            compiler, args = self._get_compiler()
+            build = None
+            if self._language is not None:
+                build = self._language.describe_build(user_file_path)
+            with open(user_file_path, 'rb') as f:
+                key = cache.build_key(self.language, compiler, args, f.read(),
+                                      build)
+            if cache.fetch(key, artifact_path):
+                self._log.debug('Using cached artifact %s.', key)
+                return
+
+        for compile_command in compile_commands:
+            failure = self._run_compile_command(compile_command)
+            if failure is not None:
+                # Report paths relative to the work directory
+                trace = failure.replace(
+                    os.path.dirname(user_file_path) + os.sep, '')
+                self._test_result = ProblemResponseBuilder(
+                    enums.ProblemResponses.COMPILE_ERROR, trace=trace,
+                    debug=self._debug_output)
+                return
+
+        if key is not None and os.path.isfile(artifact_path):
+            cache.store(key, artifact_path)
+
+    def _run_compile_command(self, command):
+        """Runs a compile command within the configured compile limits.
+
+        Compilers run on untrusted source, so they are stopped once they run
+        longer than the compile timeout or write more diagnostics than
+        max_output_bytes, and their memory is limited like a test case run.
+
+        :param command: The compile command
+        :type command: list
+        :return: The reason compilation failed or None if it succeeded
+        :rtype: str
+        """
+        timeout, output_limit, limits = execution.get_compile_limits(
+            self._config, self._language)
+
+        run = execution.run_process(
+            command, timeout=timeout, capture_stdout=True,
+            output_limit=output_limit, stderr_limit=output_limit,
+            limits=limits, cwd=self._temp_work_dir)
+        if run.timed_out or run.cpu_limit_exceeded:
+            self._log.debug('Compilation exceeded %s seconds.', timeout)
+            return 'Compilation exceeded the time limit of %s seconds.' % (
+                timeout)
+        if run.output_limit_exceeded:
+            self._log.debug('Compiler output exceeded %s bytes.',
+                            output_limit)
+            return 'Compiler output exceeded %s bytes.' % output_limit
+        if run.return_code != 0:
+            self._log.debug('Compilation failed with return code %s.',
+                            run.return_code)
+            return (run.stderr or run.stdout or b'').decode(
+                'utf-8', 'replace')
+        return None
+
+    def _get_resource_limits(self, test_case):
+        """Builds the operating system limits for a test case run.
+
+        The memory limit also bounds the data segment so runaway allocations
+        fail as they happen, except for runtimes reserving far more memory
+        than they use. Those are only checked once the run is over.
+
+        :param test_case: The test case about to be run
+        :type test_case: problems.TestCase
+        :rtype: execution.ResourceLimits
+        """
+        settings = self._config.get('resource_limits') or {}
+        max_processes = settings.get('max_processes')
+        data_size = None
+        if self._language is None or \
+                not self._language.reserves_address_space:
+            data_size = self._get_memory_limit()
+        return execution.ResourceLimits(
+            cpu_time=self._get_time_limit(test_case),
+            address_space=_megabytes_to_bytes(
+                settings.get('address_space_limit')),
+            processes=None if max_processes is None else int(max_processes),
+            file_size=_megabytes_to_bytes(settings.get('max_file_size')),
+            data_size=data_size)
+
+    def _get_time_limit(self, test_case):
+        """Gets the seconds of CPU time a test case run may use.
+
+        Languages whose runtime is slow to start are granted its start up
+        time on top of the time limit of the test case.
+
+        :rtype: float
+        """
+        if self._language is None:
+            return test_case.time_limit
+        return test_case.time_limit + self._language.startup_allowance
 
-        self._log.debug('Mapped {lang} to {compiler}.'.format(
-            lang=self.language, compiler=compiler
-        ))
-        return compiler, args
+    def _get_wall_time_limit(self, test_case, limits):
+        """Gets the wall clock time after which a test case run is killed.
 
-    def _get_problem_config(self):
-        """Gets the configuration for this objects corresponding problem.
+        When the CPU time is limited by the operating system the wall clock
+        limit only guards against programs that sleep or block, so it is a
+        multiple of the time limit.
 
-        :return: The configuration for the users selected problem
-        :rtype: dict
+        :rtype: float
         """
-        return utilities.get_problem_config(self._config, self._problem_id)
+        time_limit = self._get_time_limit(test_case)
+        if not limits.supported:
+            return time_limit
+        settings = self._config.get('resource_limits') or {}
+        multiplier = float(settings.get('wall_time_multiplier') or 1)
+        return time_limit * max(multiplier, 1)
+
+    def _get_memory_limit(self):
+        """Gets the max bytes of resident memory a test case may use.
+
+        :rtype: int
+        """
+        if self._problem.memory_limit is not None:
+            return _megabytes_to_bytes(self._problem.memory_limit)
+        settings = self._config.get('resource_limits') or {}
+        return _megabytes_to_bytes(settings.get('memory_limit'))
+
+    def _is_memory_limit_exceeded(self, run):
+        """Checks if a run used more memory than it was allowed.
+
+        :param run: The result of the run
+        :type run: execution.ProcessResult
+        :rtype: bool
+        """
+        memory_limit = self._get_memory_limit()
+        if (memory_limit is not None and run.peak_rss is not None and
+                run.peak_rss > memory_limit):
+            return True
+
+        # Allocations failing against the address space limit surface as
+        # the runtimes out of memory error.
+        return (run.return_code != 0 and not run.aborted and
+                any(marker in run.stderr
+                    for marker in self._OUT_OF_MEMORY_MARKERS))
+
+    _OUT_OF_MEMORY_MARKERS = (
+        b'MemoryError',
+        b'OutOfMemoryException',
+        b'OutOfMemoryError',
+        b'std::bad_alloc'
+    )
+
+    def _get_output_limit(self):
+        """Gets the max bytes of output a test case may produce.
+
+        :return: The problems output limit, falling back to the configured
+                 default. None when neither is set.
+        :rtype: int
+        """
+        if self._problem.output_limit is not None:
+            return self._problem.output_limit
+        output_limit = self._config.get('output_limit_bytes')
+        return None if output_limit is None else int(output_limit)
+
+    def _get_problem(self):
+        """Gets the parsed problem for this objects corresponding problem.
+
+        :return: The users selected problem
+        :rtype: problems.Problem
+        """
+        return problems.get_problem(self._config, self._problem_id)
+
+
+def _recorded(consumer, recording):
+    def _consume(chunk):
+        recording.write(chunk)
+        return consumer(chunk)
+    return _consume
+
+
+def _megabytes_to_bytes(megabytes):
+    return None if megabytes is None else int(float(megabytes) * 1024 * 1024)
+
+
+def _warm_up_runtimes(registry, timeout=30):
+    """Starts the runtime of languages flagged with jvm_warmup.
+
+    The first start loads the runtime into the page cache, the second
+    measures its CPU time. The measurement, rounded up to a tenth of a second
+    so run keys stay stable across restarts, becomes the start up allowance
+    of the language unless one is configured.
+
+    :param registry: The configured languages
+    :type registry: languages.LanguageRegistry
+    :param timeout: Max seconds of each start
+    :type timeout: float
+    """
+    for language in registry.languages:
+        command = language.build_warmup_command()
+        if (not language.jvm_warmup or not language.compiler or
+                command is None or language.startup_allowance):
+            continue
+        try:
+            run = None
+            for _ in range(2):
+                run = execution.run_process(command, timeout=timeout)
+        except OSError:
+            logging.warning('Failed to warm up the %s runtime.',
+                            language.name, exc_info=True)
+            continue
+        if run.return_code != 0 or run.cpu_time is None:
+            logging.warning('Failed to warm up the %s runtime. Return '
+                            'code %s.', language.name, run.return_code)
+            continue
+        language.startup_allowance = math.ceil(run.cpu_time * 10) / 10.0
+        logging.info('The %s runtime starts in %s seconds of CPU time.',
+                     language.name, language.startup_allowance)
 
 
 class PythonProblemWorker(ProblemWorker):
+    def __init__(self, *args, **kwargs):
+        super(PythonProblemWorker, self).__init__(*args, **kwargs)
+        self._source_fd = None
+
+    def _save_user_file(self, submission):
+        """Hands the users source to the interpreter without touching disk.
+
+        Where memfd_create is available the source is written to an anonymous
+        in memory file which the interpreter reads through /proc/self/fd, and
+        the temp working directory only serves as the working directory of
+        the program. Otherwise the source is written to it.
+
+        :return: The path the interpreter reads the users source from
+        :rtype: str
+        """
+        if not hasattr(os, 'memfd_create') or not os.path.isdir(
+                '/proc/self/fd'):
+            return super(PythonProblemWorker, self)._save_user_file(
+                submission)
+
+        self._create_temp_work_dir()
+        self._source_fd = os.memfd_create(submission.filename)
+        os.write(self._source_fd, submission.content)
+        self._pass_fds = (self._source_fd,)
+        return '/proc/self/fd/%d' % self._source_fd
+
+    def _release_resources(self):
+        super(PythonProblemWorker, self)._release_resources()
+        if getattr(self, '_source_fd', None) is not None:
+            os.close(self._source_fd)
+            self._source_fd = None
 
     def _build_run_command(self, user_file_path):
         compiler, _ = self._get_compiler()
         return [compiler, user_file_path]
 
+    def _get_launcher(self):
+        """Uses the warm fork server pool of the interpreter if enabled."""
+        compiler, _ = self._get_compiler()
+        pool = forkserver.get_pool(compiler)
+        if pool is None:
+            return super(PythonProblemWorker, self)._get_launcher()
+        return self._pool_launcher(pool)
+
     def _compile(self, user_file_path):
         """Compiles the submission for the users language.
 
@@ -426,22 +1112,21 @@ class PythonProblemWorker(ProblemWorker):
         pass
 
 
-class CSharpProblemWorker(ProblemWorker):
+class CompiledProblemWorker(ProblemWorker):
+    """Judges the languages declared by their compile and run commands."""
 
     def _build_run_command(self, user_file_path):
-        exe_file_path = ''.join([user_file_path.rsplit('.', 1)[0], '.exe'])
-        args = [exe_file_path]
-        return args
+        return self._language.build_run_command(user_file_path)
 
     def _compile(self, user_file_path):
-        """Compiles the submission for the users language.
+        """Compiles the submission with the commands of the language.
         """
-        exe_file_path = ''.join([user_file_path.rsplit('.', 1)[0], '.exe'])
-        compiler, args = self._get_compiler()
-        cmd_args = [compiler, ''.join(['/out:', exe_file_path])]
-        cmd_args.extend(args)
-        cmd_args.append(user_file_path)
-        self._execute_command(cmd_args)
+        compile_commands = self._language.build_compile_commands(
+            user_file_path)
+        if compile_commands:
+            self._compile_with_cache(
+                user_file_path, self._language.artifact_path(user_file_path),
+                compile_commands)
 
 
 class NotImplementedProblemWorker(ProblemWorker):
@@ -451,14 +1136,21 @@ class NotImplementedProblemWorker(ProblemWorker):
     def _compile(self, user_file_path):
         pass
 
-    def test(self, request):
+    def test(self, submission):
         """Runs the users submission against all test cases
 
-        :param request: The http request containing the users submission
+        :param submission: The users submission
+        :type submission: Submission
         :return: A ProblemResponseBuilder for the verdict
         :rtype: ProblemResponseBuilder
         """
         return ProblemResponseBuilder(
             code=enums.ProblemResponses.SUBMISSION_ERROR,
-            description='Problem Worker for language not implemented.'
+            description='Language not configured on this judge.'
         )
+
+
+_WORKER_CLASSES = {
+    languages.PYTHON2: PythonProblemWorker,
+    languages.PYTHON3: PythonProblemWorker
+}
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+"""Module housing the problem pack format.
+
+Judges with tens of thousands of problems can compile the problem directory
+into a single pack file holding every problem with its test data already
+normalized:
+
+    extended-uva-judge-pack <problem_directory> <pack_path>
+
+With "problem_pack" configured the server maps the pack into memory at start
+up instead of parsing problem files. Finding a problem is a lookup in the
+index and its test data is read straight from the mapping, so every worker on
+the machine shares the same pages.
+
+The pack is laid out as follows, all integers little endian:
+
+* A header holding the magic bytes, the format version, the number of
+  problems and the offset of the index.
+* One record per problem: a uint32 length prefixed JSON description of the
+  problem followed by the inputs and outputs of its test cases. The
+  description locates them relative to the end of the description.
+* The index: per problem a uint16 length prefixed UTF-8 identifier followed
+  by the uint64 offset and uint32 length of its record.
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from extended_uva_judge import errors, problems
+
+MAGIC = b'EUJPACK\x00'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQ')
+_LENGTH = struct.Struct('<I')
+_ID_LENGTH = struct.Struct('<H')
+_ENTRY = struct.Struct('<QI')
+
+# Entries of a problem configuration that hold test data
+_TEST_DATA_KEYS = ('input', 'output', 'input_file', 'output_file',
+                   'test_cases')
+
+
+def build_pack(problem_directory, path):
+    """Compiles the problems of a directory into a pack file.
+
+    The pack is written next to its destination and moved into place once
+    complete, so a running server never maps a partial pack.
+
+    :param problem_directory: The directory holding the problem files
+    :type problem_directory: str
+    :param path: The path of the pack to write
+    :type path: str
+    :return: The number of problems in the pack
+    :rtype: int
+    """
+    catalog = problems.ProblemCatalog(problem_directory)
+    staging = '%s.%s.tmp' % (path, os.getpid())
+    index = []
+    try:
+        with open(staging, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, 0))
+            for problem_id in sorted(catalog.problem_ids()):
+                record = _build_record(catalog.get(problem_id))
+                index.append((problem_id, f.tell(), len(record)))
+                f.write(record)
+
+            index_offset = f.tell()
+            for problem_id, offset, length in index:
+                encoded = problem_id.encode('utf-8')
+                f.write(_ID_LENGTH.pack(len(encoded)))
+                f.write(encoded)
+                f.write(_ENTRY.pack(offset, length))
+
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, len(index), index_offset))
+        os.replace(staging, path)
+    except Exception:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+    return len(index)
+
+
+def _build_record(problem):
+    blobs = []
+    offset = 0
+
+    def _add_blob(data):
+        nonlocal offset
+        blobs.append(data)
+        location = [offset, len(data)]
+        offset += len(data)
+        return location
+
+    config = dict((key, value) for key, value in problem.config.items()
+                  if key not in _TEST_DATA_KEYS)
+    test_cases = []
+    for test_case in problem.test_cases:
+        test_cases.append({
+            'name': test_case.name,
+            'time_limit': test_case.time_limit,
+            'input_digest': test_case.input_digest,
+            'input': _add_blob(bytes(test_case.input)),
+            'outputs': [_add_blob(output) for output in test_case.outputs]
+        })
+
+    description = json.dumps({'config': config, 'test_cases': test_cases},
+                             sort_keys=True).encode()
+    return b''.join([_LENGTH.pack(len(description)), description] + blobs)
+
+
+class ProblemPack:
+    """A pack file mapped into memory."""
+    def __init__(self, path):
+        """
+        :param path: The path of the pack
+        :type path: str
+        :raises errors.InvalidPackError: If the file is not a pack of this
+                                         version
+        """
+        self._path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _HEADER.size:
+                raise errors.InvalidPackError(
+                    '%s is not a problem pack.' % path)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._signature = (stat.st_ino, stat.st_mtime, stat.st_size)
+
+        magic, version, count, offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise errors.InvalidPackError(
+                '%s is not a version %s problem pack.' % (path, VERSION))
+
+        self._index = {}
+        self._problem_ids = []
+        for _ in range(count):
+            length, = _ID_LENGTH.unpack_from(self._map, offset)
+            offset += _ID_LENGTH.size
+            problem_id = self._map[offset:offset + length].decode('utf-8')
+            offset += length
+            self._index[problem_id] = _ENTRY.unpack_from(self._map, offset)
+            self._problem_ids.append(problem_id)
+            offset += _ENTRY.size
+
+    @property
+    def signature(self):
+        """Identifies the pack file, changes when the pack is replaced.
+
+        :rtype: tuple
+        """
+        return self._signature
+
+    def __contains__(self, problem_id):
+        return problem_id in self._index
+
+    def problem_ids(self):
+        """Lists the identifiers of the problems in the pack.
+
+        :rtype: list
+        """
+        return list(self._problem_ids)
+
+    def load(self, problem_id):
+        """Builds a problem from its record.
+
+        The inputs of the test cases are views of the mapped pack rather than
+        copies.
+
+        :param problem_id: The problem identifier
+        :type problem_id: str
+        :return: The problem or None if it is not in the pack
+        :rtype: problems.Problem
+        """
+        entry = self._index.get(problem_id)
+        if entry is None:
+            return None
+        offset, _ = entry
+        length, = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        record = json.loads(self._map[start:start + length].decode())
+        data = start + length
+        view = memoryview(self._map)
+
+        test_cases = []
+        for case in record['test_cases']:
+            input_start, input_length = case['input']
+            program_input = view[data + input_start:
+                                 data + input_start + input_length]
+            outputs = [self._map[data + output_start:
+                                 data + output_start + output_length]
+                       for output_start, output_length in case['outputs']]
+            test_cases.append(problems.TestCase(
+                case['name'], program_input, outputs, case['time_limit'],
+                input_digest=case['input_digest']))
+        return problems.Problem(problem_id, record['config'],
+                                test_cases=test_cases)
+
+
+class PackCatalog:
+    """Process wide cache of the problems of a pack.
+
+    Provides the same interface as problems.ProblemCatalog. Problems are built
+    from the pack the first time they are requested. The pack file is
+    re-checked at most once every revalidate_interval seconds and mapped
+    again once it has been replaced by a new build.
+    """
+    def __init__(self, path, revalidate_interval=0):
+        self._path = path
+        self._revalidate_interval = float(revalidate_interval or 0)
+        self._pack = ProblemPack(path)
+        self._problems = {}
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def get(self, problem_id):
+        """Gets the problem with the specified identifier.
+
+        :param problem_id: The problem identifier
+        :type problem_id: str
+
+        :return: The problem or None if it is not in the pack
+        :rtype: problems.Problem
+        """
+        self._revalidate()
+        problem = self._problems.get(problem_id)
+        if problem is None:
+            with self._lock:
+                problem = self._problems.get(problem_id)
+                if problem is None:
+                    problem = self._pack.load(problem_id)
+                    if problem is None:
+                        return None
+                    self._problems[problem_id] = problem
+        return problem
+
+    def exists(self, problem_id):
+        """Checks to see if the problem is in the pack.
+
+        :rtype: bool
+        """
+        self._revalidate()
+        return problem_id in self._pack
+
+    def problem_ids(self):
+        """Lists the identifiers of the problems in the pack.
+
+        :rtype: list
+        """
+        self._revalidate()
+        return self._pack.problem_ids()
+
+    def version(self):
+        """Identifies the current pack, changes when it is rebuilt.
+
+        :rtype: tuple
+        """
+        self._revalidate()
+        return self._pack.signature
+
+    def invalidate(self, problem_id=None):
+        """Drops built problems so they are built again on next access.
+
+        :param problem_id: The problem to drop. All problems if None.
+        :type problem_id: str
+        """
+        with self._lock:
+            if problem_id is None:
+                self._problems.clear()
+            else:
+                self._problems.pop(problem_id, None)
+
+    def _revalidate(self):
+        now = time.monotonic()
+        if now - self._checked < self._revalidate_interval:
+            return
+        self._checked = now
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return
+        if (stat.st_ino, stat.st_mtime, stat.st_size) == \
+                self._pack.signature:
+            return
+
+        with self._lock:
+            try:
+                pack = ProblemPack(self._path)
+            except (OSError, errors.InvalidPackError):
+                logging.getLogger().warning(
+                    'Keeping the previous problem pack, %s could not be '
+                    'mapped.', self._path, exc_info=True)
+                return
+            self._pack = pack
+            self._problems = {}
+
+
+def initialize(app_config):
+    """Maps the configured problem pack and registers its catalog.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    path = app_config.get('problem_pack')
+    if not path:
+        return
+    problems.register_catalog(path, PackCatalog(
+        path, app_config.get('problem_cache_revalidate_seconds', 0)))
+
+
+def main():
+    """Main entry point to build a problem pack from the command line"""
+    parser = argparse.ArgumentParser(
+        description='Compiles a problem directory into a problem pack.')
+    parser.add_argument('problem_directory',
+                        help='The directory holding the problem files.')
+    parser.add_argument('pack', help='The path of the pack to write.')
+    args = parser.parse_args()
+
+    count = build_pack(args.problem_directory, args.pack)
+    sys.stdout.write('Packed %s problems into %s\n' % (count, args.pack))
+
+
+if __name__ == '__main__':
+    main()
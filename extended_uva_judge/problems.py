@@ -1,7 +1,651 @@
 """Module to assist with interacting with problems on this Judge."""
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
 from os import listdir
 from os.path import isfile, join
 
+import yaml
+
+from extended_uva_judge import checkers, comparison, errors, utilities
+
+_CATALOGS = {}
+_CATALOGS_LOCK = threading.Lock()
+
+NORMALIZE_CHUNK_BYTES = 1024 * 1024
+
+
+class InputFile:
+    """A program input kept in a file rather than in the problem config.
+
+    The file is normalized like embedded inputs once when the problem is
+    loaded. Files with Windows line endings are translated into a temporary
+    copy, any other file is used as is and only its length leaves out the
+    trailing line breaks. Runs stream the file straight to the standard input
+    of the program (see execution.run_process) so it is never copied into
+    memory.
+    """
+    def __init__(self, path):
+        """
+        :param path: The path of the input file
+        :type path: str
+        """
+        self._path = path
+        self._file = open(path, 'rb')
+        self._map = self._map_file()
+        if self._map is not None and self._map.find(b'\r\n') != -1:
+            self._translate_line_endings()
+
+        length = len(self._map) if self._map is not None else 0
+        while length and self._map[length - 1] == ord(b'\n'):
+            length -= 1
+        self._length = length
+
+        digest = hashlib.sha256()
+        if length:
+            digest.update(memoryview(self._map)[:length])
+        self._digest = digest.hexdigest()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def length(self):
+        """The length of the normalized input in bytes.
+
+        :rtype: int
+        """
+        return self._length
+
+    @property
+    def digest(self):
+        """The sha256 hex digest of the normalized input.
+
+        :rtype: str
+        """
+        return self._digest
+
+    @property
+    def data(self):
+        """The normalized input, mapped from the file.
+
+        :rtype: memoryview
+        """
+        if not self._length:
+            return memoryview(b'')
+        return memoryview(self._map)[:self._length]
+
+    def fileno(self):
+        """The descriptor of the file whose first length bytes are the input.
+
+        Readers must use explicit offsets, such as sendfile or pread, since
+        the descriptor is shared by every run of the test case.
+
+        :rtype: int
+        """
+        return self._file.fileno()
+
+    def _map_file(self):
+        if os.fstat(self._file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _translate_line_endings(self):
+        source, size = self._map, len(self._map)
+        translated = tempfile.TemporaryFile()
+        start = 0
+        while start < size:
+            end = min(start + NORMALIZE_CHUNK_BYTES, size)
+            # Keep a line ending split by the chunk together
+            if end < size and source[end - 1] == ord(b'\r'):
+                end += 1
+            translated.write(source[start:end].replace(b'\r\n', b'\n'))
+            start = end
+        translated.flush()
+
+        source.close()
+        self._file.close()
+        self._file = translated
+        self._map = self._map_file()
+
+
+class TestCase:
+    """A single named input and its accepted outputs."""
+    def __init__(self, name, program_input, outputs, time_limit,
+                 input_file=None, input_digest=None):
+        self._name = name
+        self._input = program_input
+        self._input_file = input_file
+        self._outputs = outputs
+        self._expected_outputs = [comparison.ExpectedOutput(output)
+                                  for output in outputs]
+        self._time_limit = time_limit
+        if input_digest is not None:
+            self._input_digest = input_digest
+        elif input_file is not None:
+            self._input_digest = input_file.digest
+        else:
+            self._input_digest = hashlib.sha256(program_input).hexdigest()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def input(self):
+        """The encoded input to provide to the users program.
+
+        Inputs read from a file are mapped from the file rather than copied.
+
+        :rtype: bytes or memoryview
+        """
+        if self._input_file is not None:
+            return self._input_file.data
+        return self._input
+
+    @property
+    def input_file(self):
+        """The file holding the input if it was not embedded in the problem.
+
+        :rtype: InputFile
+        """
+        return self._input_file
+
+    @property
+    def input_digest(self):
+        """The sha256 hex digest of the normalized input.
+
+        :rtype: str
+        """
+        return self._input_digest
+
+    @property
+    def outputs(self):
+        """The normalized, encoded list of accepted outputs.
+
+        :rtype: list
+        """
+        return self._outputs
+
+    @property
+    def expected_outputs(self):
+        """The accepted outputs along with their precomputed normalized forms.
+
+        :rtype: list of comparison.ExpectedOutput
+        """
+        return self._expected_outputs
+
+    @property
+    def time_limit(self):
+        """The time limit of the test case in seconds.
+
+        :rtype: float
+        """
+        return self._time_limit
+
+
+class Problem:
+    """Parsed and pre-normalized representation of a problem configuration.
+
+    Everything the workers need on the hot path (the encoded program input and
+    the normalized expected outputs) is computed once when the problem is
+    loaded rather than on every submission.
+
+    Problems either list their test cases under "test_cases", each with a
+    "name", "input", "output" and optional "time_limit", or provide a single
+    top level "input" and "output" which is treated as one test case.
+
+    Instead of "input" and "output" test cases can name an "input_file" and
+    an "output_file", relative to the problem directory, holding them.
+
+    Problems with a "checker" have their outputs judged by the checker (see
+    checkers.py) and their "output" is optional. Problems with the "float"
+    "comparator" accept numbers within their "absolute_tolerance" or
+    "relative_tolerance" of the expected numbers.
+    """
+    def __init__(self, problem_id, config, directory=None, test_cases=None):
+        """
+        :param problem_id: The problem identifier
+        :type problem_id: str
+        :param config: The parsed problem file
+        :type config: dict
+        :param directory: The directory input and output files are relative to
+        :type directory: str
+        :param test_cases: Already normalized test cases, such as those of a
+                           problem pack, used instead of the ones in config
+        :type test_cases: list
+        """
+        self._problem_id = problem_id
+        self._config = config  # type: dict
+        self._directory = directory or ''
+        self._files = []
+        self._time_limit = float(config['time_limit'])
+        output_limit = config.get('output_limit')
+        self._output_limit = None if output_limit is None else int(
+            output_limit)
+        memory_limit = config.get('memory_limit')
+        self._memory_limit = None if memory_limit is None else float(
+            memory_limit)
+        checker = config.get('checker')
+        if isinstance(checker, dict):
+            self._checker = checkers.parse_command(checker.get('command'))
+            checker_timeout = checker.get('timeout')
+        else:
+            self._checker = checkers.parse_command(checker)
+            checker_timeout = None
+        self._checker_timeout = None if checker_timeout is None else float(
+            checker_timeout)
+        self._comparator = config.get(
+            'comparator') or comparison.EXACT_COMPARATOR
+        if self._comparator not in comparison.COMPARATORS:
+            raise ValueError('Unknown comparator %s of problem %s.' %
+                             (self._comparator, problem_id))
+        self._absolute_tolerance = float(config.get(
+            'absolute_tolerance', comparison.DEFAULT_ABSOLUTE_TOLERANCE))
+        self._relative_tolerance = float(config.get(
+            'relative_tolerance', comparison.DEFAULT_RELATIVE_TOLERANCE))
+
+        if test_cases is not None:
+            self._test_cases = test_cases
+        elif 'test_cases' in config:
+            self._test_cases = [
+                self._build_test_case(case, str(index))
+                for index, case in enumerate(config['test_cases'], 1)]
+        else:
+            self._test_cases = [self._build_test_case(config, 'default')]
+        self._digest = None
+
+    @property
+    def problem_id(self):
+        return self._problem_id
+
+    @property
+    def title(self):
+        """The title of the problem if the configuration names one.
+
+        :rtype: str
+        """
+        title = self._config.get('title')
+        return None if title is None else str(title)
+
+    @property
+    def digest(self):
+        """A hash of the problem configuration that changes with its content.
+
+        :rtype: str
+        """
+        if self._digest is None:
+            content = json.dumps(self._config, sort_keys=True, default=str)
+            digest = hashlib.sha256(content.encode())
+            # Input and output files are only named in the configuration
+            for test_case in self._test_cases:
+                digest.update(test_case.input_digest.encode())
+                for output in test_case.outputs:
+                    digest.update(hashlib.sha256(output).digest())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    @property
+    def files(self):
+        """The input and output files the problem reads.
+
+        :rtype: list
+        """
+        return self._files
+
+    @property
+    def config(self):
+        """The raw configuration as read from the problem file.
+
+        :rtype: dict
+        """
+        return self._config
+
+    @property
+    def time_limit(self):
+        """The default time limit of the test cases in seconds.
+
+        :rtype: float
+        """
+        return self._time_limit
+
+    @property
+    def output_limit(self):
+        """The max bytes of output a test case may produce if set.
+
+        :rtype: int
+        """
+        return self._output_limit
+
+    @property
+    def memory_limit(self):
+        """The max megabytes of memory a test case may use if set.
+
+        :rtype: float
+        """
+        return self._memory_limit
+
+    @property
+    def checker(self):
+        """The command starting the checker of the problem if it has one.
+
+        :rtype: list
+        """
+        return self._checker
+
+    @property
+    def checker_timeout(self):
+        """Seconds the checker has to judge an output if set.
+
+        :rtype: float
+        """
+        return self._checker_timeout
+
+    @property
+    def comparator(self):
+        """The name of the comparator judging outputs, exact or float.
+
+        :rtype: str
+        """
+        return self._comparator
+
+    @property
+    def absolute_tolerance(self):
+        """Max absolute difference of numbers for the float comparator.
+
+        :rtype: float
+        """
+        return self._absolute_tolerance
+
+    @property
+    def relative_tolerance(self):
+        """Max relative difference of numbers for the float comparator.
+
+        :rtype: float
+        """
+        return self._relative_tolerance
+
+    @property
+    def test_cases(self):
+        """The test cases of the problem in the order they should be run.
+
+        :rtype: list
+        """
+        return self._test_cases
+
+    def _build_test_case(self, case_config, default_name):
+        if 'output_file' in case_config:
+            outputs = case_config['output_file']
+            if not isinstance(outputs, list):
+                outputs = [outputs]
+            outputs = [_read_output_file(self._resolve(path))
+                       for path in outputs]
+        else:
+            if self._checker is not None:
+                outputs = case_config.get('output', '')
+            else:
+                outputs = case_config['output']
+            if not isinstance(outputs, list):
+                outputs = [outputs]
+            outputs = [_normalize_output(expected) for expected in outputs]
+
+        program_input = b''
+        input_file = None
+        if 'input_file' in case_config:
+            input_file = InputFile(self._resolve(case_config['input_file']))
+        else:
+            program_input = _normalize_input(case_config['input'])
+
+        time_limit = case_config.get('time_limit')
+        return TestCase(
+            str(case_config.get('name', default_name)),
+            program_input,
+            outputs,
+            self._time_limit if time_limit is None else float(time_limit),
+            input_file)
+
+    def _resolve(self, path):
+        path = os.path.join(self._directory, str(path))
+        self._files.append(path)
+        return path
+
+
+def _normalize_input(program_input):
+    return program_input.replace('\r\n', '\n').rstrip('\n').encode()
+
+
+def _normalize_output(expected):
+    return _normalize_output_bytes(expected.encode())
+
+
+def _normalize_output_bytes(expected):
+    return expected.replace(os.linesep.encode(), b'\n').strip()
+
+
+def _read_output_file(path):
+    with open(path, 'rb') as f:
+        return _normalize_output_bytes(f.read())
+
+
+class _CatalogEntry:
+    def __init__(self, problem, mtime, size, checked):
+        self.problem = problem
+        self.mtime = mtime
+        self.size = size
+        self.checked = checked
+        self.files = _stat_files(problem.files)
+
+    def is_current(self, stat):
+        return (self.mtime == stat.st_mtime and self.size == stat.st_size and
+                self.files == _stat_files(self.problem.files))
+
+
+def _stat_files(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return signature
+
+
+class ProblemCatalog:
+    """Process wide cache of parsed problems.
+
+    Problems are parsed the first time they are requested and kept in memory.
+    The backing file is re-checked at most once every revalidate_interval
+    seconds; when its modification time or size, or that of an input or output
+    file it reads, changes the problem is parsed again so edits to the problem
+    directory are picked up without a restart.
+    """
+    def __init__(self, problem_directory, revalidate_interval=0):
+        self._problem_directory = problem_directory
+        self._revalidate_interval = float(revalidate_interval or 0)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def problem_directory(self):
+        return self._problem_directory
+
+    def get(self, problem_id):
+        """Gets the problem with the specified identifier.
+
+        :param problem_id: The problem identifier
+        :type problem_id: str
+
+        :return: The parsed problem or None if it does not exist
+        :rtype: Problem
+        """
+        if not is_valid_problem_id(problem_id):
+            return None
+        now = time.monotonic()
+        entry = self._entries.get(problem_id)
+        if (entry is not None and
+                now - entry.checked < self._revalidate_interval):
+            return entry.problem
+
+        path = self._problem_path(problem_id)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(problem_id, None)
+            return None
+
+        if entry is not None and entry.is_current(stat):
+            entry.checked = now
+            return entry.problem
+
+        with self._lock:
+            # Another thread may have already refreshed the entry
+            entry = self._entries.get(problem_id)
+            if entry is None or not entry.is_current(stat):
+                entry = _CatalogEntry(self._load(problem_id, path),
+                                      stat.st_mtime, stat.st_size, now)
+                self._entries[problem_id] = entry
+        return entry.problem
+
+    def exists(self, problem_id):
+        """Checks to see if the problem exists in the catalog.
+
+        :return: True if it exists, false otherwise
+        :rtype: bool
+        """
+        return self.get(problem_id) is not None
+
+    def problem_ids(self):
+        """Lists the identifiers of the problems in the directory.
+
+        :rtype: list
+        """
+        return list_problem_ids(self._problem_directory)
+
+    def version(self):
+        """Identifies the current content of the problem directory.
+
+        Changes when a problem file is added, removed or modified.
+
+        :rtype: tuple
+        """
+        files = []
+        for name in sorted(listdir(self._problem_directory)):
+            if not name.endswith('.yaml'):
+                continue
+            try:
+                stat = os.stat(join(self._problem_directory, name))
+            except OSError:
+                continue
+            files.append((name, stat.st_mtime, stat.st_size))
+        return tuple(files)
+
+    def invalidate(self, problem_id=None):
+        """Drops cached problems so they are parsed again on next access.
+
+        :param problem_id: The problem to drop. All problems if None.
+        :type problem_id: str
+        """
+        with self._lock:
+            if problem_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(problem_id, None)
+
+    def _problem_path(self, problem_id):
+        return join(self._problem_directory, '%s.yaml' % problem_id)
+
+    @staticmethod
+    def _load(problem_id, path):
+        with open(path) as f:
+            config = yaml.safe_load(f)
+        return Problem(problem_id, config, os.path.dirname(path))
+
+
+def get_catalog(app_config):
+    """Gets the process wide problem catalog for the configured directory.
+
+    A catalog registered for the configured problem pack takes precedence
+    over the problem directory.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+
+    :return: The problem catalog
+    :rtype: ProblemCatalog
+    """
+    problem_pack = app_config.get('problem_pack')
+    if problem_pack:
+        catalog = _CATALOGS.get(problem_pack)
+        if catalog is None:
+            raise errors.MissingConfigEntryError('problem_pack')
+        return catalog
+
+    problem_directory = utilities.get_problem_directory(app_config)
+    catalog = _CATALOGS.get(problem_directory)
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.get(problem_directory)
+            if catalog is None:
+                catalog = ProblemCatalog(
+                    problem_directory,
+                    app_config.get('problem_cache_revalidate_seconds', 0))
+                _CATALOGS[problem_directory] = catalog
+    return catalog
+
+
+def register_catalog(source, catalog):
+    """Registers the catalog of a problem source other than a directory.
+
+    :param source: The configured source, such as the path of a problem pack
+    :type source: str
+    :param catalog: The catalog, providing the interface of ProblemCatalog
+    :type catalog: object
+    """
+    with _CATALOGS_LOCK:
+        _CATALOGS[source] = catalog
+
+
+def get_problem(app_config, problem_id):
+    """Gets the parsed problem from the process wide catalog.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param problem_id: The problem identifier
+    :type problem_id: str
+
+    :return: The parsed problem or None if it does not exist
+    :rtype: Problem
+    """
+    return get_catalog(app_config).get(problem_id)
+
+
+def is_valid_problem_id(problem_id):
+    """Checks that a problem identifier can not name a file elsewhere.
+
+    :param problem_id: The problem identifier
+    :type problem_id: str
+    :rtype: bool
+    """
+    return bool(problem_id) and '..' not in problem_id and not any(
+        separator in problem_id for separator in ('/', os.sep))
+
+
+def does_problem_exist(app_config, problem_id):
+    """Checks to see if the problem exists in the system.
+
+    :return: True if it exists, false otherwise
+    :rtype: bool
+    """
+    return get_catalog(app_config).exists(problem_id)
+
 
 def get_available_problems(config):
     """Gets available problems on this Judge.
@@ -12,8 +656,16 @@ def get_available_problems(config):
     :return: List of the available UVa problem numbers
     :rtype: list
     """
-    p_dir = config.get('problem_directory')
+    return get_catalog(config).problem_ids()
 
+
+def list_problem_ids(problem_directory):
+    """Lists the identifiers of the problem files in a directory.
+
+    :param problem_directory: The directory holding the problem files
+    :type problem_directory: str
+    :rtype: list
+    """
     # remove the .yaml off the file names
-    files = [f[:-5] for f in listdir(p_dir) if isfile(join(p_dir, f))]
-    return files
+    return [f[:-5] for f in listdir(problem_directory)
+            if f.endswith('.yaml') and isfile(join(problem_directory, f))]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""Module housing the rejudge engine.
+
+After a problem is corrected every stored submission of it (see storage.py)
+is judged again. Submissions whose test cases kept their input and limits are
+only compared against the corrected expected outputs. The rest are run again.
+
+A rejudge is started from the rejudge endpoint or from the command line:
+
+    extended-uva-judge-rejudge <problem_id> [--config <path>]
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from extended_uva_judge import enums, errors, server, storage
+from extended_uva_judge.objects import ProblemWorkerFactory, Submission
+
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_MAX_RETAINED = 100
+
+VERIFIED = 'verified'
+EXECUTED = 'executed'
+FAILED = 'failed'
+
+_REJUDGES = OrderedDict()
+_REJUDGES_LOCK = threading.Lock()
+
+
+class Rejudge:
+    """A rejudge of every stored submission of one problem."""
+    def __init__(self, problem_id):
+        self._rejudge_id = uuid.uuid4().hex
+        self._problem_id = problem_id
+        self._status = enums.JobStatus.QUEUED
+        self._total = 0
+        self._counts = {VERIFIED: 0, EXECUTED: 0, FAILED: 0}
+        self._changes = []
+        self._started = None
+        self._finished = None
+        self._lock = threading.Lock()
+
+    @property
+    def rejudge_id(self):
+        return self._rejudge_id
+
+    @property
+    def status(self):
+        return self._status
+
+    def run(self, store, max_workers=DEFAULT_MAX_WORKERS, progress=None):
+        """Rejudges the stored submissions of the problem.
+
+        :param store: The store holding the submissions
+        :type store: storage.SubmissionStore
+        :param max_workers: Max submissions rejudged at the same time
+        :type max_workers: int
+        :param progress: Callable receiving the rejudge after every
+                         submission
+        :type progress: callable
+        """
+        self._status = enums.JobStatus.RUNNING
+        self._started = time.time()
+        submissions = store.list_submissions(self._problem_id)
+        self._total = len(submissions)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._rejudge_submission, stored)
+                       for stored in submissions]
+            for future in as_completed(futures):
+                submission_id, mode, previous, current = future.result()
+                with self._lock:
+                    self._counts[mode] += 1
+                    if current is not None and current != previous:
+                        self._changes.append({
+                            'submission_id': submission_id,
+                            'previous': previous,
+                            'current': current
+                        })
+                if progress is not None:
+                    progress(self)
+
+        self._finished = time.time()
+        self._status = enums.JobStatus.COMPLETE
+
+    def to_dict(self):
+        with self._lock:
+            processed = sum(self._counts.values())
+            return {
+                'rejudge_id': self._rejudge_id,
+                'problem_id': self._problem_id,
+                'status': self._status,
+                'total': self._total,
+                'processed': processed,
+                'verified': self._counts[VERIFIED],
+                'executed': self._counts[EXECUTED],
+                'failed': self._counts[FAILED],
+                'changes': list(self._changes),
+                'started': self._started,
+                'finished': self._finished
+            }
+
+    def _rejudge_submission(self, stored):
+        """Judges one stored submission again.
+
+        :param stored: The stored submission
+        :type stored: storage.StoredSubmission
+        :return: The submission identifier, how it was rejudged and its
+                 previous and new verdict codes
+        :rtype: tuple
+        """
+        previous = stored.verdict.get('code')
+        try:
+            with ProblemWorkerFactory.create_worker(
+                    stored.language, stored.problem_id, False,
+                    stored.full_report, stored.submission_id) as worker:
+                result = worker.verify(stored)
+            mode = VERIFIED
+
+            if result is None:
+                with ProblemWorkerFactory.create_worker(
+                        stored.language, stored.problem_id, False,
+                        stored.full_report, stored.submission_id) as worker:
+                    result = worker.test(Submission(stored.filename,
+                                                    stored.read_source()))
+                mode = EXECUTED
+        except Exception:
+            logging.getLogger().exception(
+                'Failed to rejudge submission %s of problem %s.',
+                stored.submission_id, stored.problem_id)
+            return stored.submission_id, FAILED, previous, None
+
+        return stored.submission_id, mode, previous, result.code
+
+
+def start(app_config, problem_id):
+    """Starts rejudging the stored submissions of a problem in the background.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :param problem_id: The problem to rejudge
+    :type problem_id: str
+    :return: The started rejudge
+    :rtype: Rejudge
+    :raises errors.MissingConfigEntryError: If the store is not configured
+    """
+    store = _get_store()
+    rejudge = Rejudge(problem_id)
+    with _REJUDGES_LOCK:
+        _REJUDGES[rejudge.rejudge_id] = rejudge
+        while len(_REJUDGES) > DEFAULT_MAX_RETAINED:
+            _REJUDGES.popitem(last=False)
+
+    thread = threading.Thread(target=rejudge.run,
+                              args=(store, _get_max_workers(app_config)))
+    thread.daemon = True
+    thread.start()
+    return rejudge
+
+
+def get(rejudge_id):
+    """Gets a started rejudge.
+
+    :return: The rejudge or None if it is unknown or has been discarded
+    :rtype: Rejudge
+    """
+    return _REJUDGES.get(rejudge_id)
+
+
+def _get_store():
+    store = storage.get_store()
+    if store is None:
+        raise errors.MissingConfigEntryError('submission_store.directory')
+    return store
+
+
+def _get_max_workers(app_config):
+    return int(app_config.get('rejudge_workers') or
+               app_config.get('max_submission_workers') or
+               DEFAULT_MAX_WORKERS)
+
+
+def _print_progress(rejudge):
+    progress = rejudge.to_dict()
+    sys.stdout.write('\r%(processed)s/%(total)s rejudged, %(verified)s '
+                     'verified, %(executed)s run again, %(failed)s '
+                     'failed' % progress)
+    sys.stdout.flush()
+
+
+def main():
+    """Main entry point to rejudge a problem from the command line"""
+    parser = argparse.ArgumentParser(
+        description='Rejudges the stored submissions of a problem.')
+    parser.add_argument('problem_id', help='The problem to rejudge.')
+    parser.add_argument(
+        '--config', action='store', default=None, type=str,
+        help='The path to user defined overrides of the config.')
+    args = parser.parse_args()
+
+    config = server.load_config(
+        args.config or os.environ.get('EXTENDED_UVA_JUDGE_CONFIG', None))
+    logging.basicConfig(level=logging.WARNING)
+    ProblemWorkerFactory.initialize(config)
+
+    rejudge = Rejudge(args.problem_id)
+    rejudge.run(_get_store(), _get_max_workers(config), _print_progress)
+    sys.stdout.write('\n')
+    for change in rejudge.to_dict()['changes']:
+        sys.stdout.write('%(submission_id)s: %(previous)s -> %(current)s\n' %
+                         change)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""Module housing the restricted construct scanners.
+
+Each language may list constructs under "restricted" that submissions are not
+allowed to contain. The list is compiled once per language, when the judge is
+initialized, into a single regular expression shaped like a trie of the
+constructs. Scanning a submission is then one pass over its source no matter
+how many constructs are restricted.
+
+With "token_aware_scan" enabled for a language, comments and string literals
+are blanked out before scanning so they can not trigger a restriction.
+
+Python languages with "ast_scan" enabled are instead parsed and their
+imports and attribute accesses are checked against the restricted modules.
+This can not be fooled by spacing or aliases the way a text scan can. The
+results are memoized by a hash of the source so resubmissions are free.
+"""
+import ast
+import hashlib
+import re
+import threading
+
+from collections import OrderedDict
+
+from extended_uva_judge import languages
+
+# String literals capture their prefix so interpolated strings, whose
+# fields are code, are never blanked. See _blank_literal.
+_PYTHON_LITERALS = re.compile(
+    br'(?P<prefix>(?<![\w])[rRbBuUfF]{1,2})?'
+    br"(?:'''(?:\\.|[^\\])*?'''"
+    br'|"""(?:\\.|[^\\])*?"""'
+    br"|'(?:\\.|[^\\'\n])*'"
+    br'|"(?:\\.|[^\\"\n])*")'
+    br'|#[^\n]*',
+    re.DOTALL)
+
+# Numbers are matched, and kept, so the digit separators of C++14 and C23,
+# as in 1'000, are never taken for the start of a character literal.
+_C_LIKE_LITERALS = re.compile(
+    br'//[^\n]*'
+    br'|/\*.*?\*/'
+    br'|(?P<prefix>\$?@\$?|\$)?'
+    br'(?:(?<=@)"(?:""|[^"])*"'
+    br'|"(?:\\.|[^\\"\n])*")'
+    br"|(?P<number>(?<![\w.])\d(?:'?[\w.])*)"
+    br"|'(?:\\.|[^\\'\n])*'",
+    re.DOTALL)
+
+# Prefixes of strings that interpolate code, f-strings and C# $ strings
+_INTERPOLATING_PREFIXES = (b'f', b'F', b'$')
+
+_LITERALS = {
+    languages.PYTHON2: _PYTHON_LITERALS,
+    languages.PYTHON3: _PYTHON_LITERALS,
+    languages.C_SHARP: _C_LIKE_LITERALS,
+    languages.JAVA: _C_LIKE_LITERALS,
+    languages.C: _C_LIKE_LITERALS,
+    languages.CPP: _C_LIKE_LITERALS
+}
+
+_IMPORT_FUNCTIONS = ('__import__', 'importlib.import_module')
+
+# Functions that can import or run anything when given a computed argument
+_DYNAMIC_FUNCTIONS = ('exec', 'eval', 'compile') + _IMPORT_FUNCTIONS
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][\w.]*')
+
+DEFAULT_MEMO_SIZE = 1024
+
+_SCANNERS = {}
+_SCANNERS_LOCK = threading.Lock()
+
+
+class RestrictedScanner:
+    """Finds every restricted construct in a submission in a single pass."""
+    def __init__(self, restricted, literals=None):
+        """
+        :param restricted: The restricted constructs
+        :type restricted: list
+        :param literals: Expression matching the comments and string literals
+                         to ignore, or None to scan them as well
+        :type literals: re.Pattern
+        """
+        self._restricted = {}
+        for item in restricted:
+            if item:
+                self._restricted.setdefault(str(item).encode(), str(item))
+        self._lengths = sorted(set(len(item) for item in self._restricted))
+        self._literals = literals
+        self._pattern = None
+        if self._restricted:
+            self._pattern = re.compile(
+                b'(?=(' + _build_trie_pattern(self._restricted) + b'))')
+
+    @property
+    def restricted(self):
+        return list(self._restricted.values())
+
+    def scan(self, source):
+        """Finds the restricted constructs in the source.
+
+        :param source: The source of the submission
+        :type source: bytes
+
+        :return: Every restricted construct found, in order of first
+                 occurrence
+        :rtype: list
+        """
+        if self._pattern is None:
+            return []
+        if self._literals is not None:
+            source = self._literals.sub(_blank_literal, source)
+
+        hits = []
+        seen = set()
+        for match in self._pattern.finditer(source):
+            # The trie matches the longest construct at each position, any
+            # shorter constructs it starts with are hits as well
+            longest = match.group(1)
+            for length in self._lengths:
+                if length > len(longest):
+                    break
+                item = longest[:length]
+                if item in self._restricted and item not in seen:
+                    seen.add(item)
+                    hits.append(self._restricted[item])
+            if len(seen) == len(self._restricted):
+                break
+        return hits
+
+
+def _blank_literal(match):
+    if match.groupdict().get('number'):
+        return match.group(0)
+    prefix = match.group('prefix')
+    if prefix and any(char in prefix for char in _INTERPOLATING_PREFIXES):
+        return match.group(0)
+    return b' '
+
+
+class PythonImportAnalyzer:
+    """Finds restricted modules a Python submission imports or uses.
+
+    A restricted construct such as "os.fork" or "subprocess" matches every
+    imported module, from import, dotted attribute access and getattr with
+    a literal name that starts with it, after resolving import aliases.
+    String constants naming a restricted module, or a module it is in, match
+    as well since they can be imported or run dynamically. Calls to exec,
+    eval, compile and the import functions with anything but a string
+    literal are hits of their own. Sources the interpreter of the judge can
+    not parse fall back to a text scan.
+    """
+    def __init__(self, restricted, memo_size=DEFAULT_MEMO_SIZE):
+        """
+        :param restricted: The restricted constructs
+        :type restricted: list
+        :param memo_size: Max results remembered by source hash
+        :type memo_size: int
+        """
+        self._restricted = [str(item) for item in restricted if item]
+        self._fallback = RestrictedScanner(self._restricted)
+        # A module can only be used if its top level name, or a function
+        # building its name at run time, is in the source
+        self._roots = RestrictedScanner(
+            [item.split('.')[0] for item in self._restricted] +
+            [function.split('.')[-1] for function in _DYNAMIC_FUNCTIONS])
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    @property
+    def restricted(self):
+        return list(self._restricted)
+
+    def scan(self, source):
+        """Finds the restricted constructs used by the source.
+
+        :param source: The source of the submission
+        :type source: bytes
+
+        :return: Every restricted construct used, in order of first use
+        :rtype: list
+        """
+        if not self._restricted:
+            return []
+
+        key = hashlib.sha256(source).digest()
+        with self._lock:
+            hits = self._memo.get(key)
+            if hits is not None:
+                self._memo.move_to_end(key)
+                return list(hits)
+
+        if not self._roots.scan(source):
+            hits = []
+        else:
+            try:
+                tree = ast.parse(source)
+            except (SyntaxError, ValueError):
+                hits = self._fallback.scan(source)
+            else:
+                names, dynamic = _used_names(tree)
+                hits = self._check_names(names) + list(
+                    OrderedDict.fromkeys(dynamic))
+
+        with self._lock:
+            self._memo[key] = hits
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return list(hits)
+
+    def _check_names(self, names):
+        hits = []
+        for name in OrderedDict.fromkeys(names):
+            for item in self._restricted:
+                if item in hits:
+                    continue
+                if name.startswith(item) or (
+                        name.endswith('.*') and item.startswith(name[:-1])):
+                    hits.append(item)
+        return hits
+
+
+def _used_names(tree):
+    """Gets the fully qualified names of the imported modules and attributes.
+
+    The dotted names in string constants are included both as they are and
+    as a star import of everything under them.
+
+    :param tree: The parsed module
+    :type tree: ast.Module
+    :return: The names in the order they appear in the source and the
+             dynamic functions called with a computed argument
+    :rtype: tuple
+    """
+    # Aliases apply wherever they are used, even above the import in a
+    # function body, so they are all collected before names are resolved
+    aliases = {}
+    nodes = list(ast.walk(tree))
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                root = alias.name.split('.')[0]
+                aliases[alias.asname or root] = (
+                    alias.name if alias.asname else root)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            for alias in node.names:
+                if alias.name != '*':
+                    aliases[alias.asname or alias.name] = '%s.%s' % (
+                        node.module, alias.name)
+
+    found = []
+    dynamic = []
+    for node in nodes:
+        names = []
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names = ['%s.%s' % (node.module, alias.name)
+                     for alias in node.names]
+        elif isinstance(node, ast.Call):
+            function = _dotted_name(node.func, aliases, imported_only=False)
+            if function in _DYNAMIC_FUNCTIONS:
+                if not node.args or _string_value(node.args[0]) is None:
+                    dynamic.append((node.lineno, node.col_offset, function))
+                elif function in _IMPORT_FUNCTIONS:
+                    names = [_string_value(node.args[0])]
+            elif (function == 'getattr' and len(node.args) > 1 and
+                    _string_value(node.args[1]) is not None):
+                owner = _dotted_name(node.args[0], aliases)
+                if owner is not None:
+                    names = ['%s.%s' % (owner, _string_value(node.args[1]))]
+        elif isinstance(node, (ast.Attribute, ast.Name)):
+            names = [_dotted_name(node, aliases)]
+        elif _string_value(node) is not None:
+            for name in _IDENTIFIER.findall(_string_value(node)):
+                names.extend([name, name.rstrip('.') + '.*'])
+        for name in names:
+            if name is not None:
+                found.append((node.lineno, node.col_offset, name))
+
+    return ([name for _, _, name in sorted(found)],
+            [function for _, _, function in sorted(dynamic)])
+
+
+def _dotted_name(node, aliases, imported_only=True):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    if node.id in aliases:
+        parts.append(aliases[node.id])
+    elif imported_only:
+        return None
+    else:
+        parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+def _string_value(node):
+    # String literals are ast.Str before python 3.8 and ast.Constant after
+    kind = node.__class__.__name__
+    if kind == 'Constant':
+        value = node.value
+    elif kind == 'Str':
+        value = node.s
+    else:
+        return None
+    return value if isinstance(value, str) else None
+
+
+def _build_trie_pattern(items):
+    trie = {}
+    for item in items:
+        node = trie
+        for index in range(len(item)):
+            node = node.setdefault(item[index:index + 1], {})
+        node[b''] = {}
+    return _trie_to_pattern(trie)
+
+
+def _trie_to_pattern(node):
+    branches = [re.escape(char) + _trie_to_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return b''
+    if len(branches) == 1:
+        pattern = branches[0]
+        if b'' not in node:
+            return pattern
+        return b'(?:' + pattern + b')?'
+    pattern = b'(?:' + b'|'.join(branches) + b')'
+    # Greedy so the longest construct at a position is the one matched
+    return pattern + b'?' if b'' in node else pattern
+
+
+def initialize(app_config):
+    """Compiles the restricted construct scanners of every language.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    scanners = {}
+    for language, details in (app_config.get('languages') or {}).items():
+        details = details or {}
+        restricted = details.get('restricted')
+        if restricted is None:
+            continue
+        if (details.get('ast_scan') and
+                language in (languages.PYTHON2, languages.PYTHON3)):
+            scanners[language] = PythonImportAnalyzer(restricted)
+            continue
+        literals = None
+        if details.get('token_aware_scan'):
+            literals = _LITERALS.get(language)
+        scanners[language] = RestrictedScanner(restricted, literals)
+
+    with _SCANNERS_LOCK:
+        _SCANNERS.clear()
+        _SCANNERS.update(scanners)
+
+
+def get_scanner(language):
+    """Gets the restricted construct scanner of the language.
+
+    :param language: The normalized programming language
+    :type language: str
+    :return: The scanner or None if the language restricts nothing
+    :rtype: RestrictedScanner or PythonImportAnalyzer
+    """
+    return _SCANNERS.get(language)
@@ -20,7 +20,7 @@ import flask
 import waitress
 import yaml
 
-from extended_uva_judge import logging_helper
+from extended_uva_judge import jobs, logging_helper
 from extended_uva_judge.objects import ProblemWorkerFactory
 
 CURRENT_DIR = path.abspath(__file__).replace('.pyc', '.py').replace(
@@ -46,18 +46,15 @@ def register_blueprints(app):
             app.register_blueprint(controller.MOD)
 
 
-def build_app(override_config=None):
-    """Builds the flask application
+def load_config(override_config=None):
+    """Loads the configuration of the judge
 
     :param override_config: Path to configuration to override defaults.
     :type override_config: str
 
-    :return: tuple of the flask application and configuration dictionary
-    :rtype: tuple
+    :return: The configuration dictionary
+    :rtype: dict
     """
-    app = flask.Flask('Extended-UVA-Judge',
-                      template_folder='templates',
-                      static_folder='static')
     config = yaml.load(open(CURRENT_DIR + 'config.yml'))
 
     if override_config:
@@ -67,8 +64,26 @@ def build_app(override_config=None):
         cfg = yaml.load(open(override_config))
         config.update(cfg)
 
+    return config
+
+
+def build_app(override_config=None):
+    """Builds the flask application
+
+    :param override_config: Path to configuration to override defaults.
+    :type override_config: str
+
+    :return: tuple of the flask application and configuration dictionary
+    :rtype: tuple
+    """
+    app = flask.Flask('Extended-UVA-Judge',
+                      template_folder='templates',
+                      static_folder='static')
+    config = load_config(override_config)
+
     logging_helper.initialize(config, app)
     ProblemWorkerFactory.initialize(config)
+    jobs.initialize(config)
 
     register_blueprints(app)
 
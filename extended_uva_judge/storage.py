@@ -0,0 +1,389 @@
+"""Module housing the store of judged submissions.
+
+When a problem is corrected its past submissions need to be judged again. The
+store keeps the source of every judged submission together with the verdict
+of each test case and the raw output the program produced, so a rejudge can
+compare the recorded outputs against the corrected expected outputs instead of
+running every submission again (see rejudge.py).
+
+Outputs are written to the store as the program produces them, see
+OutputRecording, so they are never held in memory.
+
+Submissions are stored below "<directory>/<problem_id>/<submission_id>/".
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_MAX_OUTPUT_BYTES = 16 * 1024 * 1024
+
+METADATA_FILE = 'submission.json'
+SOURCE_FILE = 'source'
+OUTPUT_DIRECTORY = 'outputs'
+RECORDING_DIRECTORY = '.recordings'
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+class StoredSubmission:
+    """A judged submission read back from the store."""
+    def __init__(self, directory, metadata):
+        self._directory = directory
+        self._metadata = metadata
+
+    @property
+    def submission_id(self):
+        return self._metadata['submission_id']
+
+    @property
+    def problem_id(self):
+        return self._metadata['problem_id']
+
+    @property
+    def language(self):
+        return self._metadata['language']
+
+    @property
+    def filename(self):
+        return self._metadata['filename']
+
+    @property
+    def full_report(self):
+        return self._metadata.get('full_report', False)
+
+    @property
+    def verdict(self):
+        """The body of the last verdict of the submission.
+
+        :rtype: dict
+        """
+        return self._metadata.get('verdict') or {}
+
+    @property
+    def test_cases(self):
+        """The recorded results of the test cases that were run.
+
+        Each result has the "name", "code", "trace", "usage" and "run_key" of
+        the test case, the "output" file holding the programs output if it
+        was kept and "partial" if the program was stopped before its output
+        ended.
+
+        :rtype: list
+        """
+        return self._metadata.get('test_cases') or []
+
+    def read_source(self):
+        """Reads the source of the submission.
+
+        :rtype: bytes
+        """
+        with open(os.path.join(self._directory, SOURCE_FILE), 'rb') as f:
+            return f.read()
+
+    def read_output(self, name):
+        """Reads the recorded output of a test case.
+
+        :param name: The name of the test case
+        :type name: str
+        :return: The output or None if it was not kept
+        :rtype: bytes
+        """
+        for case in self.test_cases:
+            if case['name'] == name and case.get('output'):
+                path = os.path.join(self._directory, OUTPUT_DIRECTORY,
+                                    case['output'])
+                try:
+                    with open(path, 'rb') as f:
+                        return f.read()
+                except OSError:
+                    return None
+        return None
+
+
+class OutputRecording:
+    """The output of a test case, written to the store as it is read.
+
+    Outputs larger than the max bytes of the store are discarded as soon as
+    they grow past it.
+    """
+    def __init__(self, directory, max_bytes):
+        """
+        :param directory: The directory holding the recordings in progress
+        :type directory: str
+        :param max_bytes: Max bytes of output kept
+        :type max_bytes: int
+        """
+        fd, self._path = tempfile.mkstemp(prefix='output-', dir=directory)
+        self._file = os.fdopen(fd, 'wb')
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._partial = False
+
+    @property
+    def path(self):
+        """The file holding the output or None if it was discarded.
+
+        :rtype: str
+        """
+        return self._path
+
+    @property
+    def partial(self):
+        return self._partial
+
+    def write(self, chunk):
+        """Appends a chunk of output.
+
+        :param chunk: The output read from the program
+        :type chunk: bytes
+        """
+        if self._path is None:
+            return
+        self._size += len(chunk)
+        if self._size > self._max_bytes:
+            self.discard()
+            return
+        try:
+            self._file.write(chunk)
+        except OSError:
+            logging.getLogger().warning('Failed to record output.',
+                                        exc_info=True)
+            self.discard()
+
+    def finish(self, partial):
+        """Completes the recording once the program has exited.
+
+        :param partial: If the program was stopped before its output ended
+        :type partial: bool
+        """
+        self._partial = partial
+        self._file.close()
+
+    def move(self, destination):
+        """Moves the recorded output into a stored submission.
+
+        :param destination: The path of the output in the submission
+        :type destination: str
+        """
+        self._file.close()
+        os.replace(self._path, destination)
+        self._path = None
+
+    def discard(self):
+        self._file.close()
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+
+class SubmissionStore:
+    """On disk store of judged submissions and their outputs."""
+    def __init__(self, directory, max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES):
+        """
+        :param directory: The directory holding the stored submissions
+        :type directory: str
+        :param max_output_bytes: Outputs of test cases larger than this are
+                                 not kept, those test cases are run again
+                                 when the submission is rejudged
+        :type max_output_bytes: int
+        """
+        self._directory = directory
+        self._max_output_bytes = max_output_bytes
+        self._log = logging.getLogger()
+        os.makedirs(os.path.join(directory, RECORDING_DIRECTORY),
+                    exist_ok=True)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def record_output(self):
+        """Starts recording the output of a test case.
+
+        :rtype: OutputRecording
+        """
+        return OutputRecording(
+            os.path.join(self._directory, RECORDING_DIRECTORY),
+            self._max_output_bytes)
+
+    def save(self, problem_id, language, filename, source, verdict,
+             test_cases, outputs, full_report=False, submission_id=None):
+        """Stores a judged submission, replacing any previous copy.
+
+        :param problem_id: Problem identifier that the submission solves
+        :type problem_id: str
+        :param language: The normalized language of the submission
+        :type language: str
+        :param filename: The name the submission was uploaded with
+        :type filename: str
+        :param source: The source of the submission
+        :type source: bytes
+        :param verdict: The body of the verdict of the submission
+        :type verdict: dict
+        :param test_cases: The recorded results of the test cases
+        :type test_cases: list
+        :param outputs: The recorded output of each test case by test case
+                        name, moved into the store. Discarded recordings are
+                        not kept and those test cases are run again when the
+                        submission is rejudged.
+        :type outputs: dict
+        :param full_report: If every test case was run
+        :type full_report: bool
+        :param submission_id: The identifier of the submission to replace
+        :type submission_id: str
+        :return: The identifier of the stored submission
+        :rtype: str
+        """
+        submission_id = submission_id or uuid.uuid4().hex
+        problem_directory = self._problem_directory(problem_id)
+        os.makedirs(problem_directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=problem_directory)
+        try:
+            os.mkdir(os.path.join(staging, OUTPUT_DIRECTORY))
+            with open(os.path.join(staging, SOURCE_FILE), 'wb') as f:
+                f.write(source)
+
+            cases = []
+            for index, case in enumerate(test_cases):
+                case = dict(case)
+                recording = outputs.get(case['name'])
+                case['output'] = None
+                case['partial'] = False
+                if recording is not None and recording.path is not None:
+                    case['output'] = str(index)
+                    case['partial'] = recording.partial
+                    recording.move(os.path.join(staging, OUTPUT_DIRECTORY,
+                                                case['output']))
+                cases.append(case)
+
+            self._write_metadata(staging, {
+                'submission_id': submission_id,
+                'problem_id': problem_id,
+                'language': language,
+                'filename': filename,
+                'full_report': bool(full_report),
+                'judged': time.time(),
+                'verdict': verdict,
+                'test_cases': cases
+            })
+            self._replace(staging, os.path.join(problem_directory,
+                                                submission_id))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return submission_id
+
+    def update_verdict(self, stored, verdict, test_cases):
+        """Records a new verdict for a stored submission, keeping its outputs.
+
+        :param stored: The stored submission
+        :type stored: StoredSubmission
+        :param verdict: The body of the new verdict
+        :type verdict: dict
+        :param test_cases: The new results of the test cases, in the format of
+                           StoredSubmission.test_cases
+        :type test_cases: list
+        """
+        directory = os.path.join(self._problem_directory(stored.problem_id),
+                                 stored.submission_id)
+        metadata = dict(stored._metadata)
+        metadata.update({'judged': time.time(), 'verdict': verdict,
+                         'test_cases': test_cases})
+        self._write_metadata(directory, metadata)
+        stored._metadata = metadata
+
+    def get(self, problem_id, submission_id):
+        """Gets a stored submission.
+
+        :return: The submission or None if it is not stored
+        :rtype: StoredSubmission
+        """
+        return self._read(os.path.join(self._problem_directory(problem_id),
+                                       submission_id))
+
+    def list_submissions(self, problem_id):
+        """Lists the stored submissions of a problem.
+
+        :param problem_id: Problem identifier
+        :type problem_id: str
+        :rtype: list
+        """
+        problem_directory = self._problem_directory(problem_id)
+        if not os.path.isdir(problem_directory):
+            return []
+        stored = []
+        for name in sorted(os.listdir(problem_directory)):
+            if name.startswith('.'):
+                continue
+            submission = self._read(os.path.join(problem_directory, name))
+            if submission is not None:
+                stored.append(submission)
+        return stored
+
+    def _problem_directory(self, problem_id):
+        return os.path.join(self._directory, os.path.basename(problem_id))
+
+    def _read(self, directory):
+        try:
+            with open(os.path.join(directory, METADATA_FILE)) as f:
+                return StoredSubmission(directory, json.load(f))
+        except (OSError, ValueError):
+            self._log.warning('Skipping unreadable stored submission %s.',
+                              directory)
+            return None
+
+    @staticmethod
+    def _write_metadata(directory, metadata):
+        path = os.path.join(directory, METADATA_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(metadata, f)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _replace(staging, destination):
+        retired = None
+        if os.path.isdir(destination):
+            retired = os.path.join(os.path.dirname(destination),
+                                   '.retired-' + uuid.uuid4().hex)
+            os.rename(destination, retired)
+        os.rename(staging, destination)
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+
+
+def initialize(app_config):
+    """Creates the process wide submission store from the configuration.
+
+    The store is disabled when no directory is configured.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _STORE
+    settings = app_config.get('submission_store') or {}
+    directory = settings.get('directory')
+    with _STORE_LOCK:
+        if not directory:
+            _STORE = None
+            return
+        _STORE = SubmissionStore(
+            directory, int(settings.get('max_output_bytes') or
+                           DEFAULT_MAX_OUTPUT_BYTES))
+
+
+def get_store():
+    """Gets the process wide submission store.
+
+    :return: The submission store or None if it is disabled
+    :rtype: SubmissionStore
+    """
+    return _STORE
@@ -1,5 +1,4 @@
 import os
-import yaml
 from extended_uva_judge import errors
 
 
@@ -21,31 +20,3 @@ def get_problem_directory(app_config):
 
     return problem_directory
 
-
-def get_problem_config(app_config, problem_id):
-    """Gets the configuration for this objects corresponding problem.
-
-    :return: The configuration for the users selected problem
-    :rtype: dict
-    """
-    problem_directory = get_problem_directory(app_config)
-
-    problem_config_path = os.path.join(
-        problem_directory, '%s.yaml' % problem_id)
-    problem_config = yaml.load(open(problem_config_path))
-
-    return problem_config
-
-
-def does_problem_config_exist(app_config, problem_id):
-    """Checks to see if the problem configuration exists in the system.
-
-    :return: True if it exists, false otherwise
-    :rtype: bool
-    """
-    problem_directory = get_problem_directory(app_config)
-
-    problem_config_path = os.path.join(
-        problem_directory, '%s.yaml' % problem_id)
-
-    return os.path.exists(problem_config_path)
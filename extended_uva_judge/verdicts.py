@@ -0,0 +1,150 @@
+"""Module housing the verdict cache.
+
+Contestants and bots frequently resubmit byte identical code. The verdict of
+a submission only depends on the problem and its checker program, the
+configuration of its language and the judge limits, and the source, so the
+verdicts of recent submissions are kept in memory and returned for identical
+resubmissions without compiling or running them again.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from collections import OrderedDict
+
+from extended_uva_judge import checkers, enums, execution, languages
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 300
+
+# Verdicts that depend on the load of the machine, or on the judge failing,
+# are worth judging again rather than repeating.
+UNCACHED_VERDICTS = (
+    enums.ProblemResponses.TIME_LIMIT_EXCEEDED,
+    enums.ProblemResponses.SUBMISSION_ERROR
+)
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class VerdictCache:
+    """Size bounded, least recently used, in memory cache of verdicts.
+
+    Entries expire once they are older than the time to live.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl=DEFAULT_TTL_SECONDS):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_key(problem, language, app_config, source, debug, full_report):
+        """Builds the cache key of a submission.
+
+        :param problem: The problem the submission solves
+        :type problem: problems.Problem
+        :param language: The normalized language of the submission
+        :type language: str
+        :param app_config: The config for the judge system
+        :type app_config: dict
+        :param source: The source of the submission
+        :type source: bytes
+        :param debug: If the programs output is included in the verdict
+        :type debug: bool
+        :param full_report: If every test case is run
+        :type full_report: bool
+        :rtype: str
+        """
+        # Runs are granted the start up time of their runtime on top of the
+        # time limit, see objects.ProblemWorker._get_time_limit
+        allowance = 0
+        registry = languages.get_registry()
+        configured = registry.find(language) if registry else None
+        if configured is not None:
+            allowance = configured.startup_allowance
+        compile_timeout, compile_output, compile_limits = \
+            execution.get_compile_limits(app_config, configured)
+        settings = [
+            problem.problem_id, problem.digest, language,
+            checkers.get_current_signature(app_config, problem),
+            [test_case.time_limit + allowance
+             for test_case in problem.test_cases],
+            (app_config.get('languages') or {}).get(language),
+            app_config.get('resource_limits'),
+            app_config.get('output_limit_bytes'),
+            app_config.get('stderr_limit_bytes'),
+            [compile_timeout, compile_output, compile_limits.to_dict()],
+            bool(debug), bool(full_report)
+        ]
+        key = hashlib.sha256(json.dumps(settings, sort_keys=True,
+                                        default=str).encode())
+        key.update(source)
+        return key.hexdigest()
+
+    def get(self, key):
+        """Gets the cached verdict of a submission.
+
+        :param key: The key from build_key
+        :type key: str
+        :return: The verdict or None if it is not cached or has expired
+        :rtype: extended_uva_judge.objects.ProblemResponseBuilder
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, verdict = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, key, verdict):
+        """Caches the verdict of a submission unless it should be repeated.
+
+        :param key: The key from build_key
+        :type key: str
+        :param verdict: The verdict of the submission
+        :type verdict: extended_uva_judge.objects.ProblemResponseBuilder
+        """
+        if verdict.code in UNCACHED_VERDICTS:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+def initialize(app_config):
+    """Creates the process wide verdict cache from the configuration.
+
+    The cache is disabled unless verdict_cache.enabled is set.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    """
+    global _CACHE
+    settings = app_config.get('verdict_cache') or {}
+    with _CACHE_LOCK:
+        if not settings.get('enabled'):
+            _CACHE = None
+            return
+        _CACHE = VerdictCache(
+            int(settings.get('max_entries') or DEFAULT_MAX_ENTRIES),
+            float(settings.get('ttl_seconds') or DEFAULT_TTL_SECONDS))
+
+
+def get_verdict_cache():
+    """Gets the process wide verdict cache.
+
+    :return: The verdict cache or None if it is disabled
+    :rtype: VerdictCache
+    """
+    return _CACHE
@@ -0,0 +1,129 @@
+"""Module housing the pool of submission work directories.
+
+Every submission needs a private directory to hold its source and compiled
+program, and to run the program in so the files it writes are removed with
+it. Creating and removing a directory per submission puts file system work on
+the response path, so directories are created ahead of time, handed out from
+a pool and emptied by a background thread once released.
+"""
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+
+from extended_uva_judge import errors
+
+DEFAULT_POOL_SIZE = 8
+WORKSPACE_PREFIX = 'workspace-'
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class WorkspacePool:
+    """Recycled, pre-created work directories below a base directory."""
+    def __init__(self, base_directory, size=DEFAULT_POOL_SIZE):
+        # Programs run inside the directories, so their paths must not
+        # depend on the working directory
+        self._base_directory = os.path.abspath(base_directory)
+        self._size = size
+        self._idle = queue.Queue()
+        self._dirty = queue.Queue()
+        self._log = logging.getLogger()
+
+        os.makedirs(self._base_directory, exist_ok=True)
+        for _ in range(size):
+            self._idle.put(self._create())
+
+        cleaner = threading.Thread(target=self._clean_released)
+        cleaner.daemon = True
+        cleaner.start()
+
+    @property
+    def base_directory(self):
+        return self._base_directory
+
+    def acquire(self):
+        """Gets an empty work directory, creating one if none are idle.
+
+        :return: The path of the work directory
+        :rtype: str
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._create()
+
+    def release(self, path):
+        """Returns a work directory to the pool.
+
+        The directory is emptied in the background before it is reused.
+
+        :param path: The path of the work directory
+        :type path: str
+        """
+        self._dirty.put(path)
+
+    def wait_cleaned(self):
+        """Waits until every released work directory has been emptied."""
+        self._dirty.join()
+
+    def _create(self):
+        # mkdtemp creates the directory atomically with a unique name so
+        # concurrent submissions can never be handed the same directory.
+        return tempfile.mkdtemp(prefix=WORKSPACE_PREFIX,
+                                dir=self._base_directory)
+
+    def _clean_released(self):
+        while True:
+            path = self._dirty.get()
+            try:
+                if self._idle.qsize() >= self._size:
+                    shutil.rmtree(path)
+                    continue
+                _empty_directory(path)
+                self._idle.put(path)
+            except OSError:
+                self._log.warning('Failed to clean work directory %s.', path,
+                                  exc_info=True)
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                self._dirty.task_done()
+
+
+def _empty_directory(path):
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        if os.path.isdir(entry) and not os.path.islink(entry):
+            shutil.rmtree(entry)
+        else:
+            os.remove(entry)
+
+
+def get_pool(app_config):
+    """Gets the process wide work directory pool for the configuration.
+
+    Work directories are placed in workspace_tmpfs_directory when it is set,
+    such as a RAM backed tmpfs mount, and in work_directory otherwise.
+
+    :param app_config: The config for the judge system
+    :type app_config: dict
+    :rtype: WorkspacePool
+    """
+    base = (app_config.get('workspace_tmpfs_directory') or
+            app_config.get('work_directory'))
+    if not base:
+        raise errors.MissingConfigEntryError('work_directory')
+
+    pool = _POOLS.get(base)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(base)
+            if pool is None:
+                pool = WorkspacePool(base, int(
+                    app_config.get('workspace_pool_size') or
+                    DEFAULT_POOL_SIZE))
+                _POOLS[base] = pool
+    return pool
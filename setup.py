@@ -27,9 +27,14 @@ setup(
     },
     package_dir={'extended_uva_judge': 'extended_uva_judge'},
     install_requires=INSTALL_REQS,
+    extras_require={
+        'numpy': ['numpy']
+    },
     entry_points={
         'console_scripts': [
-            'extended-uva-judge-server = extended_uva_judge.server:main'
+            'extended-uva-judge-server = extended_uva_judge.server:main',
+            'extended-uva-judge-rejudge = extended_uva_judge.rejudge:main',
+            'extended-uva-judge-pack = extended_uva_judge.packs:main'
         ]
     }
 )
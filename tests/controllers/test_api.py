@@ -0,0 +1,92 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import flask
+
+from extended_uva_judge import enums, jobs
+from extended_uva_judge.controllers import api
+from extended_uva_judge.objects import ProblemWorkerFactory
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        problem_dir = os.path.join(self.directory, 'problems')
+        os.mkdir(problem_dir)
+        with open(os.path.join(problem_dir, '1.yaml'), 'w') as f:
+            f.write('time_limit: 2\ninput: ""\noutput: "1"\n')
+        config = {
+            'problem_directory': problem_dir,
+            'work_directory': os.path.join(self.directory, 'work'),
+            'languages': {
+                'python3': {'compiler': sys.executable,
+                            'file_extensions': ['py']}}
+        }
+        ProblemWorkerFactory.initialize(config)
+        jobs.initialize(config)
+
+        app = flask.Flask(__name__)
+        app.register_blueprint(api.MOD)
+        app.app_config = config
+        app.testing = True
+        self.app = app.test_client()
+
+    def tearDown(self):
+        jobs.get_queue().shutdown()
+        shutil.rmtree(self.directory)
+
+    def _submit(self, query=''):
+        return self.app.post(
+            '/api/v1/problem/1/py3/submit' + query,
+            data={'main.py': (io.BytesIO(b'print(1)'), 'main.py')},
+            content_type='multipart/form-data')
+
+    def _poll(self, location, timeout=30):
+        deadline = time.monotonic() + timeout
+        while True:
+            body = self.app.get(location).get_json()
+            if (body['status'] == enums.JobStatus.COMPLETE or
+                    time.monotonic() > deadline):
+                return body
+            time.sleep(0.05)
+
+    def test_submitted_job_is_judged(self):
+        rv = self._submit()
+        self.assertEqual(202, rv.status_code)
+        job = rv.get_json()
+        self.assertIn(job['status'], (enums.JobStatus.QUEUED,
+                                      enums.JobStatus.RUNNING,
+                                      enums.JobStatus.COMPLETE))
+        location = rv.headers['Location']
+        self.assertTrue(location.endswith('/api/v1/jobs/' + job['job_id']))
+
+        body = self._poll(location)
+        self.assertEqual(enums.JobStatus.COMPLETE, body['status'])
+        self.assertEqual(enums.ProblemResponses.ACCEPTED,
+                         body['result']['code'])
+
+    def test_debug_flag_is_parsed_as_a_boolean(self):
+        body = self._poll(self._submit('?debug=false').headers['Location'])
+        self.assertNotIn('stdout', body['result'])
+
+        body = self._poll(self._submit('?debug=true').headers['Location'])
+        self.assertEqual('1\n', body['result']['stdout'])
+
+    def test_unknown_job_is_not_found(self):
+        rv = self.app.get('/api/v1/jobs/unknown')
+        self.assertEqual(404, rv.status_code)
+        self.assertEqual('Job not found.', rv.get_json()['description'])
+
+    def test_invalid_submission_is_not_queued(self):
+        rv = self.app.post('/api/v1/problem/2/py3/submit',
+                           data={'main.py': (io.BytesIO(b''), 'main.py')},
+                           content_type='multipart/form-data')
+        self.assertEqual(400, rv.status_code)
+        self.assertEqual(enums.ProblemResponses.SUBMISSION_ERROR,
+                         rv.get_json()['code'])
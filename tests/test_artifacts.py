@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from extended_uva_judge.artifacts import ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_build_key_depends_on_compiler_args(self):
+        first = ArtifactCache.build_key('c_sharp', 'csc', ['/nologo'], b'x')
+        second = ArtifactCache.build_key('c_sharp', 'csc', ['/o'], b'x')
+        self.assertNotEqual(first, second)
+
+    def test_build_key_depends_on_build(self):
+        first = ArtifactCache.build_key('java', 'javac', [], b'x',
+                                        {'source': 'Main.java'})
+        second = ArtifactCache.build_key('java', 'javac', [], b'x',
+                                         {'source': 'Foo.java'})
+        self.assertNotEqual(first, second)
+
+    def test_fetch_returns_stored_artifact(self):
+        cache = ArtifactCache(self.cache_dir, max_bytes=100)
+        cache.store('key', self._write('a.exe', b'program'))
+        destination = os.path.join(self.work_dir, 'b.exe')
+
+        self.assertTrue(cache.fetch('key', destination))
+        with open(destination, 'rb') as f:
+            self.assertEqual(b'program', f.read())
+        self.assertFalse(cache.fetch('missing', destination))
+
+    def test_store_evicts_least_recently_used(self):
+        cache = ArtifactCache(self.cache_dir, max_bytes=10)
+        cache.store('first', self._write('1.exe', b'aaaa'))
+        cache.store('second', self._write('2.exe', b'bbbb'))
+        cache.fetch('first', os.path.join(self.work_dir, 'out.exe'))
+        cache.store('third', self._write('3.exe', b'cccc'))
+
+        destination = os.path.join(self.work_dir, 'out.exe')
+        self.assertTrue(cache.fetch('first', destination))
+        self.assertFalse(cache.fetch('second', destination))
+        self.assertTrue(cache.fetch('third', destination))
+        self.assertEqual(8, cache.total_bytes)
@@ -0,0 +1,47 @@
+import io
+import tarfile
+import unittest
+
+from extended_uva_judge import errors
+from extended_uva_judge.batches import BatchReader
+
+
+def _tar(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, content in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class TestBatchReader(unittest.TestCase):
+
+    def test_names_supply_problem_and_language(self):
+        reader = BatchReader(problem_id='100', language='py3')
+        reader.add_file('101/cs/a.cs', 'a.cs', b'a')
+        reader.add_file('py2/b.py', 'b.py', b'b')
+        reader.add_file('c.py', 'c.py', b'c')
+        self.assertEqual(
+            [('101', 'cs', 'a.cs'), ('100', 'py2', 'b.py'),
+             ('100', 'py3', 'c.py')],
+            [(e.problem_id, e.language, e.submission.filename)
+             for e in reader.entries])
+
+    def test_archives_are_extracted(self):
+        reader = BatchReader()
+        reader.add_file('all.tgz', 'all.tgz', _tar(
+            [('100/py3/a.py', b'print(1)'), ('100/py3/b.py', b'print(2)')]))
+        self.assertEqual([b'print(1)', b'print(2)'],
+                         [e.submission.content for e in reader.entries])
+
+    def test_limits_are_enforced(self):
+        reader = BatchReader(max_submissions=1)
+        reader.add_file('a.py', 'a.py', b'a')
+        self.assertRaises(errors.InvalidBatchError,
+                          reader.add_file, 'b.py', 'b.py', b'b')
+
+        reader = BatchReader(max_bytes=10)
+        self.assertRaises(errors.InvalidBatchError, reader.add_file,
+                          'all.tgz', 'all.tgz', _tar([('a.py', b'x' * 11)]))
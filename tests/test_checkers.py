@@ -0,0 +1,113 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from extended_uva_judge import checkers, enums, errors
+from extended_uva_judge.checkers import CheckerComparator, CheckerPool
+
+# Accepts any output with the same tokens as the expected output and reports
+# the process id so tests can tell if the checker was kept running.
+CHECKER = """
+import os
+import sys
+
+while True:
+    header = sys.stdin.buffer.readline()
+    if not header:
+        break
+    sizes = [int(size) for size in header.split()]
+    program_input, expected, output = [sys.stdin.buffer.read(size)
+                                       for size in sizes]
+    if output == b'hang':
+        continue
+    if output == b'exit':
+        sys.exit(1)
+    verdict = 'AC' if output.split() == expected.split() else 'WA'
+    sys.stdout.write('%s %s\\n' % (verdict, os.getpid()))
+    sys.stdout.flush()
+"""
+
+
+class TestCheckerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'checker.py'), 'w') as f:
+            f.write(CHECKER)
+        self.pool = CheckerPool([sys.executable, 'checker.py'],
+                                self.directory, size=1, timeout=2)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.directory)
+
+    def test_checker_decides_the_verdict(self):
+        comparator = CheckerComparator(self.pool, b'1 10', b'1 10 20')
+        comparator.feed(b'1 10 ')
+        comparator.feed(b' 20\n')
+        self.assertEqual(enums.ProblemResponses.ACCEPTED,
+                         comparator.classify())
+
+        comparator = CheckerComparator(self.pool, b'1 10', b'1 10 20')
+        comparator.feed(b'1 10 21')
+        self.assertEqual(enums.ProblemResponses.WRONG_ANSWER,
+                         comparator.classify())
+
+    def test_checker_is_kept_running(self):
+        _, first = self.pool.check(b'', b'a', b'a')
+        _, second = self.pool.check(b'', b'a', b'b')
+        self.assertEqual(first, second)
+
+    def test_failed_checker_is_restarted(self):
+        _, first = self.pool.check(b'', b'a', b'a')
+        with self.assertRaises(errors.CheckerError):
+            self.pool.check(b'', b'a', b'exit')
+        _, second = self.pool.check(b'', b'a', b'a')
+        self.assertNotEqual(first, second)
+
+    def test_unresponsive_checker_times_out(self):
+        with self.assertRaises(errors.CheckerError):
+            self.pool.check(b'', b'a', b'hang')
+        verdict, _ = self.pool.check(b'', b'a', b'a')
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, verdict)
+
+
+class TestGetPool(unittest.TestCase):
+
+    def setUp(self):
+        self.problem = mock.Mock(problem_id='1', digest='a',
+                                 checker=[sys.executable, 'checker.py'],
+                                 checker_timeout=None)
+        self.config = {'problem_directory': tempfile.gettempdir()}
+
+    def tearDown(self):
+        checkers.initialize({})
+
+    def _get_pools(self, revalidate_seconds, count):
+        checkers.initialize({'checkers': {
+            'revalidate_seconds': revalidate_seconds}})
+        with mock.patch.object(checkers, 'get_signature',
+                               return_value=[]) as get_signature:
+            pools = [checkers.get_pool(self.config, self.problem)
+                     for _ in range(count)]
+        return pools, get_signature.call_count
+
+    def test_checker_program_is_checked_once_per_interval(self):
+        pools, checks = self._get_pools(60, 5)
+        self.assertEqual(1, checks)
+        self.assertEqual(1, len(set(pools)))
+
+    def test_checker_program_is_checked_on_every_use_without_interval(self):
+        pools, checks = self._get_pools(0, 3)
+        self.assertEqual(3, checks)
+        self.assertEqual(1, len(set(pools)))
+
+    def test_changed_problem_restarts_the_checkers(self):
+        checkers.initialize({'checkers': {'revalidate_seconds': 60}})
+        first = checkers.get_pool(self.config, self.problem)
+        self.problem.digest = 'b'
+        self.assertIsNot(first, checkers.get_pool(self.config, self.problem))
@@ -0,0 +1,117 @@
+import unittest
+
+from unittest import mock
+
+from extended_uva_judge import comparison
+from extended_uva_judge.comparison import FloatComparator, \
+    StreamingComparator
+
+
+def _compare(expected, chunks):
+    comparator = StreamingComparator(expected)
+    for chunk in chunks:
+        if not comparator.feed(chunk):
+            return False
+    return comparator.finish()
+
+
+class TestStreamingComparator(unittest.TestCase):
+
+    def test_exact_output_is_accepted(self):
+        self.assertTrue(_compare([b'1 2\n3'], [b'1 2\n3']))
+
+    def test_surrounding_whitespace_is_ignored(self):
+        self.assertTrue(_compare([b'1 2\n3'], [b'\n ', b'1 2', b'\n3\n\n']))
+
+    def test_whitespace_split_across_chunks_is_matched(self):
+        self.assertTrue(_compare([b'1 2\n3'], [b'1', b' ', b'2\n', b'3']))
+
+    def test_any_accepted_output_matches(self):
+        self.assertTrue(_compare([b'a', b'b'], [b'b']))
+
+    def test_divergent_output_stops_early(self):
+        comparator = StreamingComparator([b'1 2\n3'])
+        self.assertFalse(comparator.feed(b'1 3'))
+
+    def test_truncated_output_is_rejected(self):
+        self.assertFalse(_compare([b'1 2\n3'], [b'1 2']))
+
+    def test_extra_inner_whitespace_is_rejected(self):
+        self.assertFalse(_compare([b'1 2'], [b'1  ', b'2']))
+
+
+class TestClassification(unittest.TestCase):
+
+    def _classify(self, expected, chunks):
+        comparator = StreamingComparator(expected)
+        for chunk in chunks:
+            comparator.feed(chunk)
+        return comparator.classify()
+
+    def test_exact_output_is_accepted(self):
+        self.assertEqual('AC', self._classify([b'1 2\n3'], [b'1 2\n', b'3']))
+
+    def test_trailing_line_whitespace_is_a_presentation_error(self):
+        self.assertEqual('AE',
+                         self._classify([b'1 2\n3'], [b'1 2 ', b' \t\n3\n']))
+
+    def test_different_separators_are_a_presentation_error(self):
+        self.assertEqual('PE',
+                         self._classify([b'1 2\n3'], [b'1\n', b'2   3']))
+
+    def test_different_tokens_are_a_wrong_answer(self):
+        self.assertEqual('WA', self._classify([b'1 2\n3'], [b'1 2 4']))
+
+
+class TestFloatComparator(unittest.TestCase):
+
+    def _classify(self, expected, chunks, **kwargs):
+        comparator = FloatComparator(expected, batch_size=2, **kwargs)
+        for chunk in chunks:
+            comparator.feed(chunk)
+        return comparator.classify()
+
+    def test_numbers_within_tolerance_are_accepted(self):
+        for numpy in (comparison.numpy, None):
+            with mock.patch.object(comparison, 'numpy', numpy):
+                self.assertEqual('AC', self._classify(
+                    [b'x 0.5\n1000000'], [b'x 0.50', b'04  1000000.9'],
+                    absolute_tolerance=1e-3, relative_tolerance=1e-6))
+
+    def test_numbers_outside_tolerance_are_rejected(self):
+        for numpy in (comparison.numpy, None):
+            with mock.patch.object(comparison, 'numpy', numpy):
+                self.assertEqual('WA', self._classify(
+                    [b'1 2 3'], [b'1 2 3.01'], absolute_tolerance=1e-3,
+                    relative_tolerance=0))
+                self.assertEqual('WA', self._classify(
+                    [b'1 2 3'], [b'1 2 nan']))
+
+    def test_only_plain_numbers_are_parsed(self):
+        for numpy in (comparison.numpy, None):
+            with mock.patch.object(comparison, 'numpy', numpy):
+                self.assertEqual('WA', self._classify([b'1 10'], [b'1 1_0']))
+                self.assertEqual('WA', self._classify(
+                    [b'1 10'], [b'1 inf'], relative_tolerance=float('inf')))
+
+    def test_vectorized_and_python_paths_agree(self):
+        if comparison.numpy is None:
+            self.skipTest('numpy is not installed.')
+        for token in (b'1', b'1.0', b'+1.', b'1e0', b'1\x00', b'\x001',
+                      b'1_0', b'inf', b'nan', b'0x1', b'1e'):
+            verdicts = []
+            for numpy in (comparison.numpy, None):
+                with mock.patch.object(comparison, 'numpy', numpy):
+                    verdicts.append(self._classify([b'2 1'], [b'2 ' + token]))
+            self.assertEqual(verdicts[1], verdicts[0], token)
+        self.assertEqual('WA', self._classify([b'2 1'], [b'2 1\x00']))
+
+    def test_text_tokens_must_match(self):
+        self.assertEqual('WA', self._classify([b'Case 1: 2.0'],
+                                              [b'case 1: 2']))
+        self.assertEqual('AC', self._classify([b'Case 1: 2.0'],
+                                              [b'Case 1:\n2']))
+
+    def test_missing_and_extra_tokens_are_rejected(self):
+        self.assertEqual('WA', self._classify([b'1 2 3'], [b'1 2']))
+        self.assertEqual('WA', self._classify([b'1 2 3'], [b'1 2 3 4']))
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+from extended_uva_judge import execution, forkserver
+
+PRINT_LIMITS = ('import resource; print(resource.getrlimit('
+                'resource.RLIMIT_DATA)[0], resource.getrlimit('
+                'resource.RLIMIT_CPU)[0])')
+
+
+class TestRunProcess(unittest.TestCase):
+
+    def test_limits_are_applied_before_the_program_starts(self):
+        limits = execution.ResourceLimits(cpu_time=1.5,
+                                          data_size=512 * 1024 * 1024)
+        if not limits.supported:
+            self.skipTest('prlimit is not available.')
+        run = execution.run_process([sys.executable, '-c', PRINT_LIMITS],
+                                    capture_stdout=True, limits=limits)
+        self.assertEqual(0, run.return_code)
+        self.assertEqual(b'536870912 2', run.stdout.strip())
+
+    def test_missing_program_fails_instead_of_hanging(self):
+        limits = execution.ResourceLimits(cpu_time=1)
+        if not limits.supported:
+            self.skipTest('prlimit is not available.')
+        run = execution.run_process(['/nonexistent/program'], limits=limits,
+                                    timeout=5)
+        self.assertNotEqual(0, run.return_code)
+        self.assertFalse(run.timed_out)
+
+
+class TestPeakMemory(unittest.TestCase):
+
+    def setUp(self):
+        # A child inherits the peak memory of the process it is forked from
+        self.ballast = b'x' * (256 * 1024 * 1024)
+
+    @unittest.skipUnless(hasattr(os, 'fork') and hasattr(os, 'wait4'),
+                         'Fork servers need fork and wait4.')
+    def test_peak_of_a_small_program_is_its_own(self):
+        pool = forkserver.ForkServerPool(sys.executable, size=1,
+                                         exec_programs=True)
+        try:
+            run = execution.run_process(['true'], launcher=pool.launch)
+        finally:
+            pool.close()
+        self.assertEqual(0, run.return_code)
+        self.assertGreater(run.peak_rss, 0)
+        self.assertLess(run.peak_rss, 32 * 1024 * 1024)
+
+    @unittest.skipUnless(hasattr(os, 'wait4'), 'wait4 is not available.')
+    def test_peak_inherited_from_the_judge_is_not_reported(self):
+        run = execution.run_process(['true'])
+        self.assertEqual(0, run.return_code)
+        self.assertIsNone(run.peak_rss)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from extended_uva_judge import errors, execution, forkserver
+
+SLEEPER = ('import subprocess, time\n'
+           'subprocess.Popen(["sleep", "30"])\n'
+           'time.sleep(30)\n')
+
+
+@unittest.skipUnless(hasattr(os, 'fork') and hasattr(os, 'waitid'),
+                     'Fork servers need fork and waitid.')
+class TestForkServerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pool = forkserver.ForkServerPool(sys.executable, size=1)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.directory)
+
+    def _script(self, source):
+        path = os.path.join(self.directory, 'main.py')
+        with open(path, 'w') as f:
+            f.write(source)
+        return [sys.executable, path]
+
+    def _kill_idle_server(self):
+        server = self.pool._idle.queue[0]
+        server._process.kill()
+        server._process.wait()
+
+    def test_program_runs_and_is_reaped(self):
+        run = execution.run_process(
+            self._script('import sys\nprint(input())\nsys.exit(3)\n'),
+            stdin_data=b'hello\n', capture_stdout=True,
+            launcher=self.pool.launch)
+        self.assertEqual(3, run.return_code)
+        self.assertEqual(b'hello\n', run.stdout)
+        self.assertIsNotNone(run.cpu_time)
+
+    def test_program_runs_in_the_requested_directory(self):
+        run = execution.run_process(
+            self._script('import os\nprint(os.getcwd())\n'),
+            capture_stdout=True, launcher=self.pool.launch,
+            cwd=self.directory)
+        self.assertEqual(self.directory, run.stdout.decode().strip())
+
+    def test_timeout_kills_the_programs_process_group(self):
+        run = execution.run_process(self._script(SLEEPER), timeout=0.5,
+                                    launcher=self.pool.launch)
+        self.assertTrue(run.timed_out)
+        # The sleep holds standard output open unless it is killed as well
+        self.assertLess(run.wall_time, 10)
+
+    def test_dead_server_is_replaced(self):
+        self._kill_idle_server()
+        run = execution.run_process(self._script('print(1)\n'),
+                                    capture_stdout=True,
+                                    launcher=self.pool.launch)
+        self.assertEqual(b'1\n', run.stdout)
+
+    def test_failed_start_releases_the_slot(self):
+        self._kill_idle_server()
+        command = self._script('print(1)\n')
+        with mock.patch.object(forkserver, 'ForkServer',
+                               side_effect=errors.ForkServerError()):
+            for _ in range(2):
+                with self.assertRaises(errors.ForkServerError):
+                    self.pool.launch(command)
+
+        run = execution.run_process(command, capture_stdout=True,
+                                    launcher=self.pool.launch)
+        self.assertEqual(b'1\n', run.stdout)
@@ -0,0 +1,71 @@
+import unittest
+
+from extended_uva_judge import errors, languages
+
+
+class TestLanguageRegistry(unittest.TestCase):
+
+    def setUp(self):
+        languages.initialize({'languages': {
+            'python3': {'file_extensions': ['py'], 'compiler': 'python3'},
+            'c_sharp': None
+        }}, {languages.PYTHON3: object})
+        self.registry = languages.get_registry()
+
+    def test_abbreviations_find_the_configured_language(self):
+        language = self.registry.find('py3')
+        self.assertEqual(languages.PYTHON3, language.name)
+        self.assertIs(object, language.worker_class)
+        self.assertEqual('python3', language.compiler)
+        self.assertTrue(language.allows_file('main.PY'))
+        self.assertFalse(language.allows_file('main.cs'))
+
+    def test_unconfigured_and_unknown_languages(self):
+        self.assertIsNone(self.registry.find('cs'))
+        for language in ('py2', 'brainfuck'):
+            with self.assertRaises(errors.UnsupportedLanguageError):
+                self.registry.find(language)
+
+    def test_body_lists_configured_languages(self):
+        self.assertEqual('{"languages": {"python3": ["python3", "py3"]}}',
+                         self.registry.body)
+
+    def test_languages_are_declared_by_the_config(self):
+        languages.initialize({'languages': {
+            'ruby': {'run_command': ['ruby', '{source}'],
+                     'aliases': ['rb'], 'file_extensions': ['rb']}
+        }}, default_worker_class=object)
+        ruby = languages.get_registry().find('rb')
+        self.assertEqual('ruby', languages.map_language('rb'))
+        self.assertIs(object, ruby.worker_class)
+        self.assertEqual(['ruby', '/work/main.rb'],
+                         ruby.build_run_command('/work/main.rb'))
+
+    def test_declared_commands_are_rendered(self):
+        languages.initialize({'languages': {
+            'c': {'compiler': '/usr/bin/gcc', 'compiler_args': ['-O2']},
+            'cpp': {'compiler': 'g++', 'run_command': ['{artifact}', '-v'],
+                    'artifact': '{name}.out'}
+        }}, default_worker_class=object)
+        c = languages.get_registry().find('c')
+        self.assertIs(object, c.worker_class)
+        self.assertEqual(
+            [['/usr/bin/gcc', '-O2', '-o', '/work/main', '/work/main.c',
+              '-lm']],
+            c.build_compile_commands('/work/main.c'))
+        self.assertEqual(['/work/main'], c.build_run_command('/work/main.c'))
+
+        cpp = languages.get_registry().find('c++')
+        self.assertEqual('/work/main.out', cpp.artifact_path('/work/main.cc'))
+        self.assertEqual(['/work/main.out', '-v'],
+                         cpp.build_run_command('/work/main.cc'))
+
+    def test_build_description_ignores_only_the_work_directory(self):
+        languages.initialize({'languages': {
+            'java': {'compiler': 'javac'}
+        }}, default_worker_class=object)
+        java = languages.get_registry().find('java')
+        self.assertEqual(java.describe_build('/work/a/Main.java'),
+                         java.describe_build('/work/b/Main.java'))
+        self.assertNotEqual(java.describe_build('/work/a/Main.java'),
+                            java.describe_build('/work/a/Foo.java'))
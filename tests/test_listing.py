@@ -0,0 +1,64 @@
+import unittest
+
+from extended_uva_judge.listing import ListingQuery, ProblemIndex
+from extended_uva_judge.problems import Problem
+
+
+class _Catalog:
+    def __init__(self, configs):
+        self.configs = configs
+        self.revision = 0
+
+    def version(self):
+        return self.revision
+
+    def problem_ids(self):
+        return list(self.configs)
+
+    def get(self, problem_id):
+        return Problem(problem_id, self.configs[problem_id])
+
+
+def _config(time_limit, title=None):
+    return {'time_limit': time_limit, 'title': title, 'input': '1',
+            'output': '1'}
+
+
+class TestProblemIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = _Catalog({
+            '100': _config(3, 'The 3n + 1 problem'),
+            '20': _config(1, 'Blocks'),
+            'bonus': _config(10)
+        })
+        self.index = ProblemIndex(self.catalog)
+
+    def test_problems_are_listed_in_natural_order(self):
+        self.assertEqual(
+            ['20', '100', 'bonus'],
+            [entry['problem_id'] for entry in self.index.snapshot().entries])
+        self.assertEqual({'problem_id': '100', 'title': 'The 3n + 1 problem',
+                          'time_limit': 3.0, 'test_cases': 1},
+                         self.index.snapshot().entries[1])
+
+    def test_snapshot_is_rebuilt_when_the_catalog_changes(self):
+        first = self.index.snapshot()
+        self.assertIs(first, self.index.snapshot())
+        self.catalog.configs['7'] = _config(2)
+        self.catalog.revision += 1
+        second = self.index.snapshot()
+        self.assertIsNot(first, second)
+        query = ListingQuery()
+        self.assertNotEqual(first.etag(query), second.etag(query))
+
+    def test_queries_filter_and_paginate(self):
+        snapshot = self.index.snapshot()
+        self.assertIn('"problems": ["100"]',
+                      snapshot.render(ListingQuery(search='3N')))
+        self.assertIn('"problems": ["100", "bonus"]',
+                      snapshot.render(ListingQuery(min_time_limit=2)))
+        self.assertIn('"problems": ["bonus"]',
+                      snapshot.render(ListingQuery(page=2, per_page=2)))
+        self.assertNotEqual(snapshot.etag(ListingQuery(page=1, per_page=2)),
+                            snapshot.etag(ListingQuery(page=2, per_page=2)))
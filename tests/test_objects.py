@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from extended_uva_judge import enums, forkserver, workspaces
+from extended_uva_judge.objects import ProblemWorkerFactory, Submission
+
+
+class TestProblemWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        problem_dir = os.path.join(self.directory, 'problems')
+        os.mkdir(problem_dir)
+        with open(os.path.join(problem_dir, '1.yaml'), 'w') as f:
+            f.write('time_limit: 1\ntest_cases: []\n')
+        with open(os.path.join(problem_dir, '2.yaml'), 'w') as f:
+            f.write('time_limit: 1\ninput: ""\noutput: ""\n')
+        with open(os.path.join(problem_dir, '3.yaml'), 'w') as f:
+            f.write('time_limit: 2\nmemory_limit: 64\ninput: ""\n'
+                    'output: ""\n')
+        self.config = {
+            'problem_directory': problem_dir,
+            'work_directory': os.path.join(self.directory, 'work'),
+            'compile_limits': {'timeout_seconds': 0.5},
+            'languages': {
+                'python3': {'compiler': sys.executable,
+                            'file_extensions': ['py']},
+                'c': {'compiler': '/bin/sh',
+                      'compile_command': ['{compiler}', '-c', 'sleep 5'],
+                      'file_extensions': ['c']},
+                'java': {'compiler': None, 'file_extensions': ['java']}}
+        }
+        ProblemWorkerFactory.initialize(self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_problem_without_test_cases_is_a_submission_error(self):
+        with ProblemWorkerFactory.create_worker('py3', '1', False) as worker:
+            result = worker.test(Submission('main.py', b'print(1)'))
+        self.assertEqual(enums.ProblemResponses.SUBMISSION_ERROR,
+                         result.code)
+
+    def test_compiler_is_stopped_at_the_compile_timeout(self):
+        with ProblemWorkerFactory.create_worker('c', '2', False) as worker:
+            result = worker.test(Submission('main.c', b'int main;'))
+        self.assertEqual(enums.ProblemResponses.COMPILE_ERROR, result.code)
+        self.assertIn('time limit', result.build_response_body()['trace'])
+
+    def test_unavailable_fork_server_falls_back_to_a_new_interpreter(self):
+        pool = mock.Mock()
+        pool.launch.side_effect = OSError('Too many open files')
+        with mock.patch.object(forkserver, 'get_pool', return_value=pool):
+            with ProblemWorkerFactory.create_worker('py3', '2',
+                                                    False) as worker:
+                result = worker.test(Submission('main.py', b'pass'))
+        self.assertTrue(pool.launch.called)
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+
+    def test_memory_of_the_judge_is_not_counted_against_the_program(self):
+        # A child inherits the peak memory of the process it is forked from
+        ballast = b'x' * (256 * 1024 * 1024)
+        with ProblemWorkerFactory.create_worker('py3', '3', False) as worker:
+            result = worker.test(Submission('main.py', b'pass'))
+        self.assertEqual(256 * 1024 * 1024, len(ballast))
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+
+    def test_program_runs_in_its_work_directory(self):
+        work = os.path.realpath(os.path.join(self.directory, 'work'))
+        source = ('import os\n'
+                  'open("scratch.txt", "w").close()\n'
+                  'assert os.path.dirname(os.getcwd()) == %r\n' %
+                  work).encode()
+        with ProblemWorkerFactory.create_worker('py3', '2', False) as worker:
+            result = worker.test(Submission('main.py', source))
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+        self.assertFalse(os.path.exists('scratch.txt'))
+
+        workspaces.get_pool(self.config).wait_cleaned()
+        for _, _, files in os.walk(os.path.join(self.directory, 'work')):
+            self.assertEqual([], files)
+
+    def test_language_without_a_compiler_is_a_submission_error(self):
+        with ProblemWorkerFactory.create_worker('java', '2', False) as worker:
+            result = worker.test(Submission('Main.java', b'class Main {}'))
+        self.assertEqual(enums.ProblemResponses.SUBMISSION_ERROR,
+                         result.code)
+        self.assertIn('not configured',
+                      result.build_response_body()['description'])
+
+    @unittest.skipUnless(shutil.which('javac') and shutil.which('jar'),
+                         'A JDK is not installed.')
+    def test_default_java_commands_build_and_run_the_submission(self):
+        self.config['languages']['java']['compiler'] = shutil.which('javac')
+        ProblemWorkerFactory.initialize(self.config)
+        source = (b'public class Solution {\n'
+                  b'    static class Empty {}\n'
+                  b'    public static void main(String[] args) {\n'
+                  b'        new Empty();\n'
+                  b'    }\n'
+                  b'}\n')
+        with ProblemWorkerFactory.create_worker('java', '2', False) as worker:
+            result = worker.test(Submission('Solution.java', source))
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+
+
+class TestSubmissionJudging(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.problem_dir = os.path.join(self.directory, 'problems')
+        os.mkdir(self.problem_dir)
+
+    def tearDown(self):
+        ProblemWorkerFactory.initialize({})
+        shutil.rmtree(self.directory)
+
+    def _judge(self, problem, source, **config):
+        with open(os.path.join(self.problem_dir, '1.yaml'), 'w') as f:
+            json.dump(problem, f)
+        config.update({
+            'problem_directory': self.problem_dir,
+            'work_directory': os.path.join(self.directory, 'work'),
+            'languages': {
+                'python3': {'compiler': sys.executable,
+                            'file_extensions': ['py']}}
+        })
+        ProblemWorkerFactory.initialize(config)
+        with ProblemWorkerFactory.create_worker('py3', '1', False,
+                                                True) as worker:
+            return worker.test(Submission('main.py', source))
+
+    def test_test_cases_run_in_parallel(self):
+        # Every test case waits for all of them to have started, which never
+        # happens when they run one after the other
+        source = (b'import os, time\n'
+                  b'open(input(), "w").close()\n'
+                  b'deadline = time.time() + 1.5\n'
+                  b'while len(os.listdir(".")) < 3 and '
+                  b'time.time() < deadline:\n'
+                  b'    time.sleep(0.01)\n'
+                  b'print(len(os.listdir(".")))\n')
+        problem = {'time_limit': 5, 'test_cases': [
+            {'input': name, 'output': '3'} for name in ('a', 'b', 'c')]}
+
+        result = self._judge(problem, source, max_parallel_test_cases=3,
+                             core_budget=3)
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+        self.assertEqual(['1', '2', '3'], [
+            case['name'] for case in result.build_response_body()[
+                'test_cases']])
+
+        result = self._judge(problem, source, max_parallel_test_cases=1)
+        self.assertEqual(enums.ProblemResponses.WRONG_ANSWER, result.code)
+
+    def test_output_beyond_the_limit_is_an_output_limit_exceeded(self):
+        # The output matches the expected output, only its size is wrong
+        source = b'print("x" * 2000)\n'
+        problem = {'time_limit': 2, 'input': '', 'output': 'x' * 2000}
+
+        result = self._judge(dict(problem, output_limit=1000), source)
+        self.assertEqual(enums.ProblemResponses.OUTPUT_LIMIT_EXCEEDED,
+                         result.code)
+        self.assertEqual(enums.ProblemResponses.OUTPUT_LIMIT_EXCEEDED,
+                         result.build_response_body()['test_cases'][0]['code'])
+
+        result = self._judge(problem, source, output_limit_bytes=1000)
+        self.assertEqual(enums.ProblemResponses.OUTPUT_LIMIT_EXCEEDED,
+                         result.code)
+
+        # The limit of the problem takes precedence over the default
+        result = self._judge(dict(problem, output_limit=4000), source,
+                             output_limit_bytes=1000)
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+
+    @unittest.skipUnless(hasattr(os, 'memfd_create') and
+                         os.path.isdir('/proc/self/fd'),
+                         'In memory files need memfd_create.')
+    def test_interpreted_source_is_kept_off_disk(self):
+        source = (b'import os\n'
+                  b'assert __file__.startswith("/proc/self/fd/")\n'
+                  b'print(os.listdir("."))\n')
+        problem = {'time_limit': 2, 'input': '', 'output': '[]'}
+
+        result = self._judge(problem, source)
+        self.assertEqual(enums.ProblemResponses.ACCEPTED, result.code)
+
+        # The in memory file is closed once the submission is judged
+        open_fds = len(os.listdir('/proc/self/fd'))
+        with ProblemWorkerFactory.create_worker('py3', '1', False) as worker:
+            worker.test(Submission('main.py', source))
+        self.assertEqual(open_fds, len(os.listdir('/proc/self/fd')))
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from extended_uva_judge import errors, packs
+
+PROBLEM_YAML = """time_limit: 1.5
+comparator: float
+test_cases:
+  - name: small
+    input: "1 1"
+    output: "2"
+  - input_file: 1.in
+    output:
+      - "3"
+      - "3.0"
+"""
+
+
+class TestProblemPack(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.problem_dir = os.path.join(self.directory, 'problems')
+        os.mkdir(self.problem_dir)
+        with open(os.path.join(self.problem_dir, '1.yaml'), 'w') as f:
+            f.write(PROBLEM_YAML)
+        with open(os.path.join(self.problem_dir, '2.yaml'), 'w') as f:
+            f.write('time_limit: 1\ninput: "a"\noutput: "b"\n')
+        with open(os.path.join(self.problem_dir, '1.in'), 'wb') as f:
+            f.write(b'1 2\r\n')
+        self.pack_path = os.path.join(self.directory, 'problems.pack')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pack_holds_normalized_problems(self):
+        self.assertEqual(2, packs.build_pack(self.problem_dir,
+                                             self.pack_path))
+        catalog = packs.PackCatalog(self.pack_path)
+        self.assertEqual(['1', '2'], catalog.problem_ids())
+        self.assertFalse(catalog.exists('3'))
+        self.assertIsNone(catalog.get('3'))
+
+        problem = catalog.get('1')
+        self.assertEqual(1.5, problem.time_limit)
+        self.assertEqual('float', problem.comparator)
+        cases = problem.test_cases
+        self.assertEqual(['small', '2'], [case.name for case in cases])
+        self.assertEqual(b'1 2', bytes(cases[1].input))
+        self.assertEqual([b'3', b'3.0'], cases[1].outputs)
+        self.assertIs(problem, catalog.get('1'))
+
+    def test_rebuilt_pack_is_mapped_again(self):
+        packs.build_pack(self.problem_dir, self.pack_path)
+        catalog = packs.PackCatalog(self.pack_path)
+        self.assertEqual('2', catalog.problem_ids()[-1])
+
+        with open(os.path.join(self.problem_dir, '3.yaml'), 'w') as f:
+            f.write('time_limit: 1\ninput: "a"\noutput: "c"\n')
+        packs.build_pack(self.problem_dir, self.pack_path)
+        self.assertTrue(catalog.exists('3'))
+
+    def test_other_files_are_rejected(self):
+        with open(self.pack_path, 'wb') as f:
+            f.write(b'not a pack' * 10)
+        with self.assertRaises(errors.InvalidPackError):
+            packs.ProblemPack(self.pack_path)
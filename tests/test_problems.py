@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from extended_uva_judge import problems
+
+PROBLEM_YAML = """time_limit: 1.5
+input: |
+  1 2
+output:
+  - |
+    3
+"""
+
+MULTI_CASE_PROBLEM_YAML = """time_limit: 1.5
+test_cases:
+  - name: small
+    input: "1 1"
+    output: "2"
+    time_limit: 0.5
+  - input: "1 2"
+    output:
+      - "3"
+      - "3.0"
+"""
+
+
+class TestProblemCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.problem_dir = tempfile.mkdtemp()
+        self.catalog = problems.ProblemCatalog(self.problem_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.problem_dir)
+
+    def _write_problem(self, problem_id, content):
+        path = os.path.join(self.problem_dir, '%s.yaml' % problem_id)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_get_missing_problem_returns_none(self):
+        self.assertIsNone(self.catalog.get('404'))
+        self.assertFalse(self.catalog.exists('404'))
+
+    def test_get_rejects_problems_outside_the_directory(self):
+        nested = os.path.join(self.problem_dir, 'nested')
+        os.mkdir(nested)
+        with open(os.path.join(self.problem_dir, 'outside.yaml'), 'w') as f:
+            f.write(PROBLEM_YAML)
+        catalog = problems.ProblemCatalog(nested)
+        self.assertIsNone(catalog.get('../outside'))
+        self.assertFalse(catalog.exists('..'))
+        self.assertFalse(problems.is_valid_problem_id('a/b'))
+        self.assertTrue(problems.is_valid_problem_id('100'))
+
+    def test_get_returns_normalized_problem(self):
+        self._write_problem('1', PROBLEM_YAML)
+        problem = self.catalog.get('1')
+        self.assertEqual(1.5, problem.time_limit)
+        self.assertEqual(1, len(problem.test_cases))
+        self.assertEqual(b'1 2', problem.test_cases[0].input)
+        self.assertEqual([b'3'], problem.test_cases[0].outputs)
+        self.assertEqual(1.5, problem.test_cases[0].time_limit)
+
+    def test_get_returns_named_test_cases(self):
+        self._write_problem('1', MULTI_CASE_PROBLEM_YAML)
+        cases = self.catalog.get('1').test_cases
+        self.assertEqual(['small', '2'], [case.name for case in cases])
+        self.assertEqual([b'2'], cases[0].outputs)
+        self.assertEqual(0.5, cases[0].time_limit)
+        self.assertEqual([b'3', b'3.0'], cases[1].outputs)
+        self.assertEqual(1.5, cases[1].time_limit)
+
+    def test_get_caches_parsed_problem(self):
+        self._write_problem('1', PROBLEM_YAML)
+        self.assertIs(self.catalog.get('1'), self.catalog.get('1'))
+
+    def test_get_reloads_modified_problem(self):
+        path = self._write_problem('1', PROBLEM_YAML)
+        first = self.catalog.get('1')
+        self._write_problem('1', PROBLEM_YAML.replace('1.5', '2.5'))
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        second = self.catalog.get('1')
+        self.assertIsNot(first, second)
+        self.assertEqual(2.5, second.time_limit)
+
+    def test_get_reads_normalized_input_and_output_files(self):
+        with open(os.path.join(self.problem_dir, '1.in'), 'wb') as f:
+            f.write(b'1 2\r\n3 4\r\n\r\n')
+        with open(os.path.join(self.problem_dir, '1.out'), 'wb') as f:
+            f.write(b'3\n7\n')
+        self._write_problem('1', 'time_limit: 1\n'
+                                 'input_file: 1.in\n'
+                                 'output_file: 1.out\n')
+        test_case = self.catalog.get('1').test_cases[0]
+        self.assertEqual(b'1 2\n3 4', bytes(test_case.input))
+        self.assertEqual(len(b'1 2\n3 4'), test_case.input_file.length)
+        self.assertEqual([b'3\n7'], test_case.outputs)
+
+    def test_get_reloads_problem_with_modified_input_file(self):
+        path = os.path.join(self.problem_dir, '1.in')
+        with open(path, 'wb') as f:
+            f.write(b'1 2\n')
+        self._write_problem('1', 'time_limit: 1\n'
+                                 'input_file: 1.in\n'
+                                 'output: "3"\n')
+        first = self.catalog.get('1')
+        with open(path, 'wb') as f:
+            f.write(b'1 22\n')
+        second = self.catalog.get('1')
+        self.assertIsNot(first, second)
+        self.assertEqual(b'1 22', bytes(second.test_cases[0].input))
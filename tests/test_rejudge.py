@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from extended_uva_judge import enums, rejudge, storage
+from extended_uva_judge.objects import ProblemWorkerFactory, Submission
+
+# Writes far more than one read of its output, so the run is stopped early
+REPEATER = b'import sys\nsys.stdout.write("3\\n" * 100000)\n'
+
+
+class TestRejudge(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.problem_dir = os.path.join(self.directory, 'problems')
+        os.mkdir(self.problem_dir)
+        self._write_problem('1')
+        ProblemWorkerFactory.initialize({
+            'problem_directory': self.problem_dir,
+            'work_directory': os.path.join(self.directory, 'work'),
+            'submission_store': {
+                'directory': os.path.join(self.directory, 'store')},
+            'languages': {
+                'python3': {'compiler': sys.executable,
+                            'file_extensions': ['py']}}
+        })
+        self.store = storage.get_store()
+
+    def tearDown(self):
+        storage.initialize({})
+        shutil.rmtree(self.directory)
+
+    def _write_problem(self, output):
+        with open(os.path.join(self.problem_dir, '1.yaml'), 'w') as f:
+            json.dump({'time_limit': 2, 'input': '', 'output': output}, f)
+
+    def _judge(self, source):
+        with ProblemWorkerFactory.create_worker('py3', '1', False) as worker:
+            return worker.test(Submission('main.py', source)).code
+
+    def _rejudge(self):
+        started = rejudge.Rejudge('1')
+        started.run(self.store)
+        return started.to_dict()
+
+    def test_recorded_output_is_verified_against_corrected_outputs(self):
+        self.assertEqual(enums.ProblemResponses.ACCEPTED,
+                         self._judge(b'print(1)'))
+        self._write_problem('11')
+
+        progress = self._rejudge()
+        self.assertEqual((1, 0), (progress['verified'], progress['executed']))
+        self.assertEqual('WA', progress['changes'][0]['current'])
+
+    def test_stopped_run_records_only_what_was_read(self):
+        self.assertEqual(enums.ProblemResponses.WRONG_ANSWER,
+                         self._judge(REPEATER))
+        stored = self.store.list_submissions('1')[0]
+        self.assertTrue(stored.test_cases[0]['partial'])
+        self.assertLess(len(stored.read_output('default')), 200000)
+
+        # The start of the output still differs from the corrected output
+        self._write_problem('2')
+        progress = self._rejudge()
+        self.assertEqual((1, 0), (progress['verified'], progress['executed']))
+
+        # The start of the output matches, so the program is run again
+        self._write_problem('3\n' * 100000)
+        progress = self._rejudge()
+        self.assertEqual((0, 1), (progress['verified'], progress['executed']))
+        self.assertEqual('AC', progress['changes'][0]['current'])
+
+    def test_unused_recordings_are_removed(self):
+        self._judge(b'raise SystemExit(1)')
+        self.assertEqual([], os.listdir(os.path.join(
+            self.store.directory, storage.RECORDING_DIRECTORY)))
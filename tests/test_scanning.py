@@ -0,0 +1,96 @@
+import unittest
+
+from extended_uva_judge import languages, scanning
+from extended_uva_judge.scanning import PythonImportAnalyzer, \
+    RestrictedScanner
+
+
+class TestRestrictedScanner(unittest.TestCase):
+
+    def test_every_hit_is_reported_in_order(self):
+        scanner = RestrictedScanner(['subprocess', 'os.fork', 'socket'])
+        source = b'import os\nos.fork()\nimport subprocess\n'
+        self.assertEqual(['os.fork', 'subprocess'], scanner.scan(source))
+
+    def test_overlapping_constructs_are_all_reported(self):
+        scanner = RestrictedScanner(['os', 'os.fork', 'multiprocess'])
+        self.assertEqual(['os', 'os.fork', 'multiprocess'],
+                         scanner.scan(b'os.fork(); import multiprocessing'))
+
+    def test_clean_source_has_no_hits(self):
+        scanner = RestrictedScanner(['restricted_%d' % i for i in range(500)])
+        self.assertEqual([], scanner.scan(b'print(sum(range(10)))'))
+        self.assertEqual(['restricted_4', 'restricted_49', 'restricted_499'],
+                         scanner.scan(b'x = restricted_499'))
+
+    def test_token_aware_scan_ignores_comments_and_strings(self):
+        scanning.initialize({'languages': {languages.PYTHON3: {
+            'restricted': ['subprocess'], 'token_aware_scan': True}}})
+        scanner = scanning.get_scanner(languages.PYTHON3)
+        self.assertEqual([], scanner.scan(
+            b'# subprocess\nprint("subprocess", \'\'\'\nsubprocess\'\'\')'))
+        self.assertEqual(['subprocess'],
+                         scanner.scan(b'import subprocess  # "x"'))
+
+    def test_token_aware_scan_keeps_interpolated_strings(self):
+        scanning.initialize({'languages': {
+            languages.PYTHON3: {'restricted': ['subprocess'],
+                                'token_aware_scan': True},
+            languages.C_SHARP: {'restricted': ['Process'],
+                                'token_aware_scan': True}}})
+        self.assertEqual(['subprocess'], scanning.get_scanner(
+            languages.PYTHON3).scan(b'f"{__import__(\'subprocess\')}"'))
+        self.assertEqual(['subprocess'], scanning.get_scanner(
+            languages.PYTHON3).scan(b'rF"{__import__(\'subprocess\')}"'))
+        self.assertEqual([], scanning.get_scanner(
+            languages.PYTHON3).scan(b'rb"subprocess"'))
+        self.assertEqual(['Process'], scanning.get_scanner(
+            languages.C_SHARP).scan(b'$"{Process.Start(\"sh\")}"'))
+        self.assertEqual([], scanning.get_scanner(
+            languages.C_SHARP).scan(b'@"Process"'))
+
+    def test_token_aware_scan_skips_digit_separators(self):
+        scanning.initialize({'languages': {languages.CPP: {
+            'restricted': ['system'], 'token_aware_scan': True}}})
+        scanner = scanning.get_scanner(languages.CPP)
+        self.assertEqual(['system'], scanner.scan(
+            b'int a = 1\'000; system("x"); int b = 2\'000;'))
+        self.assertEqual(['system'], scanner.scan(
+            b"long h = 0xFF'FF; system(u8'1' ? \"\" : \"\");"))
+        self.assertEqual([], scanner.scan(b"char c = 'system'; // system"))
+
+
+class TestPythonImportAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.analyzer = PythonImportAnalyzer(
+            ['subprocess', 'multiprocess', 'os.fork'])
+
+    def test_aliased_imports_and_attributes_are_found(self):
+        source = (b'import os as o\nfrom subprocess import run as go\n'
+                  b'o.fork()\nimport multiprocessing.pool\n')
+        self.assertEqual(['subprocess', 'os.fork', 'multiprocess'],
+                         self.analyzer.scan(source))
+
+    def test_comments_strings_and_unrelated_names_are_ignored(self):
+        source = (b'import os\n# import subprocess\nsubprocess = 1\n'
+                  b'print("forks", os.path.join("a", "b"))\n')
+        self.assertEqual([], self.analyzer.scan(source))
+
+    def test_dynamic_imports_are_found(self):
+        self.assertEqual(['subprocess'],
+                         self.analyzer.scan(b'__import__("subprocess")'))
+
+    def test_computed_imports_and_code_are_found(self):
+        self.assertEqual(['subprocess'],
+                         self.analyzer.scan(b'exec("import subprocess")'))
+        self.assertEqual(['subprocess', '__import__'], self.analyzer.scan(
+            b'f = "subprocess"\n__import__(f)'))
+        self.assertEqual(['__import__'],
+                         self.analyzer.scan(b'__import__("o" + "s")'))
+        self.assertEqual(['os.fork'], self.analyzer.scan(
+            b'import os\ngetattr(os, "fork")()'))
+
+    def test_unparsable_source_falls_back_to_text_scan(self):
+        self.assertEqual(['subprocess'],
+                         self.analyzer.scan(b'print "x"\nimport subprocess'))
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from extended_uva_judge.storage import SubmissionStore
+
+
+class TestSubmissionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SubmissionStore(self.directory, max_output_bytes=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self, output):
+        recording = self.store.record_output()
+        recording.write(output)
+        recording.finish(partial=False)
+        return recording
+
+    def _save(self, submission_id=None):
+        return self.store.save(
+            '100', 'python3', 'main.py', b'print(1)', {'code': 'WA'},
+            [{'name': '1', 'code': 'AC'}, {'name': '2', 'code': 'WA'}],
+            {'1': self._record(b'1'), '2': self._record(b'too long')},
+            submission_id=submission_id)
+
+    def test_submission_is_read_back(self):
+        submission_id = self._save()
+        stored = self.store.get('100', submission_id)
+        self.assertEqual(b'print(1)', stored.read_source())
+        self.assertEqual('WA', stored.verdict['code'])
+        self.assertEqual(b'1', stored.read_output('1'))
+
+    def test_large_outputs_are_not_kept(self):
+        stored = self.store.get('100', self._save())
+        self.assertIsNone(stored.read_output('2'))
+
+    def test_recording_is_discarded_once_over_the_max_bytes(self):
+        recording = self.store.record_output()
+        recording.write(b'abc')
+        path = recording.path
+        recording.write(b'de')
+        self.assertIsNone(recording.path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_saving_again_replaces_the_submission(self):
+        submission_id = self._save()
+        self._save(submission_id)
+        self.assertEqual([submission_id], [
+            stored.submission_id
+            for stored in self.store.list_submissions('100')])
+
+    def test_update_verdict_keeps_outputs(self):
+        stored = self.store.get('100', self._save())
+        self.store.update_verdict(stored, {'code': 'AC'},
+                                  stored.test_cases[:1])
+        stored = self.store.get('100', stored.submission_id)
+        self.assertEqual('AC', stored.verdict['code'])
+        self.assertEqual(b'1', stored.read_output('1'))
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from extended_uva_judge import enums, languages
+from extended_uva_judge.problems import Problem
+from extended_uva_judge.objects import ProblemResponseBuilder
+from extended_uva_judge.verdicts import VerdictCache
+
+
+def _verdict(code):
+    return ProblemResponseBuilder(code)
+
+
+class TestVerdictCache(unittest.TestCase):
+
+    def test_cached_verdict_is_returned(self):
+        cache = VerdictCache()
+        verdict = _verdict(enums.ProblemResponses.ACCEPTED)
+        cache.put('key', verdict)
+        self.assertIs(verdict, cache.get('key'))
+
+    def test_entries_expire(self):
+        cache = VerdictCache(ttl=10)
+        with mock.patch('time.monotonic', return_value=100):
+            cache.put('key', _verdict(enums.ProblemResponses.ACCEPTED))
+        with mock.patch('time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('key'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VerdictCache(max_entries=2)
+        cache.put('a', _verdict(enums.ProblemResponses.ACCEPTED))
+        cache.put('b', _verdict(enums.ProblemResponses.WRONG_ANSWER))
+        cache.get('a')
+        cache.put('c', _verdict(enums.ProblemResponses.RUNTIME_ERROR))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_time_limit_verdicts_are_not_cached(self):
+        cache = VerdictCache()
+        cache.put('key', _verdict(enums.ProblemResponses.TIME_LIMIT_EXCEEDED))
+        self.assertIsNone(cache.get('key'))
+
+    def test_key_changes_with_the_checker_and_startup_allowance(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        checker = os.path.join(directory, 'checker.py')
+        with open(checker, 'w') as f:
+            f.write('pass\n')
+        config = {'problem_directory': directory,
+                  'languages': {'java': {'compiler': 'javac'}}}
+        problem = Problem('1', {'time_limit': 1, 'input': '',
+                                'checker': 'python3 checker.py'})
+        languages.initialize(config)
+
+        def _key():
+            return VerdictCache.build_key(problem, 'java', config, b'x',
+                                          False, False)
+
+        first = _key()
+        self.assertEqual(first, _key())
+        with open(checker, 'w') as f:
+            f.write('import sys\n')
+        second = _key()
+        self.assertNotEqual(first, second)
+        languages.get_registry().find('java').startup_allowance = 0.5
+        self.assertNotEqual(second, _key())
+
+    def test_key_changes_with_the_compile_limits(self):
+        problem = Problem('1', {'time_limit': 1, 'input': '', 'output': ''})
+        config = {'languages': {'c': {'compiler': 'gcc'}}}
+        languages.initialize(config)
+
+        def _key(compile_limits):
+            config['compile_limits'] = compile_limits
+            return VerdictCache.build_key(problem, 'c', config, b'x',
+                                          False, False)
+
+        default = _key(None)
+        self.assertEqual(default, _key({'timeout_seconds': 30}))
+        self.assertNotEqual(default, _key({'timeout_seconds': 5}))
+        self.assertNotEqual(default, _key({'max_output_bytes': 10}))
+        self.assertNotEqual(default, _key({'memory_limit': 64}))
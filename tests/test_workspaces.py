@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from extended_uva_judge.workspaces import WorkspacePool
+
+
+class TestWorkspacePool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pool = WorkspacePool(self.directory, size=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_released_directory_is_emptied_and_reused(self):
+        path = self.pool.acquire()
+        os.mkdir(os.path.join(path, 'classes'))
+        with open(os.path.join(path, 'scratch.txt'), 'w') as f:
+            f.write('x')
+        self.pool.release(path)
+        self.pool.wait_cleaned()
+
+        self.assertEqual(path, self.pool.acquire())
+        self.assertEqual([], os.listdir(path))
+
+    def test_directories_beyond_the_pool_size_are_removed(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.pool.release(first)
+        self.pool.release(second)
+        self.pool.wait_cleaned()
+
+        self.assertEqual([os.path.basename(first)],
+                         os.listdir(self.directory))
+
+    def test_directories_have_absolute_paths(self):
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            pool = WorkspacePool('relative', size=1)
+        finally:
+            os.chdir(cwd)
+        path = pool.acquire()
+        self.assertTrue(os.path.isabs(path))
+        self.assertTrue(os.path.isdir(path))